@@ -0,0 +1,295 @@
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import date, timedelta
+
+from backend import live, shared
+
+POLL_SECONDS = float(os.getenv("ALERT_POLL_SECONDS", "60"))
+WEBHOOK_URL = os.getenv("ALERT_WEBHOOK_URL", "")
+MAX_RULES = int(os.getenv("ALERT_MAX_RULES", "20000"))
+KEEP = 365 * 24 * 3600
+EVENTS_KEPT = 500
+# How often a cycle renews its lock; one symbol step must stay well below
+# the rest of SHARED_LOCK_TTL (its upstream calls are time-limited).
+RENEW_SECONDS = shared.LOCK_TTL / 4
+RULE_PREFIX = "alert:rule:"
+FIELDS = (
+    "open", "high", "low", "close", "ema20", "ema50", "ema100", "ema200", "bb_upper", "bb_middle", "bb_lower",
+    "rsi14", "stoch_k", "stoch_d", "macd", "macd_signal", "macd_hist",
+)
+OPS = ("crosses_above", "crosses_below", "above", "below", "touches")
+SINKS = ("log", "webhook")
+
+def make_rule(symbol, field, op, value=None, ref=None, sink="log", note=""):
+    """Validated rule dict; the target is a constant value or another field.
+
+    touches fires when the bar's low-high range reaches the target (the
+    field itself is not used), e.g. close touches bb_lower.
+    """
+    if field not in FIELDS or (ref is not None and ref not in FIELDS):
+        raise ValueError(f"fields must be one of {', '.join(FIELDS)}")
+    if op not in OPS:
+        raise ValueError(f"op must be one of {', '.join(OPS)}")
+    if sink not in SINKS:
+        raise ValueError(f"sink must be one of {', '.join(SINKS)}")
+    if (value is None) == (ref is None):
+        raise ValueError("give exactly one of value and ref")
+    return {
+        "id": uuid.uuid4().hex[:12], "symbol": symbol.upper(), "field": field, "op": op,
+        "value": value, "ref": ref, "sink": sink, "note": note[:200], "created": time.time(),
+    }
+
+def describe(rule):
+    target = rule["ref"] if rule["ref"] is not None else rule["value"]
+    return f"{rule['field']} {rule['op'].replace('_', ' ')} {target}"
+
+def check(rule, prev, cur):
+    """Whether rule fires on the bar with values cur, given the bar before."""
+    target = rule["value"]
+    if rule["ref"] is not None:
+        target = cur.get(rule["ref"])
+    if target is None:
+        return False
+    op = rule["op"]
+    if op == "touches":
+        return cur["low"] <= target <= cur["high"]
+    x = cur.get(rule["field"])
+    if x is None:
+        return False
+    if op == "above":
+        return x > target
+    if op == "below":
+        return x < target
+    if prev is None:
+        return False
+    px = prev.get(rule["field"])
+    pt = rule["value"] if rule["ref"] is None else prev.get(rule["ref"])
+    if px is None or pt is None:
+        return False
+    if op == "crosses_above":
+        return px < pt and x >= target
+    return px > pt and x <= target
+
+class Rules:
+    """Registered rules, kept in the shared cache so every worker sees them."""
+
+    def __init__(self):
+        self._local = {}
+
+    def all(self):
+        if not shared.enabled():
+            return dict(self._local)
+        return {k[len(RULE_PREFIX):]: json.loads(v) for k, v in shared.items_raw(RULE_PREFIX)}
+
+    def add(self, rule):
+        if len(self.all()) >= MAX_RULES:
+            raise ValueError(f"at most {MAX_RULES} alert rules")
+        self._local[rule["id"]] = rule
+        shared.put(RULE_PREFIX + rule["id"], rule, KEEP)
+        return rule
+
+    def remove(self, rule_id):
+        found = self._local.pop(rule_id, None) is not None or shared.get(RULE_PREFIX + rule_id) is not None
+        shared.put(RULE_PREFIX + rule_id, None, -1)
+        return found
+
+class _Symbol:
+    """Incremental indicator state of one symbol after its last committed bar."""
+
+    __slots__ = ("state", "day", "quote_day", "values")
+
+    def __init__(self, bars):
+        self.state = live.LastBar(bars[:-1])
+        self.day = bars[-1]["time"]
+        self.quote_day = None
+        self.values = self._push(bars[-1], None)
+
+    def _push(self, bar, prev):
+        values = self.state.push(bar["open"], bar["high"], bar["low"], bar["close"])
+        values.update(open=bar["open"], high=bar["high"], low=bar["low"], time=bar["time"])
+        # /api/tv shows RSI one bar late; alerts follow the chart.
+        values["rsi14"], values["_rsi"] = (prev or {}).get("_rsi"), values["rsi14"]
+        return values
+
+    def advance(self, bar):
+        prev = self.values
+        self.values = self._push(bar, prev)
+        self.day = bar["time"]
+        return prev, self.values
+
+class Engine:
+    """Evaluates alert rules against newly committed daily bars.
+
+    quotes(symbols) returns raw real-time quotes (one batched upstream call
+    per QuoteService chunk); load(symbol, from_d, to_d) returns committed
+    bars ({time, open, high, low, close}). A symbol is seeded once, then a
+    day change in its quote triggers a fetch of just the bars since its
+    last committed day; each new bar costs one LastBar.push and the checks
+    of that symbol's rules, whatever the length of its history.
+
+    Only the worker holding the shared "alerts:cycle" lock evaluates; it
+    renews the lock as the cycle goes and stops if the lock was lost. The
+    per-symbol day already reported is kept in the shared cache, so a
+    worker taking over seeds up to that day and evaluates the bars after
+    it: none is dispatched twice or skipped.
+    """
+
+    def __init__(self, quotes, load, warmup_days, interval=POLL_SECONDS, webhook=WEBHOOK_URL):
+        self.quotes = quotes
+        self.load = load
+        self.warmup_days = warmup_days
+        self.interval = interval
+        self.webhook = webhook
+        self.rules = Rules()
+        self.symbols = {}
+        self.events = deque(maxlen=EVENTS_KEPT)
+        self.stats = {"cycles": 0, "bars": 0, "checks": 0, "fired": 0, "seeded": 0, "errors": 0, "dropped": 0}
+        self._outbox = queue.Queue(maxsize=1000)
+        self._stop = threading.Event()
+        self._threads = []
+
+    def _seed(self, symbol, day, done=None):
+        """(state, bars still to evaluate) for a symbol new to this worker.
+
+        The state covers the bars up to done, the last day already reported
+        (by any worker), or up to the day before day if none was reported.
+        """
+        bars = self.load(symbol, day - timedelta(days=self.warmup_days), day - timedelta(days=1))
+        self.stats["seeded"] += 1
+        if not bars:
+            return None, []
+        k = len(bars) if done is None else max(1, sum(1 for b in bars if b["time"] <= done))
+        return _Symbol(bars[:k]), bars[k:]
+
+    def cycle(self, renew=None):
+        """One poll over all symbols with rules; returns the events fired.
+
+        renew() is called every RENEW_SECONDS, after saving the progress so
+        far; when it returns False (the cycle lock passed to another worker)
+        the cycle stops.
+        """
+        by_symbol = {}
+        for rule in self.rules.all().values():
+            by_symbol.setdefault(rule["symbol"], []).append(rule)
+        for gone in set(self.symbols) - set(by_symbol):
+            del self.symbols[gone]
+        if not by_symbol:
+            return []
+        start = time.monotonic()
+        quotes = self.quotes(list(by_symbol))
+        progress = shared.get("alerts:progress") or {}
+        fired = []
+        renewed = start
+        for symbol, rules in by_symbol.items():
+            if renew is not None and time.monotonic() - renewed > RENEW_SECONDS:
+                shared.put("alerts:progress", progress, KEEP)
+                if not renew():
+                    print("[alerts] cycle lock lost, stopping", flush=True)
+                    return fired
+                renewed = time.monotonic()
+            bar = live.parse_tick(quotes.get(symbol))
+            if bar is None:
+                continue
+            try:
+                fired.extend(self._advance(symbol, rules, date.fromisoformat(bar["time"]), progress))
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"[alerts] {symbol}: {e}", flush=True)
+        shared.put("alerts:progress", progress, KEEP)
+        self.stats["cycles"] += 1
+        return fired
+
+    def _advance(self, symbol, rules, quote_day, progress):
+        sym = self.symbols.get(symbol)
+        if sym is None:
+            sym, new = self._seed(symbol, quote_day, progress.get(symbol))
+            if sym is None:
+                return []
+            self.symbols[symbol] = sym
+            progress[symbol] = max(progress.get(symbol, ""), sym.day)
+        elif sym.quote_day == quote_day:
+            return []
+        else:
+            new = [b for b in self.load(symbol, date.fromisoformat(sym.day) + timedelta(days=1), quote_day - timedelta(days=1))
+                   if b["time"] > sym.day]
+        sym.quote_day = quote_day
+        fired = []
+        for bar in new:
+            prev, cur = sym.advance(bar)
+            self.stats["bars"] += 1
+            if bar["time"] <= progress.get(symbol, ""):
+                continue
+            for rule in rules:
+                self.stats["checks"] += 1
+                if check(rule, prev, cur):
+                    fired.append(self._fire(rule, cur))
+            progress[symbol] = bar["time"]
+        return fired
+
+    def _fire(self, rule, values):
+        event = {
+            "rule": rule["id"], "symbol": rule["symbol"], "time": values["time"], "condition": describe(rule),
+            "note": rule["note"], "close": values["close"],
+            "value": values.get(rule["field"]), "target": values.get(rule["ref"]) if rule["ref"] else rule["value"],
+            "sink": rule["sink"], "fired": time.time(),
+        }
+        self.events.append(event)
+        self.stats["fired"] += 1
+        try:
+            self._outbox.put_nowait(event)
+        except queue.Full:
+            self.stats["dropped"] += 1
+        return event
+
+    def recent(self, limit=100):
+        if shared.enabled():
+            return (shared.get("alerts:events") or [])[-limit:][::-1]
+        return list(self.events)[-limit:][::-1]
+
+    def _dispatch(self):
+        while True:
+            event = self._outbox.get()
+            if event is None:
+                return
+            if shared.enabled():
+                kept = shared.get("alerts:events") or []
+                shared.put("alerts:events", (kept + [event])[-EVENTS_KEPT:], KEEP)
+            if event["sink"] == "webhook" and self.webhook:
+                try:
+                    import requests
+                    requests.post(self.webhook, json=event, timeout=10)
+                    continue
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    print(f"[alerts] webhook failed: {e}", flush=True)
+            print(f"[alerts] {event['symbol']} {event['time']}: {event['condition']} (close {event['close']})", flush=True)
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                with shared.single_flight("alerts:cycle", timeout=0) as got:
+                    if got:
+                        self.cycle(lambda: shared.renew("alerts:cycle"))
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"[alerts] cycle failed: {e}", flush=True)
+
+    def start(self):
+        if self.interval <= 0 or self._threads:
+            return
+        self._stop.clear()
+        for target, name in ((self._dispatch, "alerts-dispatch"), (self._loop, "alerts-poll")):
+            t = threading.Thread(target=target, name=name, daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self):
+        self._stop.set()
+        if self._threads:
+            self._outbox.put(None)
+        self._threads = []
@@ -1,12 +1,45 @@
+import hashlib
+import json
 import os
-from datetime import date, timedelta
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent.futures import CancelledError
+from contextlib import asynccontextmanager, contextmanager
+from datetime import date, datetime, timedelta, timezone
 import math
-import requests
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import JSONResponse
+from backend import startup
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-
-EODHD_BASE = "https://eodhd.com/api"
+from backend import alerts, archive, breaker, crossasset, history, intraday, jobs, live, pipeline, profiles, quotes, shared, snapshot, sweep, symbols, tiles, warmup
+from backend.series import CandleSeries
+
+EODHD_BASE = os.getenv("EODHD_BASE", "https://eodhd.com/api")
+LIVE_WARMUP_DAYS = int(os.getenv("LIVE_WARMUP_DAYS", "2000"))
+TV_CACHE_TTL = float(os.getenv("TV_CACHE_TTL", "300"))
+IPO_CACHE_TTL = 7 * 24 * 3600
+CORR_CACHE_TTL = float(os.getenv("CORR_CACHE_TTL", "300"))
+TV_INDICATORS = (
+    ("bb", 20), ("macd", 12, 26, 9), ("stoch", 14, 3), ("rsi", 14), ("psar",),
+    ("ema", 20), ("ema", 50), ("ema", 100), ("ema", 200),
+)
+TV_WARMUP_BARS = warmup.bars_needed(TV_INDICATORS)
+TV_MIN_BARS = 120
+TV_STALE_TTL = float(os.getenv("TV_STALE_TTL", str(7 * 24 * 3600)))
+TV_REFRESH_THREADS = int(os.getenv("TV_REFRESH_THREADS", "4"))
+ELLIOTT_MEMO_SIZE = int(os.getenv("ELLIOTT_MEMO_SIZE", "100000"))
+# The numpy stages release the GIL, so a per-worker thread pool overlaps
+# them at no extra memory. A process pool (TV_STAGE_WORKERS >= 2) spawns
+# that many full-app processes per worker and pickles the series to every
+# stage; it is opt-in, for hosts with spare cores and memory.
+TV_STAGE_THREADS = int(os.getenv("TV_STAGE_THREADS", "4"))
+TV_STAGE_WORKERS = int(os.getenv("TV_STAGE_WORKERS", "0"))
+DISCONNECT_POLL = 0.25
+
+upstream = breaker.Breaker("eodhd")
+heavy = jobs.JobQueue()
 
 def _key() -> str:
     k = os.getenv("EODHD_API_KEY") or os.getenv("EODHD_TOKEN")
@@ -15,8 +48,21 @@ def _key() -> str:
     return k
 
 def _get(path: str, params: dict):
+    import requests
     params = {**params, "api_token": _key(), "fmt": "json"}
-    r = requests.get(f"{EODHD_BASE}/{path}", params=params, timeout=40)
+    try:
+        upstream.before()
+    except breaker.CircuitOpen as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
+    try:
+        r = requests.get(f"{EODHD_BASE}/{path}", params=params, timeout=breaker.TIMEOUT)
+    except requests.RequestException as e:
+        upstream.failure()
+        raise HTTPException(status_code=502, detail=f"EODHD unreachable: {type(e).__name__}")
+    if r.status_code >= 500 or r.status_code == 429:
+        upstream.failure()
+    else:
+        upstream.success()
     if r.status_code != 200:
         raise HTTPException(status_code=502, detail=f"EODHD error {r.status_code}: {r.text[:300]}")
     try:
@@ -24,10 +70,80 @@ def _get(path: str, params: dict):
     except Exception:
         raise HTTPException(status_code=502, detail="EODHD returned non-JSON response")
 
+def _admit(request, lane):
+    """Admit a heavy request to the job queue, or answer 429.
+
+    Clients are told apart by an X-Client-Id header (the frontend sends
+    one per tab), else by address (the proxy's forwarded one, see
+    render.yaml). Only identified clients are capped per client and
+    supersede their previous request on the same lane: an address may
+    stand for many users, so it is only bounded by the queue itself.
+    """
+    client_id = request.headers.get("x-client-id", "")[:64]
+    if client_id:
+        client, limit = "id:" + client_id, None
+    else:
+        client, limit = request.client.host if request.client else "", heavy.slots + heavy.max_waiting
+    try:
+        return heavy.submit(client, lane if client_id else None, limit)
+    except jobs.Rejected as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
+
+@contextmanager
+def _slot(job):
+    """Hold a job queue slot for the block; a cancelled job gets 409/503."""
+    if job is None:
+        yield
+        return
+    try:
+        job.wait()
+        yield
+    except CancelledError:
+        raise HTTPException(status_code=409 if job.reason == jobs.SUPERSEDED else 503, detail=job.reason or "cancelled")
+    finally:
+        job.finish()
+
+async def _job_call(request, job, fn):
+    """Run fn() for job in a worker thread, watching the client meanwhile.
+
+    A client that goes away abandons the job, so fn stops at its next
+    cancellation check instead of finishing a result nobody receives.
+    """
+    import anyio
+    outcome = {}
+
+    async def call():
+        try:
+            outcome["value"] = await anyio.to_thread.run_sync(fn)
+        except Exception as e:
+            outcome["error"] = e
+        tg.cancel_scope.cancel()
+
+    async def watch():
+        while not await request.is_disconnected():
+            await anyio.sleep(DISCONNECT_POLL)
+        heavy.abandon(job)
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(watch)
+        tg.start_soon(call)
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["value"]
+
 def _get_fundamentals(symbol: str):
     return _get(f"fundamentals/{symbol}", {})
 
+_ipo_cache = {}
+
 def _ipo_date(symbol: str):
+    key = symbol.upper()
+    if key not in _ipo_cache:
+        iso = shared.get_or_compute(f"ipo:{key}", IPO_CACHE_TTL, lambda: _fetch_ipo_date(symbol).isoformat())
+        _ipo_cache[key] = date.fromisoformat(iso)
+    return _ipo_cache[key]
+
+def _fetch_ipo_date(symbol: str):
     try:
         f = _get_fundamentals(symbol)
         d = None
@@ -42,49 +158,33 @@ def _ipo_date(symbol: str):
         pass
     return date(1970,1,1)
 
-def _ema(values, span):
-    if not values:
-        return []
-    alpha = 2 / (span + 1)
-    out = [values[0]]
-    for v in values[1:]:
-        out.append(alpha * v + (1 - alpha) * out[-1])
-    return out
+def _nan_list(a):
+    return [None if v != v else v for v in a.tolist()]
 
-def _sma(values, period):
-    out = []
-    s = 0.0
-    for i, v in enumerate(values):
-        s += v
-        if i >= period:
-            s -= values[i - period]
-        out.append(None if i + 1 < period else s / period)
-    return out
+def _ema_array(values, span):
+    """EMA seeded with the first value, as a float64 array.
 
-def _std(values, period):
-    out = []
-    for i in range(len(values)):
-        if i + 1 < period:
-            out.append(None)
-            continue
-        window = values[i - period + 1 : i + 1]
-        m = sum(window) / period
-        var = sum((x - m) ** 2 for x in window) / period
-        out.append(math.sqrt(var))
+    out[i] = q * out[i - 1] + alpha * x[i] is solved as a prefix scan:
+    after the steps d = 1, 2, 4, ... each out[i] holds the sum of
+    q ** (i - j) * b[j] over all j <= i, in log2(n) array operations.
+    """
+    import numpy as np
+    alpha = 2 / (span + 1)
+    out = alpha * np.asarray(values, dtype=np.float64)
+    if len(out):
+        out[0] = values[0]
+    d = 1
+    while d < len(out):
+        out[d:] += (1 - alpha) ** d * out[:-d]
+        d *= 2
     return out
 
+def _ema(values, span):
+    return _ema_array(values, span).tolist()
+
 def _bb(values, period=20, std_mul=2.0):
-    mid = _sma(values, period)
-    sd = _std(values, period)
-    upper, lower = [], []
-    for m, s in zip(mid, sd):
-        if m is None or s is None:
-            upper.append(None)
-            lower.append(None)
-        else:
-            upper.append(m + std_mul * s)
-            lower.append(m - std_mul * s)
-    return upper, mid, lower
+    mid, sd = sweep.rolling_mean_std(values, period)
+    return _nan_list(mid + std_mul * sd), _nan_list(mid), _nan_list(mid - std_mul * sd)
 
 def _rsi(values, period=14):
     if len(values) < period + 1:
@@ -103,74 +203,95 @@ def _rsi(values, period=14):
     return [None] + rsi
 
 def _macd(values, fast=12, slow=26, signal=9):
-    ema_fast = _ema(values, fast)
-    ema_slow = _ema(values, slow)
-    n = len(values)
+    macd_line = _ema_array(values, fast) - _ema_array(values, slow)
+    if len(macd_line) < signal:
+        none = [None] * len(macd_line)
+        return macd_line.tolist(), none, list(none)
+    signal_line = _ema_array(macd_line, signal)
+    return macd_line.tolist(), signal_line.tolist(), (macd_line - signal_line).tolist()
 
-    macd_line = [None] * n
-    for i in range(n):
-        if i >= len(ema_fast) or i >= len(ema_slow):
-            continue
-        if ema_fast[i] is None or ema_slow[i] is None:
-            continue
-        macd_line[i] = ema_fast[i] - ema_slow[i]
-
-    signal_line = [None] * n
-    macd_vals = [x for x in macd_line if x is not None]
-
-    if len(macd_vals) >= signal:
-        signal_vals = _ema(macd_vals, signal)
-        j = 0
-        for i in range(n):
-            if macd_line[i] is not None:
-                signal_line[i] = signal_vals[j]
-                j += 1
-
-    hist = [None] * n
-    for i in range(n):
-        if macd_line[i] is None or signal_line[i] is None:
-            continue
-        hist[i] = macd_line[i] - signal_line[i]
+def _stoch(highs, lows, closes, period=14, smooth_d=3):
+    import numpy as np
+    c = np.asarray(closes, dtype=np.float64)
+    n = len(c)
+    if not n:
+        return [], []
+    k = np.full(n, np.nan)
+    if n >= period:
+        hh = np.lib.stride_tricks.sliding_window_view(np.asarray(highs, dtype=np.float64), period).max(axis=1)
+        ll = np.lib.stride_tricks.sliding_window_view(np.asarray(lows, dtype=np.float64), period).min(axis=1)
+        denom = hh - ll
+        with np.errstate(invalid="ignore", divide="ignore"):
+            k[period - 1:] = np.where(denom == 0, 0.0, 100.0 * (c[period - 1:] - ll) / denom)
+    valid = ~np.isnan(k)
+    pad = np.zeros(smooth_d - 1)
+    total = np.lib.stride_tricks.sliding_window_view(np.concatenate([pad, np.where(valid, k, 0.0)]), smooth_d).sum(axis=1)
+    count = np.lib.stride_tricks.sliding_window_view(np.concatenate([pad, valid]), smooth_d).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        d = np.where(count > 0, total / count, np.nan)
+    return _nan_list(k), _nan_list(d)
+
+def _psar(highs, lows, af=0.02, af_max=0.2):
+    n = len(highs)
+    out = [None] * n
+    if n == 0:
+        return out
+    bull = True
+    ep = lows[0]
+    sar = lows[0]
+    a = af
+    out[0] = sar
+    for i in range(1, n):
+        hi = highs[i]
+        lo = lows[i]
+        sar = sar + a * (ep - sar)
+        if bull:
+            if lo < sar:
+                bull = False
+                sar = ep
+                ep = lo
+                a = af
+            else:
+                if hi > ep:
+                    ep = hi
+                    a = min(af_max, a + af)
+                sar = min(sar, lows[i - 1], lows[i - 2] if i > 1 else lows[i - 1])
+        else:
+            if hi > sar:
+                bull = True
+                sar = ep
+                ep = hi
+                a = af
+            else:
+                if lo < ep:
+                    ep = lo
+                    a = min(af_max, a + af)
+                sar = max(sar, highs[i - 1], highs[i - 2] if i > 1 else highs[i - 1])
+        out[i] = sar
+    return out
 
-    return macd_line, signal_line, hist
 
-def _stoch(highs, lows, closes, period=14, smooth_d=3):
-    k = [None] * len(closes)
-    for i in range(len(closes)):
-        if i + 1 < period:
-            continue
-        hh = max(highs[i - period + 1 : i + 1])
-        ll = min(lows[i - period + 1 : i + 1])
-        denom = (hh - ll)
-        k[i] = 0.0 if denom == 0 else 100.0 * (closes[i] - ll) / denom
-    d = [None] * len(closes)
-    for i in range(len(closes)):
-        window = [x for x in k[max(0, i - smooth_d + 1): i + 1] if x is not None]
-        d[i] = (sum(window) / len(window)) if window else None
-    return k, d
-
-
-def _calc_signal(candles, overlays, elliott):
+def _calc_signal(candles, overlays, elliott, profile=None):
     if not candles or len(candles) < 20:
         return {"score": 0, "signal": "NEUTRAL", "reasons": [], "details": {}}
 
-    closes = [c["close"] for c in candles]
-    highs = [c["high"] for c in candles]
-    lows = [c["low"] for c in candles]
+    closes = candles.close
+    lows = candles.low
 
+    w = profile or profiles.DEFAULT
     score = 0
     reasons = []
     details = {}
 
     def get_series(name):
-        return [item.get(name) for item in overlays if isinstance(item, dict)]
+        return list(overlays.get(name) or [])
 
     bb_upper = get_series("bb_upper")
     bb_lower = get_series("bb_lower")
     ema20 = get_series("ema20")
     ema50 = get_series("ema50")
     ema200 = get_series("ema200")
-    rsi = get_series("rsi")
+    rsi = get_series("rsi14")
     macd_hist = get_series("macd_hist")
     stoch_k = get_series("stoch_k")
     stoch_d = get_series("stoch_d")
@@ -182,15 +303,15 @@ def _calc_signal(candles, overlays, elliott):
         bl_prev = bb_lower[-2]
         bu = bb_upper[-1] if bb_upper else None
         if last <= bl * 1.005:
-            score += 2
+            score += w["bb"]
             reasons.append("Kurs an unterem Bollinger Band")
             details["bb"] = "bullish"
         elif lows[-1] <= bl and closes[-1] > bl:
-            score += 2
+            score += w["bb"]
             reasons.append("Kurs kreuzt unteres Bollinger Band nach oben")
             details["bb"] = "bullish"
         elif bu and last >= bu * 0.995:
-            score -= 2
+            score -= w["bb"]
             reasons.append("Kurs an oberem Bollinger Band")
             details["bb"] = "bearish"
         else:
@@ -200,7 +321,7 @@ def _calc_signal(candles, overlays, elliott):
             e20 = ema20[-1]; e50 = ema50[-1]; e200 = ema200[-1]
             if last < e20 and last < e50 and last < e200:
                 if details.get("bb") == "bullish":
-                    score += 1
+                    score += w["ema_bonus"]
                     reasons.append("Kurs unter allen EMAs (Bollinger Bonus)")
             details["ema_trend"] = "bullish" if last > e200 else "bearish"
 
@@ -213,21 +334,21 @@ def _calc_signal(candles, overlays, elliott):
         if r_prev < 30 and r >= 30:
             impulse = r - min(rsi[-5:])
             if impulse >= 8:
-                score += 3
+                score += w["rsi_strong"]
                 reasons.append(f"RSI V-Form Durchbruch über 30 (stark, +{impulse:.0f})")
                 details["rsi"] = "strong_bullish"
             else:
-                score += 1
+                score += w["rsi_weak"]
                 reasons.append("RSI kreuzt 30 nach oben (schwach)")
                 details["rsi"] = "weak_bullish"
         elif r_prev > 70 and r <= 70:
             impulse = max(rsi[-5:]) - r
             if impulse >= 8:
-                score -= 3
+                score -= w["rsi_strong"]
                 reasons.append(f"RSI V-Form Durchbruch unter 70 (stark, -{impulse:.0f})")
                 details["rsi"] = "strong_bearish"
             else:
-                score -= 1
+                score -= w["rsi_weak"]
                 reasons.append("RSI kreuzt 70 nach unten (schwach)")
                 details["rsi"] = "weak_bearish"
         elif r < 30:
@@ -246,19 +367,19 @@ def _calc_signal(candles, overlays, elliott):
             details["macd_hist"] = round(last_mh, 3)
 
             if last_mh >= 0 and prev_mh < 0:
-                score += 2
+                score += w["macd_cross"]
                 reasons.append("MACD kreuzt 0-Linie nach oben")
                 details["macd"] = "bullish_cross"
             elif last_mh <= 0 and prev_mh > 0:
-                score -= 2
+                score -= w["macd_cross"]
                 reasons.append("MACD kreuzt 0-Linie nach unten")
                 details["macd"] = "bearish_cross"
             elif last_mh < 0 and prev_mh < last_mh and prev2_mh < prev_mh:
-                score += 1
+                score += w["macd_pre"]
                 reasons.append("MACD Histogramm steigt (Vorbote)")
                 details["macd"] = "pre_bullish"
             elif last_mh > 0 and prev_mh > last_mh and prev2_mh > prev_mh:
-                score -= 1
+                score -= w["macd_pre"]
                 reasons.append("MACD Histogramm sinkt (Vorbote)")
                 details["macd"] = "pre_bearish"
             else:
@@ -276,19 +397,19 @@ def _calc_signal(candles, overlays, elliott):
         d_cross_dn = sd_p > 80 and sd <= 80
 
         if k_cross_up and d_cross_up:
-            score += 3
+            score += w["stoch_both"]
             reasons.append("Stochastik: beide Linien kreuzen 20 nach oben")
             details["stoch"] = "strong_bullish"
         elif k_cross_up or d_cross_up:
-            score += 2
+            score += w["stoch_one"]
             reasons.append("Stochastik kreuzt 20 nach oben")
             details["stoch"] = "bullish"
         elif k_cross_dn and d_cross_dn:
-            score -= 3
+            score -= w["stoch_both"]
             reasons.append("Stochastik: beide Linien kreuzen 80 nach unten")
             details["stoch"] = "strong_bearish"
         elif k_cross_dn or d_cross_dn:
-            score -= 2
+            score -= w["stoch_one"]
             reasons.append("Stochastik kreuzt 80 nach unten")
             details["stoch"] = "bearish"
         elif sk < 20 and sd < 20:
@@ -302,23 +423,23 @@ def _calc_signal(candles, overlays, elliott):
         structure = elliott.get("current_structure", "")
         direction = elliott.get("direction", "")
         if "Welle 3" in structure and direction == "bullish":
-            score += 1
+            score += w["elliott"]
             reasons.append("Elliott: Welle 3 bullish aktiv")
         elif "Korrektur" in structure and score > 0:
-            score -= 1
+            score -= w["elliott"]
             reasons.append("Elliott: Korrekturphase dämpft Signal")
         elif "Welle 2" in structure or "Welle 4" in structure:
             if score > 0:
-                score += 1
+                score += w["elliott"]
                 reasons.append("Elliott: Korrekturwelle – Einstiegschance")
 
-    if score >= 4:
+    if score >= w["strong"]:
         signal = "STARKES KAUFSIGNAL"
-    elif score >= 2:
+    elif score >= w["buy"]:
         signal = "KAUFSIGNAL"
-    elif score <= -4:
+    elif score <= -w["strong"]:
         signal = "STARKES VERKAUFSSIGNAL"
-    elif score <= -2:
+    elif score <= -w["buy"]:
         signal = "VERKAUFSSIGNAL"
     else:
         signal = "NEUTRAL"
@@ -333,17 +454,23 @@ def _calc_signal(candles, overlays, elliott):
 def _sr_levels(candles, pivot_left=6, pivot_right=6, tol_pct=0.008, max_levels=30, current_price=None, price_range_pct=0.50):
     if not candles or len(candles) < (pivot_left + pivot_right + 10):
         return []
+    pivots = _sr_pivots(candles, pivot_left, pivot_right)
+    return _sr_cluster(pivots, tol_pct, max_levels, current_price, price_range_pct)
+
+def _sr_pivots(candles, pivot_left=6, pivot_right=6):
     pivots = []
     n = len(candles)
+    lows = candles.low.tolist()
+    highs = candles.high.tolist()
     for i in range(pivot_left, n - pivot_right):
-        lo = candles[i]["low"]
-        hi = candles[i]["high"]
+        lo = lows[i]
+        hi = highs[i]
         is_low = True
         is_high = True
         for j in range(i - pivot_left, i + pivot_right + 1):
-            if candles[j]["low"] < lo:
+            if lows[j] < lo:
                 is_low = False
-            if candles[j]["high"] > hi:
+            if highs[j] > hi:
                 is_high = False
             if not is_low and not is_high:
                 break
@@ -351,6 +478,9 @@ def _sr_levels(candles, pivot_left=6, pivot_right=6, tol_pct=0.008, max_levels=3
             pivots.append(("support", float(lo)))
         if is_high:
             pivots.append(("resistance", float(hi)))
+    return pivots
+
+def _sr_cluster(pivots, tol_pct=0.008, max_levels=30, current_price=None, price_range_pct=0.50):
     if not pivots:
         return []
     if current_price and current_price > 0:
@@ -388,7 +518,40 @@ def _sr_levels(candles, pivot_left=6, pivot_right=6, tol_pct=0.008, max_levels=3
     all_lvls.sort(key=lambda x: (-x["strength"], x["type"]))
     return all_lvls[:max_levels]
 
-app = FastAPI()
+_snapshot_state = {}
+_snapshot_done = threading.Event()
+_snapshot_done.set()
+
+def _restore_snapshot():
+    try:
+        _snapshot_state["restored"] = snapshot.restore(TV_CACHE_TTL)
+    except Exception as e:
+        _snapshot_state["restore_error"] = str(e)
+    _snapshot_done.set()
+    startup.mark("snapshot_restored")
+
+@asynccontextmanager
+async def _lifespan(app):
+    startup.mark("app_ready")
+    if snapshot.ephemeral():
+        print(f"[snapshot] {snapshot.SNAPSHOT_PATH} is in the temp dir and will not survive a host restart; "
+              "point SNAPSHOT_PATH at a persistent disk (see render.yaml)", flush=True)
+    _snapshot_done.clear()
+    threading.Thread(target=_restore_snapshot, name="snapshot-restore", daemon=True).start()
+    alert_engine.start()
+    yield
+    alert_engine.stop()
+    try:
+        _snapshot_state["saved"] = snapshot.save()
+    except Exception as e:
+        print(f"[snapshot] save failed: {e}", flush=True)
+    pool = _stage_pool.pop(os.getpid(), None)
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+    while _refresh_pool:
+        _refresh_pool.pop().shutdown(wait=False, cancel_futures=True)
+
+app = FastAPI(lifespan=_lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -399,20 +562,180 @@ app.add_middleware(
 
 @app.get("/health")
 def health():
+    startup.mark("first_health")
     return {"status": "ok"}
 
+@app.get("/api/startup")
+def startup_info():
+    return {"phases": startup.phases(), "snapshot": _snapshot_state}
+
+@app.get("/api/elliott/memo")
+def elliott_memo():
+    return _memo_info()
+
+@app.get("/api/jobs")
+def jobs_info():
+    return heavy.info()
+
+@app.get("/api/upstream")
+def upstream_info():
+    return upstream.state()
+
+def _live_seed(symbol, day):
+    return _daily_bars(symbol, day - timedelta(days=LIVE_WARMUP_DAYS), day)
+
+def _daily_bars(symbol, from_d, to_d):
+    raw = history.daily(symbol, from_d, to_d, _get) or []
+    out = []
+    for r in raw:
+        try:
+            c = float(r["close"]); h = float(r["high"]); l = float(r["low"])
+            o = float(r["open"]) if r.get("open") is not None else c
+        except (KeyError, TypeError, ValueError):
+            continue
+        if c <= 0 or h <= 0 or l <= 0 or h < l:
+            continue
+        out.append({"time": r["date"], "open": o, "high": h, "low": l, "close": c})
+    return out
+
+quote_service = quotes.QuoteService(lambda symbols: quotes.fetch_many(_get, symbols))
+alert_engine = alerts.Engine(
+    quotes=quote_service.get_many,
+    load=_daily_bars,
+    warmup_days=(date.today() - warmup.fetch_start(date.today(), "d", TV_WARMUP_BARS)).days,
+)
+
+def _symbol_list(symbols: str):
+    try:
+        return quotes.parse_symbols(symbols)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/quote")
+def quote(symbol: str = Query(..., min_length=1, max_length=32)):
+    data = quote_service.get(symbol)
+    error = quotes.problem(data)
+    if error:
+        raise HTTPException(status_code=502, detail=error)
+    return data
+
+@app.get("/api/quotes")
+def quotes_batch(symbols: str = Query(..., min_length=1, max_length=20000)):
+    wanted = _symbol_list(symbols)
+    found = quote_service.get_many(wanted)
+    return {
+        "quotes": {s.upper(): found[s.upper()] for s in wanted if s.upper() in found},
+        "missing": [s for s in wanted if s.upper() not in found],
+    }
+
+@app.get("/v1/resolve")
+def resolve(
+    q: str = Query(..., min_length=1, max_length=64),
+    prefer: str = Query("", max_length=16),
+    limit: int = Query(10, ge=1, le=50),
+):
+    return symbols.index(_get).search(q, prefer, limit)
+
+async def _cached_json(request, lane, key, ttl, compute):
+    """JSON response for compute(), cached as text in the shared cache.
+
+    On a miss the request is admitted to lane of the job queue and
+    compute() runs under _job_call, so a client that goes away frees its
+    slot. The slot is taken before the compute lock.
+    """
+    import anyio
+    text = await anyio.to_thread.run_sync(shared.get_raw, key)
+    if text is None:
+        job = _admit(request, lane)
+        text = await _job_call(request, job, lambda: _cached_compute(key, ttl, compute, job))
+    return Response(text, media_type="application/json")
+
+def _cached_compute(key, ttl, compute, job):
+    with _slot(job), shared.single_flight(f"compute:{key}"):
+        text = shared.get_raw(key)
+        if text is None:
+            if job.cancelled.is_set():
+                raise CancelledError(job.reason)
+            text = json.dumps(compute(), separators=(",", ":"))
+            shared.put_raw(key, text, ttl)
+    return text
+
+@app.get("/api/correlation")
+async def correlation(
+    request: Request,
+    symbols: str = Query(..., min_length=1, max_length=20000),
+    benchmark: str = Query("", max_length=32),
+    days: int = Query(730, ge=30, le=20000),
+    window: int = Query(60, ge=0, le=5000),
+    series: int = Query(0, ge=0, le=1),
+):
+    wanted = _symbol_list(symbols)
+    bench = benchmark.strip().upper() or None
+    if bench is not None and bench not in (s.upper() for s in wanted):
+        wanted.append(bench)
+    to_d = date.today()
+    spec = f"{','.join(s.upper() for s in wanted)}|{bench}|{days}|{window}|{series}|{to_d.isoformat()}"
+
+    def compute():
+        loaded = crossasset.load(wanted, to_d - timedelta(days=days), to_d, _get)
+        return crossasset.compute(loaded, window, bench, bool(series))
+
+    return await _cached_json(request, "correlation", "corr:" + hashlib.sha1(spec.encode()).hexdigest(), CORR_CACHE_TTL, compute)
+
+live_hub = live.Hub(fetch=quote_service.get, seed=_live_seed)
+
+@app.post("/api/alerts")
+def alert_add(
+    symbol: str = Query(..., min_length=1, max_length=32),
+    field: str = Query(..., max_length=20),
+    op: str = Query(..., max_length=20),
+    value: float | None = Query(None),
+    ref: str | None = Query(None, max_length=20),
+    sink: str = Query("log", max_length=10),
+    note: str = Query("", max_length=200),
+):
+    """Register a condition checked on each newly committed daily bar."""
+    try:
+        rule = alerts.make_rule(symbol, field, op, value, ref, sink, note)
+        return alert_engine.rules.add(rule)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/alerts")
+def alert_list():
+    rules = sorted(alert_engine.rules.all().values(), key=lambda r: r["created"])
+    return {"rules": rules, "stats": alert_engine.stats, "tracked": len(alert_engine.symbols)}
+
+@app.delete("/api/alerts/{rule_id}")
+def alert_remove(rule_id: str):
+    if not alert_engine.rules.remove(rule_id):
+        raise HTTPException(status_code=404, detail="Unknown alert rule")
+    return {"removed": rule_id}
+
+@app.get("/api/alerts/events")
+def alert_events(limit: int = Query(100, ge=1, le=alerts.EVENTS_KEPT)):
+    return {"events": alert_engine.recent(limit)}
+
+@app.get("/api/stream")
+async def stream(symbol: str = Query(..., min_length=1, max_length=32)):
+    return StreamingResponse(
+        live_hub.events(symbol),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 def _calc_atr(candles, period=14):
+    highs = candles.high
+    lows = candles.low
+    closes = candles.close
     if len(candles) < period + 1:
-        closes = [c["close"] for c in candles]
-        highs = [c["high"] for c in candles]
-        lows = [c["low"] for c in candles]
         trs = [highs[i] - lows[i] for i in range(len(candles))]
         return sum(trs) / len(trs) if trs else 0.01
     trs = []
     for i in range(1, len(candles)):
-        hi = candles[i]["high"]
-        lo = candles[i]["low"]
-        pc = candles[i-1]["close"]
+        hi = highs[i]
+        lo = lows[i]
+        pc = closes[i-1]
         trs.append(max(hi - lo, abs(hi - pc), abs(lo - pc)))
     atr = sum(trs[-period:]) / period
     return atr
@@ -422,13 +745,18 @@ def _zigzag_pivots(candles, deviation=0.06, min_bars=8):
         return []
 
     atr = _calc_atr(candles, period=14)
-    mid_price = candles[len(candles)//2]["close"] or 1.0
+    mid_price = candles.close[len(candles)//2] or 1.0
     atr_pct = atr / mid_price if mid_price > 0 else deviation
     adaptive_dev = max(min(atr_pct * 1.5, 0.12), 0.03)
+    return _zigzag_scan(candles, adaptive_dev, min_bars)
+
+def _zigzag_scan(candles, adaptive_dev, min_bars=8):
+    highs = candles.high
+    lows = candles.low
 
     pivots = []
     last_idx = 0
-    last_price = candles[0]["close"]
+    last_price = candles.close[0]
     trend = 0
     extreme_idx = 0
     extreme_price = last_price
@@ -439,8 +767,8 @@ def _zigzag_pivots(candles, deviation=0.06, min_bars=8):
         return (a - b) / b
 
     for i in range(1, len(candles)):
-        hi = candles[i]["high"]
-        lo = candles[i]["low"]
+        hi = highs[i]
+        lo = lows[i]
 
         if trend == 0:
             up = pct(hi, last_price)
@@ -461,7 +789,7 @@ def _zigzag_pivots(candles, deviation=0.06, min_bars=8):
                 extreme_idx = i
             rev = pct(extreme_price, lo)
             if rev >= adaptive_dev and (i - extreme_idx) >= min_bars:
-                pivots.append({"idx": extreme_idx, "time": candles[extreme_idx]["time"], "price": float(extreme_price), "type": "H"})
+                pivots.append({"idx": extreme_idx, "time": candles.time(extreme_idx), "price": float(extreme_price), "type": "H"})
                 trend = -1
                 last_idx = extreme_idx
                 last_price = extreme_price
@@ -474,7 +802,7 @@ def _zigzag_pivots(candles, deviation=0.06, min_bars=8):
                 extreme_idx = i
             rev = pct(hi, extreme_price)
             if rev >= adaptive_dev and (i - extreme_idx) >= min_bars:
-                pivots.append({"idx": extreme_idx, "time": candles[extreme_idx]["time"], "price": float(extreme_price), "type": "L"})
+                pivots.append({"idx": extreme_idx, "time": candles.time(extreme_idx), "price": float(extreme_price), "type": "L"})
                 trend = 1
                 last_idx = extreme_idx
                 last_price = extreme_price
@@ -482,9 +810,9 @@ def _zigzag_pivots(candles, deviation=0.06, min_bars=8):
                 extreme_price = hi
 
     if trend == 1:
-        pivots.append({"idx": extreme_idx, "time": candles[extreme_idx]["time"], "price": float(extreme_price), "type": "H"})
+        pivots.append({"idx": extreme_idx, "time": candles.time(extreme_idx), "price": float(extreme_price), "type": "H"})
     elif trend == -1:
-        pivots.append({"idx": extreme_idx, "time": candles[extreme_idx]["time"], "price": float(extreme_price), "type": "L"})
+        pivots.append({"idx": extreme_idx, "time": candles.time(extreme_idx), "price": float(extreme_price), "type": "L"})
 
     pivots = sorted(pivots, key=lambda x: x["idx"])
     cleaned = []
@@ -605,6 +933,72 @@ def _score_abc(seq):
         "wa": wa, "wb": wb, "wc": wc,
     }
 
+_window_memo = OrderedDict()
+_window_lock = threading.Lock()
+_window_stats = {kind: {"hits": 0, "misses": 0} for kind in ("sequence", "impulse", "abc")}
+
+def _memo(key, compute):
+    kind = key[0]
+    with _window_lock:
+        value = _window_memo.get(key, _window_memo)
+        if value is not _window_memo:
+            _window_memo.move_to_end(key)
+            _window_stats[kind]["hits"] += 1
+            return value
+        _window_stats[kind]["misses"] += 1
+    value = compute()
+    with _window_lock:
+        _window_memo[key] = value
+        while len(_window_memo) > ELLIOTT_MEMO_SIZE:
+            _window_memo.popitem(last=False)
+    return value
+
+def _window_score(kind, fn, seq):
+    """Score of a pivot window (None if invalid), memoized on its types and
+    prices, the only pivot fields the scoring reads."""
+    def compute():
+        scored = fn(seq)
+        return None if scored is None else scored["score"]
+    return _memo((kind,) + tuple((p["type"], p["price"]) for p in seq), compute)
+
+def _best_windows(pivots):
+    """(start, adjusted score) of the best impulse window and start of the best ABC window.
+
+    Memoized on the whole pivot sequence. When it changed, usually only
+    at its last pivot, the windows of the unchanged prefix are found in
+    the memo and only those touching new or moved pivots are rescored.
+    """
+    def compute():
+        n = len(pivots)
+        last_time = pivots[-1]["time"] if pivots else ""
+        best = best_adj = None
+        for i in range(0, n - 5):
+            score = _window_score("impulse", _score_impulse, pivots[i:i+6])
+            if score is None or score < 8.0:
+                continue
+            wave5_time = pivots[i + 5]["time"]
+            if last_time and wave5_time[:4] < str(int(last_time[:4]) - 1):
+                continue
+            adjusted = score + i / max(n - 5, 1) * 6.0
+            if best is None or adjusted > best_adj:
+                best, best_adj = i, adjusted
+        abc = abc_score = None
+        if best is None:
+            for i in range(n - 2):
+                score = _window_score("abc", _score_abc, pivots[i:i+3])
+                if score is not None and (abc is None or score > abc_score):
+                    abc, abc_score = i, score
+        return best, best_adj, abc
+    return _memo(("sequence",) + tuple((p["time"], p["type"], p["price"]) for p in pivots), compute)
+
+def _memo_info():
+    with _window_lock:
+        out = {"windows": len(_window_memo)}
+        for kind, st in _window_stats.items():
+            total = st["hits"] + st["misses"]
+            out[kind] = {**st, "hit_rate": round(st["hits"] / total, 4) if total else None}
+    return out
+
 def _determine_current_wave(pivots, best):
     if not best or not best.get("points"):
         return "unknown", None
@@ -663,23 +1057,11 @@ def _fibonacci_targets(best, pivots):
 def _best_impulse(pivots):
     if len(pivots) < 5:
         return None
-    best = None
-    n = len(pivots)
-    last_time = pivots[-1]["time"] if pivots else ""
-    for i in range(0, n - 5):
-        seq = pivots[i:i+6]
-        scored = _score_impulse(seq)
-        if scored is None:
-            continue
-        if scored["score"] < 8.0:
-            continue
-        wave5_time = seq[5]["time"]
-        if last_time and wave5_time[:4] < str(int(last_time[:4]) - 1):
-            continue
-        recency = i / max(n - 5, 1)
-        scored["adjusted"] = scored["score"] + recency * 6.0
-        if best is None or scored["adjusted"] > best["adjusted"]:
-            best = scored
+    i, adjusted, _ = _best_windows(pivots)
+    if i is None:
+        return None
+    best = _score_impulse(pivots[i:i+6])
+    best["adjusted"] = adjusted
     return best
 
 def _momentum_score(candles, p_start, p_end):
@@ -687,10 +1069,9 @@ def _momentum_score(candles, p_start, p_end):
         return 0.0
     start_idx = p_start.get("idx", 0)
     end_idx = p_end.get("idx", len(candles)-1)
-    segment = candles[start_idx:end_idx+1]
-    if len(segment) < 5:
+    closes = candles.close[start_idx:end_idx+1]
+    if len(closes) < 5:
         return 0.0
-    closes = [c["close"] for c in segment]
     if len(closes) < 2:
         return 0.0
     score = 0.0
@@ -716,11 +1097,8 @@ def _build_elliott_analysis(pivots, candles=None):
     best = _best_impulse(pivots)
 
     if not best:
-        abc = None
-        for i in range(len(pivots) - 2):
-            r = _score_abc(pivots[i:i+3])
-            if r and (abc is None or r["score"] > abc["score"]):
-                abc = r
+        _, _, i = _best_windows(pivots)
+        abc = None if i is None else _score_abc(pivots[i:i+3])
         if abc:
             return {
                 "current_structure": "ABC-Korrektur",
@@ -898,84 +1276,607 @@ def _elliott_labels(pivots, candles=None):
     result = _build_elliott_analysis(pivots, candles=candles)
     return result
 
+def _bucket_edges(n, buckets):
+    return [(k * n) // buckets for k in range(buckets + 1)]
+
+def _downsample_candles(candles, edges, picks):
+    out = {k: [] for k in CANDLE_KEYS}
+    for k in range(len(edges) - 1):
+        a, b = edges[k], edges[k + 1]
+        out["time"].append(candles.time(picks[k]))
+        out["open"].append(candles.open[a])
+        out["high"].append(max(candles.high[a:b]))
+        out["low"].append(min(candles.low[a:b]))
+        out["close"].append(candles.close[b - 1])
+    return out
+
+def _lttb_pick(values, edges):
+    buckets = len(edges) - 1
+    picks = [None] * buckets
+    prev = None
+    for k in range(buckets):
+        lo, hi = edges[k], edges[k + 1]
+        cand = [i for i in range(lo, hi) if values[i] is not None]
+        if not cand:
+            continue
+        if k == 0 or k == buckets - 1 or prev is None:
+            best = cand[0] if k == 0 or prev is None else cand[-1]
+        else:
+            nxt = [values[i] for i in range(edges[k + 1], edges[k + 2]) if values[i] is not None]
+            ax, ay = prev, values[prev]
+            bx = (edges[k + 1] + edges[k + 2] - 1) / 2.0
+            by = sum(nxt) / len(nxt) if nxt else values[cand[-1]]
+            best = cand[0]
+            best_area = -1.0
+            for i in cand:
+                area = abs((ax - bx) * (values[i] - ay) - (ax - i) * (by - ay))
+                if area > best_area:
+                    best_area = area
+                    best = i
+        picks[k] = best
+        prev = best
+    return picks
+
+def _keep_extremes(values, edges):
+    """One value per bucket, its min or max, chosen so extremes survive.
+
+    The buckets holding the overall max and min keep them (a bucket
+    holding both keeps the one fewer other buckets hold). Elsewhere a
+    bucket whose max is a peak among its neighbours' maxes keeps it, one
+    whose min is a trough keeps that (the more prominent if both), and any
+    other bucket keeps whichever is further from the previous kept value.
+    """
+    n = len(edges) - 1
+    lo, hi, first = [None] * n, [None] * n, [None] * n
+    for k in range(n):
+        vals = [v for v in values[edges[k]:edges[k + 1]] if v is not None]
+        if vals:
+            lo[k], hi[k], first[k] = min(vals), max(vals), vals[0]
+    top = max((v for v in hi if v is not None), default=None)
+    bottom = min((v for v in lo if v is not None), default=None)
+    top_first = hi.count(top) <= lo.count(bottom)
+    out = [None] * n
+    prev = None
+    for k in range(n):
+        if hi[k] is None:
+            continue
+        near = [j for j in (k - 1, k + 1) if 0 <= j < n and hi[j] is not None]
+        rise = hi[k] - max((hi[j] for j in near), default=hi[k])
+        fall = min((lo[j] for j in near), default=lo[k]) - lo[k]
+        if hi[k] == top and lo[k] == bottom:
+            prev = hi[k] if top_first else lo[k]
+        elif hi[k] == top or lo[k] == bottom:
+            prev = hi[k] if hi[k] == top else lo[k]
+        elif rise >= 0 or fall >= 0:
+            prev = hi[k] if rise > fall else lo[k]
+        else:
+            ref = first[k] if prev is None else prev
+            prev = hi[k] if hi[k] - ref >= ref - lo[k] else lo[k]
+        out[k] = prev
+    return out
+
+def _downsample(candles, overlays, max_points):
+    """max_points OHLC buckets, each stamped with one bar of the bucket.
+
+    LTTB over the closes picks the bar whose time stamps the bucket's
+    candle and overlay rows. Each overlay keeps the bucket's min or max
+    (see _keep_extremes) so its extremes survive, and the overlay close is
+    the candle's close.
+    """
+    edges = _bucket_edges(len(candles), max_points)
+    picks = _lttb_pick(candles.close, edges)
+    ds_candles = _downsample_candles(candles, edges, picks)
+    ds_overlays = {k: _keep_extremes(col, edges) for k, col in overlays.items() if k not in ("time", "close")}
+    return ds_candles, {"time": ds_candles["time"], "close": ds_candles["close"], **ds_overlays}
+
+OVERLAY_KEYS = (
+    "time", "close", "bb_upper", "bb_middle", "bb_lower", "ema20", "ema50", "ema100", "ema200",
+    "rsi14", "stoch_k", "stoch_d", "macd", "macd_signal", "macd_hist", "psar",
+)
+CANDLE_KEYS = ("time", "open", "high", "low", "close")
+STREAM_BATCH = 512
+
+def _tv_intraday(symbol, period, full, days):
+    now = int(time.time())
+    start = 0 if int(full) == 1 else now - days * 86400
+    today = date.today()
+    warm = (today - warmup.fetch_start(today, period, TV_WARMUP_BARS)).days * 86400
+    candles = intraday.bars(symbol, period, start - warm, _get, now)
+    skip = bisect_left(candles.day, start)
+    if len(candles) - skip < TV_MIN_BARS:
+        raise HTTPException(status_code=502, detail="Not enough candle data")
+    return candles, skip
+
+def _tv_series(symbol, period, full, days):
+    if period in intraday.INTERVALS:
+        return _tv_intraday(symbol, period, full, days)
+    to_d = date.today()
+    if int(full) == 1:
+        start = fetch_from = _ipo_date(symbol)
+    else:
+        start = history.period_start(to_d - timedelta(days=days), period)
+        fetch_from = warmup.fetch_start(start, period, TV_WARMUP_BARS)
+    cols = history.bar_columns(symbol, period, fetch_from, to_d, _get)
+    if cols is None or len(cols) == 0:
+        raise HTTPException(status_code=502, detail="No candle data returned")
+    candles = CandleSeries.from_columns(cols)
+    skip = bisect_left(candles.day, archive.to_day(start.isoformat())) if int(full) != 1 else 0
+    if len(candles) - skip < TV_MIN_BARS:
+        raise HTTPException(status_code=502, detail="Not enough candle data")
+    return candles, skip
+
+def _stage_bb(candles):
+    return _bb(candles.close, 20, 2.0)
+
+def _stage_macd(candles):
+    return _macd(candles.close, 12, 26, 9)
+
+def _stage_stoch(candles):
+    return _stoch(candles.high, candles.low, candles.close, 14, 3)
+
+def _stage_ema(candles):
+    return [_ema(candles.close, span) for span in (20, 50, 100, 200)]
+
+def _stage_rsi(candles):
+    return _rsi(candles.close, 14)[:len(candles)]
+
+def _stage_psar(candles):
+    return _psar(candles.high, candles.low, 0.02, 0.2)
+
+def _stage_levels(candles):
+    return _sr_levels(candles, current_price=candles.close[-1])
+
+def _stage_elliott(candles):
+    ell_candles = candles[-250:] if len(candles) > 250 else candles
+    pivots = _zigzag_pivots(ell_candles, deviation=0.06, min_bars=8)
+    return _elliott_labels(pivots, candles=ell_candles)
+
+def _stage_overlays(view, skip, bb, macd, stoch, ema, rsi, psar):
+    bb_u, bb_m, bb_l = bb
+    macd, macd_sig, macd_hist = macd
+    stoch_k, stoch_d = stoch
+    ema20, ema50, ema100, ema200 = ema
+    cols = {
+        "bb_upper": bb_u,
+        "bb_middle": bb_m,
+        "bb_lower": bb_l,
+        "ema20": ema20,
+        "ema50": ema50,
+        "ema100": ema100,
+        "ema200": ema200,
+        "rsi14": rsi,
+        "stoch_k": stoch_k,
+        "stoch_d": stoch_d,
+        "macd": macd,
+        "macd_signal": macd_sig,
+        "macd_hist": macd_hist,
+        "psar": psar,
+    }
+    if skip:
+        cols = {k: v[skip:] for k, v in cols.items()}
+    return {"time": view.times(), "close": view.close, **cols}
+
+TV_STAGES = {
+    "bb": (_stage_bb, ("candles",)),
+    "macd": (_stage_macd, ("candles",)),
+    "stoch": (_stage_stoch, ("candles",)),
+    "ema": (_stage_ema, ("candles",)),
+    "rsi": (_stage_rsi, ("candles",)),
+    "psar": (_stage_psar, ("candles",)),
+    "levels": (_stage_levels, ("view",)),
+    "elliott": (_stage_elliott, ("view",)),
+    "overlays": (_stage_overlays, ("view", "skip", "bb", "macd", "stoch", "ema", "rsi", "psar")),
+    "signal": (_calc_signal, ("view", "overlays", "elliott", "profile")),
+}
+# Elliott is cheap on its 250 bars and runs here so its window memo
+# persists across requests of this worker.
+TV_INLINE = ("elliott", "overlays", "signal")
+_stage_pool = {}
+
+def _tv_pool():
+    """Per-process pool for TV_STAGES: processes if TV_STAGE_WORKERS >= 2,
+    else threads if TV_STAGE_THREADS >= 2, else None to run them inline."""
+    if TV_STAGE_WORKERS < 2 and TV_STAGE_THREADS < 2:
+        return None
+    pool = _stage_pool.get(os.getpid())
+    if pool is None:
+        if TV_STAGE_WORKERS >= 2:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            ctx = multiprocessing.get_context("spawn")
+            pool = ProcessPoolExecutor(TV_STAGE_WORKERS, mp_context=ctx)
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+            pool = ThreadPoolExecutor(TV_STAGE_THREADS, thread_name_prefix="tv-stage")
+        pool = _stage_pool.setdefault(os.getpid(), pool)
+    return pool
+
+def _run_stages(stages, inputs, cancel=None):
+    """pipeline.run on the stage pool; a broken pool (e.g. a killed child)
+    is dropped and the stages run inline."""
+    from concurrent.futures.process import BrokenProcessPool
+    pool = _tv_pool()
+    try:
+        return pipeline.run(stages, inputs, pool, inline=TV_INLINE, cancel=cancel)
+    except BrokenProcessPool:
+        _stage_pool.pop(os.getpid(), None)
+        return pipeline.run(stages, inputs, cancel=cancel)
+
+def _tv_analysis(candles, skip=0, profile=None, cancel=None):
+    """Output bars, overlays, levels, Elliott and signal for a series.
+
+    The first skip bars only warm up the indicators and are dropped from
+    everything returned. The independent stages run concurrently on the
+    stage pool unless it is disabled.
+    """
+    inputs = {"candles": candles, "view": candles[skip:], "skip": skip, "profile": profile}
+    r = _run_stages(TV_STAGES, inputs, cancel)
+    return r["view"], r["overlays"], r["levels"], r["elliott"], r["signal"]
+
+def _dumps(v):
+    """JSON text as FastAPI's JSONResponse renders it."""
+    return json.dumps(v, ensure_ascii=False, separators=(",", ":"))
+
+def _json_value(v):
+    if v is None:
+        return "null"
+    if isinstance(v, float):
+        return repr(v) if v == v and v not in (math.inf, -math.inf) else "null"
+    return _dumps(v)
+
+def _iter_rows(keys, columns, n):
+    prefixes = [("{" if i == 0 else ",") + _dumps(k) + ":" for i, k in enumerate(keys)]
+    cols = [columns[k] for k in keys]
+    for start in range(0, n, STREAM_BATCH):
+        parts = []
+        for i in range(start, min(n, start + STREAM_BATCH)):
+            row = "".join(p + _json_value(col[i]) for p, col in zip(prefixes, cols)) + "}"
+            parts.append(row if i == 0 else "," + row)
+        yield "".join(parts)
+
+def _iter_tv_json(symbol, candles, skip, max_points, profile=None, cancel=None):
+    """Encode the /api/tv payload in chunks straight from the series.
+
+    Bars are written STREAM_BATCH at a time, so neither per-bar overlay
+    dicts nor the full JSON string exist at once. Levels, Elliott and the
+    signal are computed before the first chunk.
+    """
+    candles, overlays, levels, elliott, signal = _tv_analysis(candles, skip, profile, cancel)
+    last = {k: overlays[k][-1] for k in OVERLAY_KEYS}
+    if max_points and len(candles) > max_points:
+        cols, overlays = _downsample(candles, overlays, max_points)
+    else:
+        cols = candles.columns()
+    n = len(cols["time"])
+    yield '{"symbol":' + _dumps(symbol.upper()) + ',"candles":['
+    yield from _iter_rows(CANDLE_KEYS, cols, n)
+    yield '],"overlays":['
+    yield from _iter_rows(OVERLAY_KEYS, overlays, n)
+    yield '],"last":' + _dumps(last) + ',"levels":' + _dumps(levels)
+    yield ',"elliott":' + _dumps(elliott) + ',"signal":' + _dumps(signal) + "}"
+
+def _iter_file(f, size=64 * 1024):
+    with f:
+        while True:
+            chunk = f.read(size)
+            if not chunk:
+                return
+            yield chunk
+
+def _keep_last(key, last):
+    """Keep the payload just committed for key as the stale fallback `last`."""
+    try:
+        shared.link_payload(key, last, TV_STALE_TTL)
+        shared.put(last, {"key": key, "at": time.time()}, TV_STALE_TTL)
+    except OSError as e:
+        print(f"[tv] keeping {last} failed: {e}", flush=True)
+
+def _iter_stale(f, at):
+    """A cached payload with a "stale" member added before its closing brace."""
+    tail = b""
+    for chunk in _iter_file(f):
+        if tail:
+            yield tail
+        tail = chunk
+    as_of = datetime.fromtimestamp(at or 0, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    yield tail[:-1] + b',"stale":{"as_of":"' + as_of.encode() + b'"}}'
+
+_refreshing = set()
+_refresh_lock = threading.Lock()
+_refresh_pool = []
+
+def _refresh_later(key, *args):
+    """Recompute a tv payload in the background unless already under way."""
+    with _refresh_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+        if not _refresh_pool:
+            from concurrent.futures import ThreadPoolExecutor
+            _refresh_pool.append(ThreadPoolExecutor(TV_REFRESH_THREADS, thread_name_prefix="tv-refresh"))
+
+    def run():
+        try:
+            body = _tv_compute(key, *args)
+            if not isinstance(body, list):
+                body.close()
+        except Exception as e:
+            print(f"[tv] refreshing {key} failed: {e}", flush=True)
+        finally:
+            with _refresh_lock:
+                _refreshing.discard(key)
+
+    _refresh_pool[0].submit(run)
+
+def _tv_compute(key, symbol, period, full, days, max_points, profile=None, last=None, job=None):
+    """Compute and cache a tv payload; with job, in a queue slot.
+
+    The compute lock is held only while the payload is written and
+    committed; the caller streams it after release, so slow clients
+    never hold up others. Returns the payload file opened for reading, so
+    eviction cannot remove it before it is streamed, or its chunks when
+    payloads are not kept on disk. A cancelled job stops at the next
+    stage or chunk and nothing is cached.
+    """
+    cancel = job.cancelled if job is not None else None
+    with _slot(job), shared.single_flight(f"compute:{key}"):
+        f = shared.open_payload(key)
+        if f is not None:
+            return f
+        candles, skip = _tv_series(symbol, period, full, days)
+        writer = shared.PayloadWriter(key, TV_CACHE_TTL)
+        kept = None if writer.stored else []
+        try:
+            for chunk in _iter_tv_json(symbol, candles, skip, max_points, profile, cancel):
+                if cancel is not None and cancel.is_set():
+                    raise CancelledError(job.reason)
+                writer.write(chunk)
+                if kept is not None:
+                    kept.append(chunk)
+        except BaseException:
+            writer.discard()
+            raise
+        path = writer.commit()
+        if path is None:
+            return kept
+        if last is not None:
+            _keep_last(key, last)
+        return open(path, "rb")
+
+def _tv_lookup(symbol, period, full, days, max_points, profile):
+    """Cache key and compute args of a tv request, plus a response if the
+    cache can answer it (fresh, or stale while a refresh runs)."""
+    weights = profiles.load(profile)
+    if weights is None:
+        raise HTTPException(status_code=404, detail=f"Unknown signal profile {profile!r}")
+    _snapshot_done.wait(timeout=5)
+    key = f"tv:{symbol.upper()}:{period}:{int(full)}:{0 if int(full) == 1 else days}:{max_points}:{date.today().isoformat()}"
+    if period in intraday.INTERVALS:
+        key += f":{int(time.time()) // intraday.INTERVALS[period]}"
+    last = f"tvlast:{symbol.upper()}:{period}:{int(full)}:{0 if int(full) == 1 else days}:{max_points}"
+    if profile != "default":
+        tag = ":" + profile + "-" + hashlib.sha1(json.dumps(weights, sort_keys=True).encode()).hexdigest()[:8]
+        key += tag
+        last += tag
+    args = (symbol, period, full, days, max_points, weights, last)
+    f = shared.open_payload(key)
+    startup.mark("first_tv")
+    if f is not None:
+        return StreamingResponse(_iter_file(f), media_type="application/json"), key, args
+    stale = shared.open_payload(last)
+    if stale is not None:
+        _refresh_later(key, *args)
+        at = (shared.get(last) or {}).get("at")
+        return StreamingResponse(_iter_stale(stale, at), media_type="application/json", headers={"X-Cache": "stale"}), key, args
+    state = upstream.state()
+    if state["state"] == "open":
+        raise HTTPException(status_code=503, detail="EODHD unavailable and no cached chart",
+                            headers={"Retry-After": str(math.ceil(state["retry_after"]))})
+    return None, key, args
+
 @app.get("/api/tv")
-def tv(
+async def tv(
+    request: Request,
     symbol: str = Query(..., min_length=1, max_length=32),
-    period: str = Query("d", pattern="^(d|w|m)$"),
+    period: str = Query("d", pattern="^(d|w|m|1m|5m|15m|30m|1h)$"),
     full: int = Query(1, ge=0, le=1),
-    days: int = Query(520, ge=120, le=80000),
+    days: int = Query(520, ge=1, le=80000),
+    max_points: int = Query(0, ge=0, le=100000),
+    profile: str = Query("default", max_length=40),
 ):
+    import anyio
+    if 0 < max_points < 3:
+        raise HTTPException(status_code=422, detail="max_points must be 0 (off) or at least 3")
+    if period in intraday.INTERVALS:
+        need = warmup.days_for(TV_MIN_BARS, period)
+        if int(full) != 1 and days < need:
+            raise HTTPException(status_code=422, detail=f"days must be at least {need} for {period} ({TV_MIN_BARS} bars)")
+    elif days < 120:
+        raise HTTPException(status_code=422, detail="days must be at least 120 for d/w/m")
+    cached, key, args = await anyio.to_thread.run_sync(_tv_lookup, symbol, period, full, days, max_points, profile)
+    if cached is not None:
+        return cached
+    job = _admit(request, "tv")
+    body = await _job_call(request, job, lambda: _tv_compute(key, *args, job=job))
+    return StreamingResponse(iter(body) if isinstance(body, list) else _iter_file(body), media_type="application/json")
+
+TILE_STAGES = {k: TV_STAGES[k] for k in ("bb", "macd", "stoch", "ema", "rsi", "psar", "overlays")}
+
+def _tile_pyramid(symbol, period, job=None):
+    """Tile pyramid of the full history, topped up with the bars new since.
+
+    Overlays are computed only from the first new or changed bar on, over
+    TV_WARMUP_BARS before it as for a days-limited /api/tv request, so
+    spliced rows match a full build to warmup.TOL rather than exactly.
+    The queue slot is taken before the pyramid lock, so requests waiting
+    for a slot never hold up readers of the current tiles.
+    """
+    pyr = tiles.get(f"{symbol.upper()}:{period}", OVERLAY_KEYS)
+    if not tiles.due(pyr):
+        return pyr
+    cancel = job.cancelled if job is not None else None
+    with _slot(job), pyr.lock:
+        if tiles.due(pyr):
+            candles, _ = _tv_series(symbol, period, 1, 0)
+            keep = pyr.unchanged(candles)
+            if keep < len(candles):
+                start = max(0, keep - TV_WARMUP_BARS)
+                view = candles[keep:]
+                overlays = _run_stages(TILE_STAGES, {"candles": candles[start:], "view": view, "skip": keep - start}, cancel)["overlays"]
+                pyr.splice(keep, view.day, overlays["time"], {**{k: getattr(view, k) for k in tiles.PRICE_KEYS}, **overlays})
+            pyr.checked = time.time()
+    return pyr
+
+def _tile_json(pyr, level, index):
+    key = (level, index)
+    text = pyr.encoded.get(key)
+    if text is None:
+        cols, _ = pyr.tile(level, index)
+        n = len(cols["time"])
+        text = pyr.encoded[key] = (
+            '{"level":' + str(level) + ',"index":' + str(index) + ',"candles":[' + "".join(_iter_rows(CANDLE_KEYS, cols, n))
+            + '],"overlays":[' + "".join(_iter_rows(OVERLAY_KEYS, cols, n)) + "]"
+        )
+    return text
+
+@app.get("/api/tv/tiles")
+async def tv_tiles(
+    request: Request,
+    symbol: str = Query(..., min_length=1, max_length=32),
+    period: str = Query("d", pattern="^(d|w|m)$"),
+    first: str = Query("0000-01-01", alias="from", pattern=r"^\d{4}-\d{2}-\d{2}$"),
+    last: str = Query("9999-12-31", alias="to", pattern=r"^\d{4}-\d{2}-\d{2}$"),
+    level: int | None = Query(None, ge=0),
+    max_points: int = Query(1000, ge=10, le=100000),
+):
+    """Tiles of the full-history chart covering [from, to] at one level of detail.
+
+    Level L has FANOUT**L bars per row (level 0 is every bar) and is cut
+    into tiles of TILE_BARS rows, so a client fetches just the tiles of its
+    viewport. Without level, the finest level fitting the range into
+    max_points rows is used. A tile with "complete" true no longer changes.
+    """
+    import anyio
+    pyr = tiles.get(f"{symbol.upper()}:{period}", OVERLAY_KEYS)
+    if tiles.due(pyr):
+        job = _admit(request, "tiles")
+        pyr = await _job_call(request, job, lambda: _tile_pyramid(symbol, period, job))
+    return await anyio.to_thread.run_sync(_tiles_response, pyr, symbol, period, first, last, level, max_points)
+
+def _tiles_response(pyr, symbol, period, first, last, level, max_points):
+    with pyr.lock:
+        top = len(pyr.levels) - 1
+        if level is None:
+            level = pyr.level_for(first, last, max_points)
+        level = min(level, top)
+        parts = []
+        for index in pyr.tile_range(level, first, last):
+            _, complete = pyr.tile(level, index)
+            parts.append(_tile_json(pyr, level, index) + ',"complete":' + ("true" if complete else "false") + "}")
+        base = pyr.levels[0]["time"]
+        head = {
+            "symbol": symbol.upper(), "period": period, "level": level, "levels": top + 1,
+            "bucket": tiles.FANOUT ** level, "tile_bars": tiles.TILE_BARS, "bars": len(pyr), "first": base[0], "last": base[-1],
+        }
+    body = json.dumps(head)[:-1] + ',"tiles":[' + ",".join(parts) + "]}"
+    return Response(body, media_type="application/json")
+
+def _sweep_configs(*axes):
+    configs = [()]
+    for name, values in axes:
+        configs = [c + ((name, v),) for c in configs for v in values]
+    if len(configs) > sweep.MAX_CONFIGS:
+        raise HTTPException(status_code=400, detail=f"grid has {len(configs)} configs, max {sweep.MAX_CONFIGS}")
+    return [dict(c) for c in configs]
+
+def _sweep_levels(view, tols, matrix):
+    pivots = _sr_pivots(view)
+    price = view.close[-1]
+    stats = {"levels": [], "top_strength": [], "mean_strength": [], "support_gap": [], "resistance_gap": []}
+    values = []
+    for tol in tols:
+        levels = _sr_cluster(pivots, tol, max_levels=10**6, current_price=price)
+        strengths = [x["strength"] for x in levels]
+        below = [x["value"] for x in levels if x["type"] == "support" and x["value"] <= price]
+        above = [x["value"] for x in levels if x["type"] == "resistance" and x["value"] >= price]
+        stats["levels"].append(len(levels))
+        stats["top_strength"].append(max(strengths) if strengths else None)
+        stats["mean_strength"].append(sum(strengths) / len(strengths) if strengths else None)
+        stats["support_gap"].append(round(1 - max(below) / price, 6) if below else None)
+        stats["resistance_gap"].append(round(max(min(above) / price - 1, 0.0), 6) if above else None)
+        if matrix:
+            values.append(levels[:30])
+    return stats, values
+
+def _sweep(symbol, indicator, period, days, grids, horizon, matrix):
+    candles, skip = _tv_series(symbol, period, 1 if days == 0 else 0, max(days, 120))
+    view = candles[skip:]
+    out = {"symbol": symbol.upper(), "indicator": indicator, "bars": len(view), "horizon": horizon}
+    if indicator == "rsi":
+        configs = _sweep_configs(("period", grids["periods"]))
+        rsi = sweep.rsi_matrix(candles.close, grids["periods"])[:, skip:]
+        stats = sweep.rsi_summary(rsi, view.close, horizon=horizon)
+        values = rsi if matrix else None
+    elif indicator == "bb":
+        configs = _sweep_configs(("period", grids["periods"]), ("width", grids["widths"]))
+        stats, pct_b = sweep.bb_summary(candles.close, grids["periods"], grids["widths"], horizon, skip)
+        values = pct_b if matrix else None
+    elif indicator == "zigzag":
+        configs = _sweep_configs(("deviation", grids["deviations"]), ("min_bars", grids["min_bars"]))
+        pivots = sweep.zigzag_pivots(
+            view.high, view.low, view.close, [c["deviation"] for c in configs], [c["min_bars"] for c in configs]
+        )
+        stats = sweep.zigzag_summary(pivots)
+        values = [[{"idx": i, "time": view.time(i), "price": p, "type": t} for i, p, t in pv] for pv in pivots]
+    else:
+        configs = _sweep_configs(("tol_pct", grids["tols"]))
+        stats, values = _sweep_levels(view, grids["tols"], matrix)
+    out["configs"] = configs
+    out["stats"] = {k: sweep.to_json(v) for k, v in stats.items()}
+    if matrix:
+        out["dates"] = view.times()
+        out["values"] = [sweep.to_json(row) for row in values] if indicator in ("rsi", "bb") else values
+    return out
+
+@app.get("/api/sweep")
+async def sweep_grid(
+    request: Request,
+    symbol: str = Query(..., min_length=1, max_length=32),
+    indicator: str = Query(..., pattern="^(rsi|bb|zigzag|levels)$"),
+    period: str = Query("d", pattern="^(d|w|m)$"),
+    days: int = Query(0, ge=0, le=80000),
+    periods: str = Query("2:50", max_length=500),
+    widths: str = Query("1.5:3:0.25", max_length=500),
+    deviations: str = Query("0.02:0.12:0.01", max_length=500),
+    min_bars: str = Query("3:15", max_length=500),
+    tols: str = Query("0.002:0.02:0.002", max_length=500),
+    horizon: int = Query(10, ge=1, le=250),
+    output: str = Query("summary", pattern="^(summary|matrix)$"),
+):
+    """Evaluate a parameter grid for one indicator in a single batched pass.
+
+    days=0 uses the full history. output=matrix adds the per-bar values
+    (RSI, Bollinger %b), pivots (zigzag) or levels for every config.
+    """
     try:
+        grids = {
+            "periods": [p for p in sweep.grid(periods, int) if p >= 2],
+            "widths": sweep.grid(widths),
+            "deviations": sweep.grid(deviations),
+            "min_bars": sweep.grid(min_bars, int),
+            "tols": sweep.grid(tols),
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not grids["periods"]:
+        raise HTTPException(status_code=400, detail="periods must be >= 2")
+    spec = f"{symbol.upper()}|{indicator}|{period}|{days}|{sorted(grids.items())}|{horizon}|{output}|{date.today().isoformat()}"
+    return await _cached_json(
+        request,
+        "sweep",
+        "sweep:" + hashlib.sha1(spec.encode()).hexdigest(),
+        TV_CACHE_TTL,
+        lambda: _sweep(symbol, indicator, period, days, grids, horizon, output == "matrix"),
+    )
 
-            to_d = date.today()
-            if int(full) == 1:
-                start = _ipo_date(symbol)
-                raw = _get(f"eod/{symbol}", {"from": start.isoformat(), "to": to_d.isoformat(), "period": period})
-            else:
-                from_d = to_d - timedelta(days=days)
-                raw = _get(f"eod/{symbol}", {"from": from_d.isoformat(), "to": to_d.isoformat(), "period": period})
-            if not isinstance(raw, list) or len(raw) == 0:
-                raise HTTPException(status_code=502, detail="No candle data returned")
-            raw_sorted = sorted(raw, key=lambda x: x.get("date", ""))
-            candles = []
-            closes, highs, lows = [], [], []
-            for r in raw_sorted:
-                d = r.get("date")
-                o = r.get("open")
-                h = r.get("high")
-                l = r.get("low")
-                c = r.get("close")
-                if d is None or h is None or l is None or c is None:
-                    continue
-                try:
-                    c = float(c)
-                    h = float(h)
-                    l = float(l)
-                    o = float(o) if o is not None else c
-                except Exception as e:
-                    return {"ERROR": str(e), "raw": {"c": c, "h": h, "l": l, "o": o}}
-                if c <= 0 or h <= 0 or l <= 0 or h < l:
-                    continue
-                candles.append({"time": d, "open": o, "high": h, "low": l, "close": c})
-                closes.append(c)
-                highs.append(h)
-                lows.append(l)
-            if len(candles) < 120:
-                raise HTTPException(status_code=502, detail="Not enough candle data")
-            bb_u, bb_m, bb_l = _bb(closes, 20, 2.0)
-            ema20 = _ema(closes, 20)
-            ema50 = _ema(closes, 50)
-            ema100 = _ema(closes, 100)
-            ema200 = _ema(closes, 200)
-            rsi14 = _rsi(closes, 14)
-            stoch_k, stoch_d = _stoch(highs, lows, closes, 14, 3)
-            macd, macd_sig, macd_hist = _macd(closes, 12, 26, 9)
-            overlays = []
-            for i in range(len(candles)):
-                overlays.append({
-                    "time": candles[i]["time"],
-                    "close": closes[i],
-                    "bb_upper": bb_u[i],
-                    "bb_middle": bb_m[i],
-                    "bb_lower": bb_l[i],
-                    "ema20": ema20[i] if i < len(ema20) else None,
-                    "ema50": ema50[i] if i < len(ema50) else None,
-                    "ema100": ema100[i] if i < len(ema100) else None,
-                    "ema200": ema200[i] if i < len(ema200) else None,
-                    "rsi14": rsi14[i] if i < len(rsi14) else None,
-                    "stoch_k": stoch_k[i],
-                    "stoch_d": stoch_d[i],
-                    "macd": macd[i] if i < len(macd) else None,
-                    "macd_signal": macd_sig[i] if i < len(macd_sig) else None,
-                    "macd_hist": macd_hist[i] if i < len(macd_hist) else None,
-                })
-            last = overlays[-1]
-            levels = _sr_levels(candles, current_price=closes[-1])
-            ell_candles = candles[-250:] if len(candles) > 250 else candles
-            pivots = _zigzag_pivots(ell_candles, deviation=0.06, min_bars=8)
-            elliott = _elliott_labels(pivots, candles=ell_candles)
-            signal = _calc_signal(candles, overlays, elliott)
-            return {"symbol": symbol.upper(), "candles": candles, "overlays": overlays, "last": last, "levels": levels, "elliott": elliott, "signal": signal}
-    except Exception as e:
-        import traceback
-        return {"ERROR": str(e), "TRACE": traceback.format_exc()}
+startup.mark("imports")
@@ -0,0 +1,155 @@
+import math
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date
+
+ARCHIVE_DIR = os.getenv("CANDLE_ARCHIVE_DIR", os.path.join(tempfile.gettempdir(), "mvp-candles"))
+
+MAGIC = b"MVPC"
+VERSION = 1
+HEADER = struct.Struct("<4sIqiid")
+EPOCH = date(1970, 1, 1).toordinal()
+FIELDS = ("open", "high", "low", "close", "adjusted_close", "volume")
+
+def to_day(iso: str) -> int:
+    return date.fromisoformat(iso[:10]).toordinal() - EPOCH
+
+def from_day(day: int) -> str:
+    return date.fromordinal(day + EPOCH).isoformat()
+
+def _float(v):
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return math.nan
+
+class Columns:
+    """Daily bars as parallel columns: int32 days since 1970 and float64 OHLCV.
+
+    Columns are memoryviews, either over an mmap'd archive file or over
+    in-memory arrays; slicing never copies. Missing values are NaN.
+    """
+
+    __slots__ = ("date",) + FIELDS + ("_buf",)
+
+    def __init__(self, date, open, high, low, close, adjusted_close, volume, buf=None):
+        self.date = date
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.adjusted_close = adjusted_close
+        self.volume = volume
+        self._buf = buf
+
+    def __len__(self):
+        return len(self.date)
+
+    @classmethod
+    def from_rows(cls, rows):
+        days = array("i", (to_day(r["date"]) for r in rows))
+        cols = [memoryview(array("d", (_float(r.get(f)) for r in rows))) for f in FIELDS]
+        return cls(memoryview(days), *cols)
+
+    def slice(self, i, j):
+        return Columns(self.date[i:j], *(getattr(self, f)[i:j] for f in FIELDS), buf=self._buf)
+
+    def span(self, first_day, last_day):
+        i = bisect_left(self.date, first_day)
+        j = bisect_right(self.date, last_day)
+        return self.slice(i, j)
+
+    def rows(self):
+        """EODHD-shaped dicts for code that still expects per-bar records."""
+        cols = [getattr(self, f).tolist() for f in FIELDS]
+        out = []
+        for k, d in enumerate(self.date.tolist()):
+            r = {"date": from_day(d)}
+            for f, col in zip(FIELDS, cols):
+                v = col[k]
+                r[f] = None if v != v else v
+            out.append(r)
+        return out
+
+def path(symbol: str) -> str:
+    safe = "".join(ch if ch.isalnum() or ch in "._-" else "_" for ch in symbol.upper())
+    return os.path.join(ARCHIVE_DIR, f"{safe}.cols")
+
+def enabled() -> bool:
+    return bool(ARCHIVE_DIR)
+
+def _atomic_write(dest, chunks):
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=ARCHIVE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp, dest)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+def save(symbol, cols, first, last, fetched):
+    """Write columns atomically; readers keep their old mapping until reopen."""
+    n = len(cols)
+    chunks = [HEADER.pack(MAGIC, VERSION, n, first, last, fetched), cols.date.tobytes()]
+    if (n * 4) % 8:
+        chunks.append(b"\0" * 4)
+    chunks.extend(getattr(cols, name).tobytes() for name in FIELDS)
+    _atomic_write(path(symbol), chunks)
+
+def read_bytes(symbol):
+    try:
+        with open(path(symbol), "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+def write_bytes(symbol, data):
+    _atomic_write(path(symbol), [data])
+
+def header(symbol):
+    """(first, last, fetched) of the stored file without mapping it."""
+    try:
+        with open(path(symbol), "rb") as f:
+            raw = f.read(HEADER.size)
+    except OSError:
+        return None
+    if len(raw) < HEADER.size:
+        return None
+    magic, version, n, first, last, fetched = HEADER.unpack(raw)
+    if magic != MAGIC or version != VERSION:
+        return None
+    return first, last, fetched
+
+def load(symbol):
+    """Map a stored archive read-only. Returns (columns, first, last, fetched) or None."""
+    try:
+        with open(path(symbol), "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < HEADER.size:
+                return None
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    magic, version, n, first, last, fetched = HEADER.unpack_from(mm, 0)
+    off = HEADER.size
+    date_bytes = n * 4 + ((n * 4) % 8)
+    if magic != MAGIC or version != VERSION or size < off + date_bytes + 8 * n * len(FIELDS):
+        return None
+    buf = memoryview(mm)
+    dates = buf[off : off + n * 4].cast("i")
+    off += date_bytes
+    cols = []
+    for _ in FIELDS:
+        cols.append(buf[off : off + 8 * n].cast("d"))
+        off += 8 * n
+    return Columns(dates, *cols, buf=mm), first, last, fetched
@@ -0,0 +1,78 @@
+import os
+import threading
+import time
+
+from backend import shared
+
+FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))
+RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+# (connect, read) timeout of guarded calls: a slow upstream should count
+# as a failure within seconds instead of holding the request.
+TIMEOUT = (float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", "3")), float(os.getenv("UPSTREAM_READ_TIMEOUT", "10")))
+
+class CircuitOpen(Exception):
+    def __init__(self, name, retry_after):
+        super().__init__(f"{name} circuit open, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+class Breaker:
+    """Fails upstream calls fast after `failures` consecutive errors.
+
+    Opening writes the deadline to the shared cache, so every worker stops
+    calling at once. Once reset_seconds have passed, each worker lets a
+    single probe through (half-open): success closes the circuit, failure
+    opens it again for another reset_seconds.
+    """
+
+    def __init__(self, name, failures=FAILURES, reset_seconds=RESET_SECONDS):
+        self.name = name
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._streak = 0
+        self._open_until = 0.0
+        self._probing = False
+        self.stats = {"calls": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    def _deadline(self):
+        return max(self._open_until, shared.get(f"breaker:{self.name}") or 0.0)
+
+    def before(self):
+        """Raise CircuitOpen unless a call may go upstream now."""
+        until = self._deadline()
+        now = time.time()
+        with self._lock:
+            self.stats["calls"] += 1
+            if not until:
+                return
+            if now < until or self._probing:
+                self.stats["rejected"] += 1
+                raise CircuitOpen(self.name, max(until - now, 1.0))
+            self._probing = True
+
+    def success(self):
+        with self._lock:
+            self._streak = 0
+            recovered = self._probing or self._open_until > 0
+            self._probing = False
+            self._open_until = 0.0
+        if recovered:
+            shared.put(f"breaker:{self.name}", 0.0, 10 * self.reset_seconds)
+
+    def failure(self):
+        with self._lock:
+            self._streak += 1
+            self.stats["failures"] += 1
+            trip = self._probing or self._streak >= self.failures
+            self._probing = False
+            if trip:
+                self._open_until = time.time() + self.reset_seconds
+                self.stats["opened"] += 1
+        if trip:
+            shared.put(f"breaker:{self.name}", self._open_until, 10 * self.reset_seconds)
+
+    def state(self):
+        until = self._deadline()
+        now = time.time()
+        status = "closed" if not until else "open" if now < until else "half_open"
+        return {"state": status, "retry_after": max(0.0, until - now), "streak": self._streak, **self.stats}
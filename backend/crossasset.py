@@ -0,0 +1,157 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from backend import history
+
+LOAD_THREADS = int(os.getenv("CROSS_LOAD_THREADS", "8"))
+MIN_OBS = int(os.getenv("CROSS_MIN_OBS", "20"))
+
+def load(symbols, from_d, to_d, get):
+    """(symbol, archive.Columns or None) for each symbol, loaded concurrently.
+
+    A symbol whose history cannot be loaded maps to None rather than
+    failing the whole request.
+    """
+    def one(symbol):
+        try:
+            return history.columns(symbol, from_d, to_d, get)
+        except Exception:
+            return None
+
+    with ThreadPoolExecutor(min(LOAD_THREADS, len(symbols))) as pool:
+        return list(zip(symbols, pool.map(one, symbols)))
+
+def align(loaded):
+    """Common date index and a (dates x symbols) price matrix.
+
+    Adjusted closes (falling back to close) are placed on the union of all
+    trading days; a symbol's days without a bar (e.g. its exchange's
+    holidays) stay NaN, so returns over them are missing rather than zero.
+    """
+    import numpy as np
+    days = [np.asarray(c.date) for _, c in loaded if c is not None and len(c)]
+    if not days:
+        return np.empty(0, dtype=np.int32), np.empty((0, len(loaded)))
+    index = np.unique(np.concatenate(days))
+    prices = np.full((len(index), len(loaded)), np.nan)
+    for j, (_, cols) in enumerate(loaded):
+        if cols is None or not len(cols):
+            continue
+        px = np.asarray(cols.adjusted_close, dtype=np.float64)
+        px = np.where(np.isfinite(px) & (px > 0), px, np.asarray(cols.close, dtype=np.float64))
+        px[~(px > 0)] = np.nan
+        prices[np.searchsorted(index, np.asarray(cols.date)), j] = px
+    return index, prices
+
+def carry(prices):
+    """Prices carried forward over missing days, for level comparisons."""
+    import numpy as np
+    rows = np.where(np.isnan(prices), 0, np.arange(len(prices))[:, None])
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return prices[rows, np.arange(prices.shape[1])]
+
+def _pairwise(returns):
+    """Correlation and beta matrices over pairwise-complete observations.
+
+    beta[i, j] is the beta of symbol i against symbol j. All sums come from
+    a handful of (symbols x symbols) matrix products over the masked returns.
+    """
+    import numpy as np
+    valid = ~np.isnan(returns)
+    x = np.where(valid, returns, 0.0)
+    m = valid.astype(np.float64)
+    n = m.T @ m
+    sx = x.T @ m
+    sxx = (x * x).T @ m
+    sxy = x.T @ x
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = sxy - sx * sx.T / n
+        var_i = sxx - sx * sx / n
+        var_j = var_i.T
+        corr = cov / np.sqrt(var_i * var_j)
+        beta = cov / var_j
+    corr[n < MIN_OBS] = np.nan
+    beta[n < MIN_OBS] = np.nan
+    return corr, beta
+
+def _rolling_vs(returns, b, window):
+    """Rolling correlation and beta of every column against column b."""
+    import numpy as np
+    y = returns[:, b : b + 1]
+    valid = ~np.isnan(returns) & ~np.isnan(y)
+    x = np.where(valid, returns, 0.0)
+    y = np.where(valid, y, 0.0)
+
+    def roll(a):
+        c = np.cumsum(np.vstack([np.zeros((1, a.shape[1])), a]), axis=0)
+        return c[window:] - c[:-window]
+
+    n = roll(valid.astype(np.float64))
+    sx, sy = roll(x), roll(y)
+    sxx, syy, sxy = roll(x * x), roll(y * y), roll(x * y)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = sxy - sx * sy / n
+        vx = sxx - sx * sx / n
+        vy = syy - sy * sy / n
+        corr = cov / np.sqrt(vx * vy)
+        beta = cov / vy
+    corr[n < MIN_OBS] = np.nan
+    beta[n < MIN_OBS] = np.nan
+    return corr, beta
+
+def _json(a):
+    import numpy as np
+    a = np.round(a, 6)
+    a[~np.isfinite(a)] = np.nan
+    return [[None if v != v else v for v in row] for row in a.tolist()]
+
+def compute(loaded, window, benchmark=None, series=False):
+    """Correlation, beta and relative-strength matrices for aligned symbols.
+
+    Matrices use the last window daily log returns (all of them if window
+    is 0), each pair over the days both symbols traded on and the day
+    before. relative_strength[i, j] is symbol i's performance over that
+    span divided by symbol j's. With a benchmark, series adds per-symbol
+    rolling correlation, beta and the price ratio to the benchmark.
+    """
+    import numpy as np
+    from backend.archive import from_day
+    names = [s.upper() for s, _ in loaded]
+    index, traded = align(loaded)
+    missing = [s for s, c in loaded if c is None or not len(c)]
+    if len(index) < 2:
+        return {"symbols": names, "missing": missing, "observations": 0, "correlation": [], "beta": [], "relative_strength": []}
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns = np.log(traded[1:] / traded[:-1])
+    prices = carry(traded)
+    span = returns[-window:] if window else returns
+    corr, beta = _pairwise(span)
+    start = prices[-len(span) - 1]
+    perf = prices[-1] / start
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rs = perf[:, None] / perf[None, :]
+    out = {
+        "symbols": names,
+        "missing": missing,
+        "from": from_day(int(index[-len(span) - 1])),
+        "to": from_day(int(index[-1])),
+        "observations": int(len(span)),
+        "correlation": _json(corr),
+        "beta": _json(beta),
+        "relative_strength": _json(rs),
+    }
+    if benchmark is not None:
+        b = names.index(benchmark.upper())
+        out["benchmark"] = names[b]
+        if series and window >= 2 and len(returns) >= window:
+            rc, rb = _rolling_vs(returns, b, window)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                ratio = prices / prices[:, b : b + 1]
+            dates = [from_day(int(d)) for d in index[window:]]
+            out["series"] = {
+                "dates": dates,
+                "correlation": dict(zip(names, _json(rc.T))),
+                "beta": dict(zip(names, _json(rb.T))),
+                "ratio": dict(zip(names, _json(ratio[window:].T))),
+            }
+    return out
@@ -0,0 +1,237 @@
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import date, timedelta
+from backend import archive, shared
+
+TTL = float(os.getenv("HISTORY_TTL", "900"))
+MAX_SYMBOLS = int(os.getenv("HISTORY_MAX_SYMBOLS", "64"))
+
+_lock = threading.Lock()
+_daily = OrderedDict()
+_hits = Counter()
+
+def period_start(d: date, period: str) -> date:
+    if period == "w":
+        return d - timedelta(days=d.weekday())
+    if period == "m":
+        return d.replace(day=1)
+    return d
+
+def resample(cols, period):
+    """Aggregate sorted daily archive.Columns into weekly or monthly bars.
+
+    Groups are calendar weeks (Mon-Sun) or months, so holidays simply
+    leave fewer daily bars in a group. Each bar is dated with the first
+    trading day of its group; the current group is partial until it ends.
+    High, low and volume skip missing (NaN) values, as a group's open and
+    close are its first and last bar's.
+    """
+    if period == "d" or not len(cols):
+        return cols
+    import numpy as np
+    day = np.frombuffer(cols.date, dtype=np.int32)
+    if period == "w":
+        key = day - (day + 3) % 7  # the week's Monday; 1970-01-01 was a Thursday
+    else:
+        key = day.astype("datetime64[D]").astype("datetime64[M]")
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    ends = np.r_[starts[1:], len(day)] - 1
+    col = {f: np.frombuffer(getattr(cols, f), dtype=np.float64) for f in archive.FIELDS}
+    present = ~np.isnan(col["volume"])
+    volume = np.add.reduceat(np.where(present, col["volume"], 0.0), starts)
+    volume[np.add.reduceat(present.astype(np.int64), starts) == 0] = np.nan
+    out = (
+        day[starts], col["open"][starts], np.fmax.reduceat(col["high"], starts), np.fmin.reduceat(col["low"], starts),
+        col["close"][ends], col["adjusted_close"][ends], volume,
+    )
+    return archive.Columns(*(memoryview(np.ascontiguousarray(v)) for v in out))
+
+def _fetch(get, symbol, from_d, to_d):
+    if from_d > to_d:
+        return []
+    raw = get(f"eod/{symbol}", {"from": from_d.isoformat(), "to": to_d.isoformat(), "period": "d"})
+    if not isinstance(raw, list):
+        return None
+    return [r for r in raw if isinstance(r, dict) and r.get("date")]
+
+def _merge_bars(*parts):
+    by_date = {}
+    for part in parts:
+        for b in part:
+            by_date[b["date"]] = b
+    return [by_date[k] for k in sorted(by_date)]
+
+def _entry(cols, first, last, fetched):
+    return {"from": first, "to": last, "fetched": fetched, "cols": cols}
+
+def _from_archive(key):
+    if not archive.enabled():
+        return None
+    got = archive.load(key)
+    if got is None:
+        return None
+    cols, first, last, fetched = got
+    return _entry(cols, _as_date(first), _as_date(last), fetched)
+
+def _as_date(day):
+    return date.fromisoformat(archive.from_day(day))
+
+def _store(key, rows, first, last, fetched):
+    cols = archive.Columns.from_rows(rows)
+    if archive.enabled():
+        try:
+            archive.save(key, cols, archive.to_day(first.isoformat()), archive.to_day(last.isoformat()), fetched)
+            stored = _from_archive(key)
+            if stored is not None:
+                return stored
+        except OSError:
+            pass
+    return _entry(cols, first, last, fetched)
+
+def _newer(entry, stored):
+    if stored is not None and (entry is None or stored["fetched"] > entry["fetched"]):
+        return stored
+    return entry
+
+def _needs_fetch(entry, from_d, to_d, now):
+    return entry is None or from_d < entry["from"] or to_d > entry["to"] or now - entry["fetched"] > TTL
+
+def _refresh(key, symbol, entry, from_d, to_d, fetch_from, get):
+    now = time.time()
+    if entry is None:
+        rows = _fetch(get, symbol, fetch_from, to_d)
+        if rows is None:
+            return None
+        return _store(key, rows, fetch_from, to_d, now)
+    # A failed fetch (None) leaves its end of the held range as it was, so
+    # the next request retries it instead of trusting a gap.
+    head = tail = None
+    lo, hi, fetched = entry["from"], entry["to"], entry["fetched"]
+    if from_d < lo:
+        head = _fetch(get, symbol, fetch_from, lo - timedelta(days=1))
+        if head is not None:
+            lo = fetch_from
+    if to_d > hi or now - fetched > TTL:
+        held = entry["cols"]
+        last = archive.from_day(held.date[-1]) if len(held) else hi.isoformat()
+        tail = _fetch(get, symbol, date.fromisoformat(last), to_d)
+        if tail is not None:
+            hi = max(hi, to_d)
+            fetched = now
+    if head is None and tail is None:
+        return entry
+    return _store(key, _merge_bars(head or [], entry["cols"].rows(), tail or []), lo, hi, fetched)
+
+def columns(symbol, from_d, to_d, get):
+    """Daily bars for [from_d, to_d] as archive.Columns views.
+
+    Only ranges not already held are fetched. Held history comes from this
+    worker's LRU or from the mmap'd archive that all workers share, and
+    refreshes hold a machine-wide lock so one worker fetches while the
+    others pick up its result. Fetches start at the enclosing week/month so
+    later w/m requests for the same window need no upstream call.
+    """
+    key = symbol.upper()
+    fetch_from = min(period_start(from_d, "w"), period_start(from_d, "m"))
+    with _lock:
+        _count_hit(key)
+        entry = _daily.get(key)
+        if entry is not None:
+            _daily.move_to_end(key)
+    now = time.time()
+    if entry is None or now - entry["fetched"] > TTL:
+        entry = _newer(entry, _from_archive(key))
+    if _needs_fetch(entry, from_d, to_d, now):
+        with shared.single_flight(f"daily:{key}"):
+            entry = _newer(entry, _from_archive(key))
+            if _needs_fetch(entry, from_d, to_d, time.time()):
+                entry = _refresh(key, symbol, entry, from_d, to_d, fetch_from, get)
+                if entry is None:
+                    return None
+    with _lock:
+        _daily[key] = entry
+        _daily.move_to_end(key)
+        while len(_daily) > MAX_SYMBOLS:
+            _daily.popitem(last=False)
+    return entry["cols"].span(archive.to_day(from_d.isoformat()), archive.to_day(to_d.isoformat()))
+
+_pending = set()
+
+def _refresh_later(symbol, from_d, to_d, get):
+    key = symbol.upper()
+    with _lock:
+        if key in _pending:
+            return
+        _pending.add(key)
+
+    def run():
+        try:
+            columns(symbol, from_d, to_d, get)
+        except Exception as e:
+            print(f"[history] background refresh of {key} failed: {e}", flush=True)
+        finally:
+            with _lock:
+                _pending.discard(key)
+
+    threading.Thread(target=run, name=f"history-{key}", daemon=True).start()
+
+def columns_swr(symbol, from_d, to_d, get):
+    """(columns, stale): like columns(), but never waits on a refresh it can skip.
+
+    If the held history already reaches back to from_d and is only out of
+    date (TTL passed or to_d beyond it), it is returned at once with
+    stale=True and a background thread refreshes it.
+    """
+    key = symbol.upper()
+    with _lock:
+        entry = _daily.get(key)
+    now = time.time()
+    if entry is None or now - entry["fetched"] > TTL:
+        entry = _newer(entry, _from_archive(key))
+    if entry is not None and entry["from"] <= from_d and _needs_fetch(entry, from_d, to_d, now):
+        _refresh_later(symbol, from_d, to_d, get)
+        return entry["cols"].span(archive.to_day(from_d.isoformat()), archive.to_day(to_d.isoformat())), True
+    return columns(symbol, from_d, to_d, get), False
+
+def _count_hit(key):
+    """Count a request for key; past 2 * MAX_SYMBOLS counted symbols, only
+    the top MAX_SYMBOLS are kept, at half their counts so that newly
+    popular symbols can catch up. Call with _lock held."""
+    global _hits
+    _hits[key] += 1
+    if len(_hits) > 2 * MAX_SYMBOLS:
+        _hits = Counter({k: (c + 1) // 2 for k, c in _hits.most_common(MAX_SYMBOLS)})
+
+def hot(n):
+    """Most requested symbols in this worker, most popular first."""
+    with _lock:
+        return [k for k, _ in _hits.most_common(n)]
+
+def daily(symbol, from_d, to_d, get):
+    """Daily bars for [from_d, to_d] as EODHD-shaped dicts."""
+    cols = columns(symbol, from_d, to_d, get)
+    return None if cols is None else cols.rows()
+
+def bars_swr(symbol, period, from_d, to_d, get):
+    """(bars, stale) for any period, served through columns_swr()."""
+    cols, stale = columns_swr(symbol, period_start(from_d, period), to_d, get)
+    if cols is None:
+        return None, stale
+    return resample(cols, period).rows(), stale
+
+def bar_columns(symbol, period, from_d, to_d, get):
+    """EOD bars for any period as archive.Columns, derived from the shared
+    daily history; daily bars are views of it, w/m bars new columns.
+
+    The daily range is widened to the start of the first week/month so the
+    oldest aggregated bar is complete rather than cut at from_d.
+    """
+    cols = columns(symbol, period_start(from_d, period), to_d, get)
+    return None if cols is None else resample(cols, period)
+
+def bars(symbol, period, from_d, to_d, get):
+    """EOD bars for any period as EODHD-shaped dicts (see bar_columns)."""
+    cols = bar_columns(symbol, period, from_d, to_d, get)
+    return None if cols is None else cols.rows()
@@ -0,0 +1,205 @@
+import math
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+from backend import warmup
+from backend.series import IntradaySeries
+
+INTERVALS = {"1m": 60, "5m": 300, "15m": 900, "30m": 1800, "1h": 3600}
+RING_BARS = int(os.getenv("INTRADAY_RING_BARS", "60000"))
+MAX_SYMBOLS = int(os.getenv("INTRADAY_MAX_SYMBOLS", "16"))
+TTL = float(os.getenv("INTRADAY_TTL", "60"))
+FETCH_SPAN = 120 * 86400
+RETENTION = math.ceil(RING_BARS * warmup.DAYS_PER_BAR["1m"] * 86400)
+FIELDS = ("open", "high", "low", "close", "volume")
+
+_lock = threading.Lock()
+_rings = OrderedDict()
+
+def _float(v):
+    try:
+        v = float(v)
+    except (TypeError, ValueError):
+        return None
+    return v if math.isfinite(v) else None
+
+class Ring:
+    """The last `cap` 1-minute bars of a symbol in preallocated columns.
+
+    Bars are appended in time order; once full, each new bar overwrites the
+    oldest. A bar with the same start as the newest one replaces it, so
+    re-fetching from the last bar onwards updates a still-forming minute.
+    `since`..`until` is the time range fetched so far, oldest evictions
+    excluded.
+    """
+
+    __slots__ = ("cap", "stamp", "start", "size", "since", "until", "fetched", "lock") + FIELDS
+
+    def __init__(self, cap=RING_BARS):
+        self.cap = cap
+        self.stamp = array("q", bytes(8 * cap))
+        for f in FIELDS:
+            setattr(self, f, array("d", bytes(8 * cap)))
+        self.start = 0
+        self.size = 0
+        self.since = None
+        self.until = None
+        self.fetched = 0.0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.size
+
+    def last(self):
+        return self.stamp[(self.start + self.size - 1) % self.cap] if self.size else None
+
+    def append(self, t, o, h, l, c, v):
+        last = self.last()
+        if last is not None and t < last:
+            return
+        if last is not None and t == last:
+            j = (self.start + self.size - 1) % self.cap
+        elif self.size < self.cap:
+            j = (self.start + self.size) % self.cap
+            self.size += 1
+        else:
+            j = self.start
+            self.start = (self.start + 1) % self.cap
+            self.since = self.stamp[self.start]
+        self.stamp[j] = t
+        self.open[j] = o
+        self.high[j] = h
+        self.low[j] = l
+        self.close[j] = c
+        self.volume[j] = v
+
+    def extend(self, rows):
+        """Append valid EODHD intraday rows; invalid or older ones are skipped."""
+        for r in sorted(rows, key=lambda x: x.get("timestamp") or 0):
+            try:
+                t = int(r["timestamp"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            c = _float(r.get("close"))
+            h = _float(r.get("high"))
+            l = _float(r.get("low"))
+            if c is None or h is None or l is None or not (c > 0 and l > 0 and h >= l):
+                continue
+            o = _float(r.get("open")) or c
+            self.append(t - t % 60, o, h, l, c, _float(r.get("volume")) or 0.0)
+
+    def _segments(self):
+        end = self.start + self.size
+        if end <= self.cap:
+            return [(self.start, end)]
+        return [(self.start, self.cap), (0, end - self.cap)]
+
+    def span(self, first, last):
+        """Copies of the columns for bars starting in [first, last]."""
+        out = {f: array("q" if f == "stamp" else "d") for f in ("stamp",) + FIELDS}
+        for lo, hi in self._segments():
+            i = bisect_left(self.stamp, first, lo, hi)
+            j = bisect_right(self.stamp, last, lo, hi)
+            for f in out:
+                out[f].extend(getattr(self, f)[i:j])
+        return out
+
+def aggregate(cols, seconds):
+    """Roll 1-minute columns up into bars of `seconds`, aligned to UTC.
+
+    One pass of numpy reductions over the bucket boundaries; a trailing
+    bucket that is still filling is returned as a partial bar.
+    """
+    import numpy as np
+    stamp = np.frombuffer(cols["stamp"], dtype=np.int64)
+    if seconds == 60 or not len(stamp):
+        return {f: np.frombuffer(cols[f], dtype=np.int64 if f == "stamp" else np.float64) for f in cols}
+    bucket = stamp - stamp % seconds
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(stamp)] - 1
+    col = {f: np.frombuffer(cols[f], dtype=np.float64) for f in FIELDS}
+    return {
+        "stamp": bucket[starts],
+        "open": col["open"][starts],
+        "high": np.maximum.reduceat(col["high"], starts),
+        "low": np.minimum.reduceat(col["low"], starts),
+        "close": col["close"][ends],
+        "volume": np.add.reduceat(col["volume"], starts),
+    }
+
+def _fetch(get, symbol, first, last):
+    """1-minute rows for [first, last], in requests EODHD accepts (120 days)."""
+    rows = []
+    t = first
+    while t <= last:
+        hi = min(last, t + FETCH_SPAN - 1)
+        raw = get(f"intraday/{symbol}", {"interval": "1m", "from": t, "to": hi})
+        if isinstance(raw, list):
+            rows.extend(r for r in raw if isinstance(r, dict))
+        t = hi + 1
+    return rows
+
+def _ring(key):
+    with _lock:
+        ring = _rings.get(key)
+        if ring is None:
+            ring = _rings[key] = Ring()
+        _rings.move_to_end(key)
+        while len(_rings) > MAX_SYMBOLS:
+            _rings.popitem(last=False)
+    return ring
+
+def _fill(ring, symbol, first, now, get):
+    """Fetch only what the ring lacks: older history, then the live edge."""
+    if ring.since is None:
+        ring.extend(_fetch(get, symbol, first, now))
+        ring.since = first if ring.size < ring.cap else ring.stamp[ring.start]
+        ring.until, ring.fetched = now, time.time()
+        return
+    if first < ring.since and ring.size < ring.cap:
+        older = _fetch(get, symbol, first, ring.since - 1)
+        if older:
+            held = ring.span(ring.since, ring.until)
+            fresh = Ring(ring.cap)
+            fresh.extend(older)
+            for k in range(len(held["stamp"])):
+                fresh.append(held["stamp"][k], *(held[f][k] for f in FIELDS))
+            for f in ("stamp", "start", "size") + FIELDS:
+                setattr(ring, f, getattr(fresh, f))
+        ring.since = first if ring.size < ring.cap else ring.stamp[ring.start]
+    if now > ring.until or time.time() - ring.fetched > TTL:
+        ring.extend(_fetch(get, symbol, ring.last() or ring.until, now))
+        ring.until = now
+        ring.fetched = time.time()
+
+def bars(symbol, interval, first, get, now=None):
+    """Bars of interval starting at or after unix second `first`, as IntradaySeries.
+
+    The 1-minute ring of the symbol is topped up with just the missing
+    ranges (never earlier than its retention allows), then rolled up.
+    Concurrent requests for a symbol share one fetch.
+    """
+    seconds = INTERVALS[interval]
+    now = int(time.time()) if now is None else now
+    first = max(first, now - RETENTION)
+    first -= first % seconds
+    key = symbol.upper()
+    ring = _ring(key)
+    with ring.lock:
+        stale = ring.since is None or first < ring.since and ring.size < ring.cap or time.time() - ring.fetched > TTL
+        if stale:
+            _fill(ring, symbol, first, now, get)
+        cols = ring.span(first, now)
+    agg = aggregate(cols, seconds)
+    return IntradaySeries(
+        memoryview(array("q", agg["stamp"].tobytes())),
+        *(memoryview(array("d", agg[f].tobytes())) for f in ("open", "high", "low", "close")),
+    )
+
+def stats():
+    with _lock:
+        return {k: {"bars": r.size, "since": r.since, "until": r.until} for k, r in _rings.items()}
@@ -0,0 +1,183 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import CancelledError
+
+SLOTS = int(os.getenv("HEAVY_SLOTS", str(max(1, min(4, (os.cpu_count() or 1) - 1)))))
+MAX_WAITING = int(os.getenv("HEAVY_MAX_WAITING", "16"))
+PER_CLIENT = int(os.getenv("HEAVY_PER_CLIENT", "2"))
+MAX_WAIT_SECONDS = float(os.getenv("HEAVY_MAX_WAIT_SECONDS", "60"))
+SUPERSEDED = "superseded by a newer request"
+DISCONNECTED = "client disconnected"
+
+class Rejected(Exception):
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+class Cancelled(CancelledError):
+    """The job was superseded, abandoned by its client or waited too long."""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+class Job:
+    """One admitted heavy request; `cancelled` is set once nobody wants its result.
+
+    Long computations pass `cancelled` down (e.g. to pipeline.run) so they
+    stop at their next check. wait() takes a slot and finish() frees it.
+    """
+
+    __slots__ = ("queue", "client", "lane", "cancelled", "reason", "granted", "started", "finished")
+
+    def __init__(self, queue, client, lane):
+        self.queue = queue
+        self.client = client
+        self.lane = lane
+        self.cancelled = threading.Event()
+        self.reason = None
+        self.granted = threading.Event()
+        self.started = None
+        self.finished = False
+
+    def wait(self, timeout=MAX_WAIT_SECONDS):
+        """Block until the job may run; raise Cancelled if it may not."""
+        if not self.granted.wait(timeout):
+            self.queue.cancel(self, "timed out waiting for a slot")
+        with self.queue._lock:
+            if self.cancelled.is_set():
+                self.queue._release(self)
+                raise Cancelled(self.reason)
+            self.started = time.time()
+
+    def finish(self):
+        self.queue.finish(self)
+
+class JobQueue:
+    """Bounded admission for heavy requests, with a few running at a time.
+
+    At most `slots` jobs run; the others wait, each client in its own FIFO,
+    and a freed slot goes to the next client in turn, so one client's
+    burst cannot starve the rest. submit() refuses a client already
+    holding `per_client` jobs, or anyone once `max_waiting` jobs wait.
+    A job submitted on a lane cancels the client's previous job on that
+    lane (a chart replaced by another symbol).
+    """
+
+    def __init__(self, slots=SLOTS, max_waiting=MAX_WAITING, per_client=PER_CLIENT):
+        self.slots = slots
+        self.max_waiting = max_waiting
+        self.per_client = per_client
+        self._lock = threading.Lock()
+        self._waiting = OrderedDict()
+        self._running = set()
+        self._lanes = {}
+        self._held = {}
+        self._seconds = 1.0
+        self.stats = {"admitted": 0, "rejected": 0, "superseded": 0, "cancelled": 0, "completed": 0}
+
+    def _retry_after(self):
+        queued = sum(len(q) for q in self._waiting.values())
+        return max(1.0, math.ceil(self._seconds * (queued + 1) / self.slots))
+
+    def submit(self, client, lane=None, per_client=None):
+        """Admit a job for client or raise Rejected.
+
+        per_client overrides the queue's cap for this client, e.g. for a
+        key shared by many anonymous users behind one address.
+        """
+        limit = self.per_client if per_client is None else per_client
+        with self._lock:
+            old = self._lanes.get((client, lane)) if lane is not None else None
+            if old is not None:
+                self._cancel(old, SUPERSEDED)
+                self.stats["superseded"] += 1
+            if self._held.get(client, 0) >= limit:
+                self.stats["rejected"] += 1
+                raise Rejected(f"at most {limit} heavy requests per client", self._retry_after())
+            if sum(len(q) for q in self._waiting.values()) >= self.max_waiting:
+                self.stats["rejected"] += 1
+                raise Rejected("server busy", self._retry_after())
+            job = Job(self, client, lane)
+            self._held[client] = self._held.get(client, 0) + 1
+            self._waiting.setdefault(client, deque()).append(job)
+            if lane is not None:
+                self._lanes[(client, lane)] = job
+            self.stats["admitted"] += 1
+            self._dispatch()
+        return job
+
+    def _dispatch(self):
+        while self._waiting and len(self._running) < self.slots:
+            client, q = next(iter(self._waiting.items()))
+            job = q.popleft()
+            if q:
+                self._waiting.move_to_end(client)
+            else:
+                del self._waiting[client]
+            self._running.add(job)
+            job.granted.set()
+
+    def _cancel(self, job, reason):
+        if job.finished or job.cancelled.is_set():
+            return
+        job.reason = reason
+        job.cancelled.set()
+        self.stats["cancelled"] += 1
+        if self._unqueue(job):
+            self._release(job)
+        job.granted.set()
+
+    def _unqueue(self, job):
+        """Take job out of the waiting queues; False if it was not waiting."""
+        q = self._waiting.get(job.client)
+        if q is None or job not in q:
+            return False
+        q.remove(job)
+        if not q:
+            del self._waiting[job.client]
+        return True
+
+    def cancel(self, job, reason="cancelled"):
+        with self._lock:
+            self._cancel(job, reason)
+
+    def abandon(self, job):
+        """The client went away: cancel job and free its slot unless it runs."""
+        with self._lock:
+            self._cancel(job, DISCONNECTED)
+            if job.started is None:
+                self._release(job)
+
+    def _release(self, job):
+        if job.finished:
+            return
+        job.finished = True
+        self._unqueue(job)
+        self._running.discard(job)
+        held = self._held.get(job.client, 0) - 1
+        if held > 0:
+            self._held[job.client] = held
+        else:
+            self._held.pop(job.client, None)
+        if job.lane is not None and self._lanes.get((job.client, job.lane)) is job:
+            del self._lanes[(job.client, job.lane)]
+        self._dispatch()
+
+    def finish(self, job):
+        with self._lock:
+            if job.started is not None and not job.finished and not job.cancelled.is_set():
+                self._seconds = 0.8 * self._seconds + 0.2 * (time.time() - job.started)
+                self.stats["completed"] += 1
+            self._release(job)
+
+    def info(self):
+        with self._lock:
+            return {
+                "slots": self.slots, "running": len(self._running),
+                "waiting": sum(len(q) for q in self._waiting.values()), "clients": len(self._held),
+                "avg_seconds": round(self._seconds, 3), **self.stats,
+            }
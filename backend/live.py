@@ -0,0 +1,268 @@
+import asyncio
+import json
+import math
+import os
+from collections import deque
+from datetime import date, datetime, timezone
+
+POLL_SECONDS = float(os.getenv("LIVE_POLL_SECONDS", "5"))
+HEARTBEAT_SECONDS = 15.0
+QUEUE_SIZE = 16
+
+def _alpha(span):
+    return 2 / (span + 1)
+
+class LastBar:
+    """Indicator state after the last committed bar.
+
+    Mirrors the /api/tv overlay definitions so that tick() can produce the
+    overlay values of a provisional bar in O(window) instead of
+    recomputing the whole series.
+    """
+
+    EMA_SPANS = (20, 50, 100, 200)
+
+    def __init__(self, bars, bb_period=20, bb_mul=2.0, rsi_period=14, stoch_period=14, stoch_d=3, macd=(12, 26, 9)):
+        self.bars = bars
+        self.bb_period = bb_period
+        self.bb_mul = bb_mul
+        self.rsi_period = rsi_period
+        self.stoch_period = stoch_period
+        self.stoch_d = stoch_d
+        self.fast, self.slow, self.signal = macd
+        closes = [b["close"] for b in bars]
+        self.prev_close = closes[-1] if closes else None
+        self.closes = deque(closes[-(bb_period - 1):], maxlen=max(bb_period - 1, 1))
+        self.highs = deque((b["high"] for b in bars[-(stoch_period - 1):]), maxlen=max(stoch_period - 1, 1))
+        self.lows = deque((b["low"] for b in bars[-(stoch_period - 1):]), maxlen=max(stoch_period - 1, 1))
+        self.ema = {}
+        for span in self.EMA_SPANS + (self.fast, self.slow):
+            self.ema[span] = self._ema_last(closes, span)
+        self.macd_sig = None
+        if len(closes) >= self.signal:
+            a = _alpha(self.signal)
+            ef = es = closes[0]
+            af, as_ = _alpha(self.fast), _alpha(self.slow)
+            sig = None
+            for c in closes:
+                ef = af * c + (1 - af) * ef
+                es = as_ * c + (1 - as_) * es
+                m = ef - es
+                sig = m if sig is None else a * m + (1 - a) * sig
+            self.macd_sig = sig
+        self.avg_gain, self.avg_loss = self._wilder(closes, rsi_period)
+        self.k_hist = deque(maxlen=max(stoch_d - 1, 1))
+        for i in range(max(0, len(bars) - stoch_d + 1), len(bars)):
+            self.k_hist.append(self._stoch_k(bars, i))
+
+    @staticmethod
+    def _ema_last(closes, span):
+        if not closes:
+            return None
+        a = _alpha(span)
+        e = closes[0]
+        for c in closes[1:]:
+            e = a * c + (1 - a) * e
+        return e
+
+    @staticmethod
+    def _wilder(closes, period):
+        if len(closes) < period + 1:
+            return None, None
+        gains = [max(closes[i] - closes[i - 1], 0.0) for i in range(1, len(closes))]
+        losses = [max(closes[i - 1] - closes[i], 0.0) for i in range(1, len(closes))]
+        g = sum(gains[:period]) / period
+        l = sum(losses[:period]) / period
+        for i in range(period, len(gains)):
+            g = (g * (period - 1) + gains[i]) / period
+            l = (l * (period - 1) + losses[i]) / period
+        return g, l
+
+    def _stoch_k(self, bars, i):
+        p = self.stoch_period
+        if i + 1 < p:
+            return None
+        hh = max(b["high"] for b in bars[i - p + 1 : i + 1])
+        ll = min(b["low"] for b in bars[i - p + 1 : i + 1])
+        return 0.0 if hh == ll else 100.0 * (bars[i]["close"] - ll) / (hh - ll)
+
+    def tick(self, o, h, l, c):
+        out = {"close": c}
+        for span in self.EMA_SPANS:
+            prev = self.ema[span]
+            out[f"ema{span}"] = c if prev is None else _alpha(span) * c + (1 - _alpha(span)) * prev
+
+        window = list(self.closes) + [c]
+        if len(window) >= self.bb_period:
+            m = sum(window) / self.bb_period
+            sd = math.sqrt(sum((x - m) ** 2 for x in window) / self.bb_period)
+            out.update(bb_upper=m + self.bb_mul * sd, bb_middle=m, bb_lower=m - self.bb_mul * sd)
+        else:
+            out.update(bb_upper=None, bb_middle=None, bb_lower=None)
+
+        rsi = None
+        if self.avg_gain is not None:
+            n = self.rsi_period
+            d = c - self.prev_close
+            g = (self.avg_gain * (n - 1) + max(d, 0.0)) / n
+            ls = (self.avg_loss * (n - 1) + max(-d, 0.0)) / n
+            rsi = 100.0 if ls == 0 else 100 - (100 / (1 + g / ls))
+        out["rsi14"] = rsi
+
+        k = None
+        if len(self.highs) + 1 >= self.stoch_period:
+            hh = max(max(self.highs), h)
+            ll = min(min(self.lows), l)
+            k = 0.0 if hh == ll else 100.0 * (c - ll) / (hh - ll)
+        ks = [x for x in list(self.k_hist) + [k] if x is not None]
+        out["stoch_k"] = k
+        out["stoch_d"] = sum(ks) / len(ks) if ks else None
+
+        ef, es = self.ema[self.fast], self.ema[self.slow]
+        if ef is None:
+            out.update(macd=None, macd_signal=None, macd_hist=None)
+        else:
+            macd = (_alpha(self.fast) * c + (1 - _alpha(self.fast)) * ef) - (_alpha(self.slow) * c + (1 - _alpha(self.slow)) * es)
+            sig = None
+            if self.macd_sig is not None:
+                sig = _alpha(self.signal) * macd + (1 - _alpha(self.signal)) * self.macd_sig
+            out.update(macd=macd, macd_signal=sig, macd_hist=None if sig is None else macd - sig)
+        return out
+
+    def push(self, o, h, l, c):
+        """Commit a finished bar and return its overlay values.
+
+        Same values as tick(), but the state then moves past the bar, so a
+        series can be followed bar by bar at O(window) per bar.
+        """
+        out = self.tick(o, h, l, c)
+        for span, prev in self.ema.items():
+            self.ema[span] = c if prev is None else _alpha(span) * c + (1 - _alpha(span)) * prev
+        if self.avg_gain is not None:
+            n = self.rsi_period
+            d = c - self.prev_close
+            self.avg_gain = (self.avg_gain * (n - 1) + max(d, 0.0)) / n
+            self.avg_loss = (self.avg_loss * (n - 1) + max(-d, 0.0)) / n
+        else:
+            self.avg_gain, self.avg_loss = self._wilder(list(self.closes) + [c], self.rsi_period)
+        if out["macd"] is not None:
+            self.macd_sig = out["macd"] if out["macd_signal"] is None else out["macd_signal"]
+        self.closes.append(c)
+        self.highs.append(h)
+        self.lows.append(l)
+        self.k_hist.append(out["stoch_k"])
+        self.prev_close = c
+        return out
+
+def _num(v):
+    try:
+        v = float(v)
+    except (TypeError, ValueError):
+        return None
+    return v if math.isfinite(v) and v > 0 else None
+
+def parse_tick(q):
+    if not isinstance(q, dict):
+        return None
+    c = _num(q.get("close"))
+    if c is None:
+        return None
+    o = _num(q.get("open")) or c
+    h = max(_num(q.get("high")) or c, c, o)
+    l = min(_num(q.get("low")) or c, c, o)
+    ts = q.get("timestamp")
+    try:
+        day = datetime.fromtimestamp(int(ts) + int(q.get("gmtoffset") or 0), tz=timezone.utc).date()
+    except (TypeError, ValueError, OverflowError):
+        day = date.today()
+    return {"time": day.isoformat(), "open": o, "high": h, "low": l, "close": c, "stamp": ts}
+
+class _Feed:
+    def __init__(self, hub, symbol):
+        self.hub = hub
+        self.symbol = symbol
+        self.queues = set()
+        self.state = None
+        self.state_day = None
+        self.last = None
+        self.task = None
+
+    async def _run(self):
+        while self.queues:
+            try:
+                msg = await self._poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                msg = {"symbol": self.symbol, "error": str(e)}
+            if msg is not None:
+                self.last = msg
+                for q in list(self.queues):
+                    if q.full():
+                        q.get_nowait()
+                    q.put_nowait(msg)
+            await asyncio.sleep(self.hub.interval)
+
+    async def _poll(self):
+        quote = await asyncio.to_thread(self.hub.fetch, self.symbol)
+        bar = parse_tick(quote)
+        if bar is None:
+            return None
+        if self.last and self.last.get("bar", {}).get("stamp") == bar["stamp"] and self.last["bar"]["close"] == bar["close"]:
+            return None
+        if self.state_day != bar["time"]:
+            committed = await asyncio.to_thread(self.hub.seed, self.symbol, date.fromisoformat(bar["time"]))
+            self.state = LastBar([b for b in committed if b["time"] < bar["time"]])
+            self.state_day = bar["time"]
+        overlay = self.state.tick(bar["open"], bar["high"], bar["low"], bar["close"])
+        overlay["time"] = bar["time"]
+        return {"symbol": self.symbol, "bar": bar, "overlay": overlay, "provisional": True}
+
+class Hub:
+    """One upstream poller per subscribed symbol, fanned out to all clients.
+
+    fetch(symbol) returns the raw real-time quote; seed(symbol, day) returns
+    committed candles ({time, open, high, low, close}) up to that day.
+    """
+
+    def __init__(self, fetch, seed, interval=POLL_SECONDS):
+        self.fetch = fetch
+        self.seed = seed
+        self.interval = interval
+        self.feeds = {}
+
+    def subscribe(self, symbol):
+        key = symbol.upper()
+        feed = self.feeds.get(key)
+        if feed is None:
+            feed = self.feeds[key] = _Feed(self, symbol)
+        q = asyncio.Queue(maxsize=QUEUE_SIZE)
+        if feed.last is not None:
+            q.put_nowait(feed.last)
+        feed.queues.add(q)
+        if feed.task is None or feed.task.done():
+            feed.task = asyncio.get_running_loop().create_task(feed._run())
+        return feed, q
+
+    def unsubscribe(self, feed, q):
+        feed.queues.discard(q)
+        if not feed.queues:
+            if feed.task is not None:
+                feed.task.cancel()
+            self.feeds.pop(feed.symbol.upper(), None)
+
+    def stats(self):
+        return {k: len(f.queues) for k, f in self.feeds.items()}
+
+    async def events(self, symbol):
+        feed, q = self.subscribe(symbol)
+        try:
+            while True:
+                try:
+                    msg = await asyncio.wait_for(q.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {json.dumps(msg)}\n\n"
+        finally:
+            self.unsubscribe(feed, q)
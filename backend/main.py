@@ -1,12 +1,16 @@
+from __future__ import annotations
+import math
 import os
 from datetime import date, timedelta
-import numpy as np
-import pandas as pd
-import requests
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
+from backend import breaker, history, quotes, warmup
 
 EODHD_BASE = "https://eodhd.com/api"
+INDICATOR_ROWS = 250
+INDICATOR_SPECS = (("rsi", 14), ("macd", 12, 26, 9), ("bb", 20))
+
+upstream = breaker.Breaker("eodhd")
 
 def _key() -> str:
     k = os.getenv("EODHD_API_KEY") or os.getenv("EODHD_TOKEN")
@@ -15,8 +19,21 @@ def _key() -> str:
     return k
 
 def _get(path: str, params: dict):
+    import requests
     params = {**params, "api_token": _key(), "fmt": "json"}
-    r = requests.get(f"{EODHD_BASE}/{path}", params=params, timeout=25)
+    try:
+        upstream.before()
+    except breaker.CircuitOpen as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
+    try:
+        r = requests.get(f"{EODHD_BASE}/{path}", params=params, timeout=breaker.TIMEOUT)
+    except requests.RequestException as e:
+        upstream.failure()
+        raise HTTPException(status_code=502, detail=f"EODHD unreachable: {type(e).__name__}")
+    if r.status_code >= 500 or r.status_code == 429:
+        upstream.failure()
+    else:
+        upstream.success()
     if r.status_code != 200:
         raise HTTPException(status_code=502, detail=f"EODHD error {r.status_code}: {r.text[:300]}")
     try:
@@ -25,6 +42,7 @@ def _get(path: str, params: dict):
         raise HTTPException(status_code=502, detail="EODHD returned non-JSON response")
 
 def _rsi(close: pd.Series, period: int = 14) -> pd.Series:
+    import numpy as np
     delta = close.diff()
     gain = delta.where(delta > 0, 0.0)
     loss = (-delta.where(delta < 0, 0.0))
@@ -63,27 +81,47 @@ app.add_middleware(
 def health():
     return {"status": "ok"}
 
+quote_service = quotes.QuoteService(lambda symbols: quotes.fetch_many(_get, symbols))
+
+def _symbol_list(symbols: str):
+    try:
+        return quotes.parse_symbols(symbols)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/api/quote")
 def quote(symbol: str = Query(..., min_length=1, max_length=32)):
-    data = _get(f"real-time/{symbol}", {})
-    if isinstance(data, dict) and data.get("code") and data.get("message"):
-        raise HTTPException(status_code=502, detail=f"EODHD: {data.get('message')}")
+    data = quote_service.get(symbol)
+    error = quotes.problem(data)
+    if error:
+        raise HTTPException(status_code=502, detail=error)
     return data
 
+@app.get("/api/quotes")
+def quotes_batch(symbols: str = Query(..., min_length=1, max_length=20000)):
+    wanted = _symbol_list(symbols)
+    found = quote_service.get_many(wanted)
+    return {
+        "quotes": {s.upper(): found[s.upper()] for s in wanted if s.upper() in found},
+        "missing": [s for s in wanted if s.upper() not in found],
+    }
+
 @app.get("/api/candles")
 def candles(
+    response: Response,
     symbol: str = Query(..., min_length=1, max_length=32),
     period: str = Query("d", pattern="^(d|w|m)$"),
     days: int = Query(200, ge=30, le=5000),
 ):
+    """Bars of the last days; held history that is merely out of date is
+    returned at once with X-Cache: stale while it refreshes in the background."""
     to_d = date.today()
     from_d = to_d - timedelta(days=days)
-    data = _get(
-        f"eod/{symbol}",
-        {"from": from_d.isoformat(), "to": to_d.isoformat(), "period": period},
-    )
+    data, stale = history.bars_swr(symbol, period, from_d, to_d, _get)
     if not isinstance(data, list) or len(data) == 0:
         raise HTTPException(status_code=502, detail="No candle data returned")
+    if stale:
+        response.headers["X-Cache"] = "stale"
     return data
 
 @app.get("/api/indicators")
@@ -92,7 +130,19 @@ def indicators(
     period: str = Query("d", pattern="^(d|w|m)$"),
     days: int = Query(260, ge=60, le=5000),
 ):
-    raw = candles(symbol=symbol, period=period, days=days)
+    """Last INDICATOR_ROWS bars of the days window with RSI, MACD and BB.
+
+    Only the output bars plus the warm-up INDICATOR_SPECS need are loaded
+    and computed; values match a full-history run to warmup.TOL.
+    """
+    import pandas as pd
+    to_d = date.today()
+    out_from = max(to_d - timedelta(days=days), warmup.fetch_start(to_d, period, INDICATOR_ROWS))
+    out_from = history.period_start(out_from, period)
+    fetch_from = warmup.fetch_start(out_from, period, warmup.bars_needed(INDICATOR_SPECS))
+    raw = history.bars(symbol, period, fetch_from, to_d, _get)
+    if not isinstance(raw, list) or len(raw) == 0:
+        raise HTTPException(status_code=502, detail="No candle data returned")
     df = pd.DataFrame(raw)
     for c in ["open", "high", "low", "close", "adjusted_close", "volume"]:
         if c in df.columns:
@@ -107,7 +157,9 @@ def indicators(
     macd, sig, hist = _macd(close)
     up, mid, low = _bb(close)
 
-    out = df.tail(250).copy()
+    out = df[df["date"] >= pd.Timestamp(out_from)].tail(INDICATOR_ROWS).copy()
+    if out.empty:
+        raise HTTPException(status_code=502, detail="No candle data returned")
     out["rsi14"] = rsi
     out["macd"] = macd
     out["macd_signal"] = sig
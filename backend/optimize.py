@@ -0,0 +1,319 @@
+"""Walk-forward fit of the _calc_signal weights over a symbol universe.
+
+    python -m backend.optimize --symbols AAPL.US,MSFT.US,SPY.US --name fitted
+
+Every daily bar of every symbol is reduced once to the signed rule hits of
+_calc_signal, so a candidate profile is scored with a matrix product
+instead of re-running the indicators. Candidates are integer weights and
+thresholds (the built-in profile is always one of them); each train
+window is searched by successive halving over symbol groups on a process
+pool, and the winner is scored on the following test window next to the
+built-in profile. The profile fitted on the most recent window is saved
+with profiles.save if the walk-forward fits beat the built-in profile out of
+sample (or with --force), and selected in /api/tv with ?profile=<name>.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+
+import numpy as np
+
+from backend import profiles
+
+# Signed per-bar hits of the rules in _calc_signal, in weight order; the
+# Elliott rule depends on the running score and is applied separately.
+RULES = ("bb", "ema_bonus", "rsi_strong", "rsi_weak", "macd_cross", "macd_pre", "stoch_both", "stoch_one")
+KEYS = RULES + ("elliott", "buy", "strong")
+SIGNAL_KEYS = ("bb_upper", "bb_lower", "ema20", "ema50", "ema200", "rsi14", "macd_hist", "stoch_k", "stoch_d")
+FEATURE_STAGES = ("bb", "macd", "stoch", "ema", "rsi", "psar", "overlays")
+STATES = {
+    "bb": {"bullish": ("bb", 1), "bearish": ("bb", -1)},
+    "rsi": {"strong_bullish": ("rsi_strong", 1), "weak_bullish": ("rsi_weak", 1),
+            "strong_bearish": ("rsi_strong", -1), "weak_bearish": ("rsi_weak", -1)},
+    "macd": {"bullish_cross": ("macd_cross", 1), "bearish_cross": ("macd_cross", -1),
+             "pre_bullish": ("macd_pre", 1), "pre_bearish": ("macd_pre", -1)},
+    "stoch": {"strong_bullish": ("stoch_both", 1), "bullish": ("stoch_one", 1),
+              "strong_bearish": ("stoch_both", -1), "bearish": ("stoch_one", -1)},
+}
+MAX_WEIGHT = 4
+BLOCK = 256
+
+assert set(KEYS) == set(profiles.DEFAULT)
+
+def extract(symbol, days):
+    """Rule hits of _calc_signal for each daily bar of the last days.
+
+    Bar t is scored as /api/tv would have scored it on that day: the
+    overlays up to t and Elliott on the bars up to t. Returns day numbers,
+    closes, an (n x RULES) int8 matrix and an (n x 3) bool matrix of the
+    Elliott states (wave 3 bullish, correction, wave 2 or 4).
+    """
+    from backend import app, pipeline
+    candles, skip = app._tv_series(symbol, "d", 0, days)
+    stages = {k: app.TV_STAGES[k] for k in FEATURE_STAGES}
+    r = pipeline.run(stages, {"candles": candles, "view": candles[skip:], "skip": skip})
+    view, overlays = r["view"], r["overlays"]
+    n = len(view)
+    feats = np.zeros((n, len(RULES)), dtype=np.int8)
+    ell = np.zeros((n, 3), dtype=bool)
+    col = {k: i for i, k in enumerate(RULES)}
+    for t in range(19, n):
+        lo = max(0, t - 4)
+        window = {k: overlays[k][lo:t + 1] for k in SIGNAL_KEYS}
+        upto = view[:t + 1]
+        elliott = app._stage_elliott(upto)
+        signal = app._calc_signal(upto, window, elliott)
+        details = signal["details"]
+        for name, states in STATES.items():
+            hit = states.get(details.get(name))
+            if hit is not None:
+                feats[t, col[hit[0]]] = hit[1]
+        close = view.close[t]
+        if details.get("bb") == "bullish" and all(close < window[k][-1] for k in ("ema20", "ema50", "ema200")):
+            feats[t, col["ema_bonus"]] = 1
+        if elliott:
+            structure = elliott.get("current_structure", "")
+            ell[t] = (
+                "Welle 3" in structure and elliott.get("direction", "") == "bullish",
+                "Korrektur" in structure,
+                "Welle 2" in structure or "Welle 4" in structure,
+            )
+        if _score(feats[t:t + 1], ell[t:t + 1], _matrix([profiles.DEFAULT]))[0, 0] != signal["score"]:
+            raise RuntimeError(f"rule hits disagree with _calc_signal at {symbol} {view.time(t)}")
+    return {
+        "day": np.asarray(view.day, dtype=np.int32),
+        "close": np.asarray(view.close, dtype=np.float64),
+        "feats": feats,
+        "ell": ell,
+    }
+
+def _matrix(weights):
+    return np.array([[w[k] for k in KEYS] for w in weights], dtype=np.int64)
+
+def _score(feats, ell, cands):
+    """(bars x candidates) scores, replaying the Elliott rule of _calc_signal."""
+    base = feats.astype(np.int64) @ cands[:, :len(RULES)].T
+    e = cands[:, len(RULES)]
+    w3, korr, w24 = (ell[:, i:i + 1] for i in range(3))
+    up = base > 0
+    return base + np.where(w3, e, np.where(korr & up, -e, np.where(w24 & up, e, 0)))
+
+def positions(scores, cands):
+    """Position per bar and candidate: +-2 on strong signals, +-1 on plain ones."""
+    buy = cands[:, -2]
+    strong = cands[:, -1]
+    return np.where(scores >= strong, 2, np.where(scores >= buy, 1, np.where(scores <= -strong, -2, np.where(scores <= -buy, -1, 0))))
+
+def candidates(n, seed):
+    """The built-in profile followed by up to n - 1 distinct random ones."""
+    rng = np.random.default_rng(seed)
+    rand = np.empty((max(n - 1, 0), len(KEYS)), dtype=np.int64)
+    rand[:, :len(RULES) + 1] = rng.integers(0, MAX_WEIGHT + 1, (len(rand), len(RULES) + 1))
+    rand[:, -2] = rng.integers(1, MAX_WEIGHT + 1, len(rand))
+    rand[:, -1] = rand[:, -2] + rng.integers(1, MAX_WEIGHT + 1, len(rand))
+    cands = np.vstack([_matrix([profiles.DEFAULT]), rand])
+    _, first = np.unique(cands, axis=0, return_index=True)
+    return cands[np.sort(first)]
+
+_data = []
+
+def _init(data, horizon):
+    """Pool initializer: keep the extracted series plus forward returns."""
+    from backend.sweep import forward_returns
+    _data.clear()
+    for d in data:
+        fwd_day = np.full(len(d["day"]), np.iinfo(np.int32).max, dtype=np.int64)
+        fwd_day[:-horizon] = d["day"][horizon:]
+        _data.append({**d, "fwd": forward_returns(d["close"], horizon), "fwd_day": fwd_day})
+
+def evaluate(cands, symbols, span, purge):
+    """Summed (trades, return, squared return, hits) per candidate.
+
+    Bars of the given symbols dated in span = [from, to) count; with purge
+    a bar also needs its forward return to be settled before span ends,
+    so a train window never sees prices of the test window after it.
+    """
+    out = np.zeros((len(cands), 4))
+    for s in symbols:
+        d = _data[s]
+        keep = (d["day"] >= span[0]) & (d["day"] < span[1]) & np.isfinite(d["fwd"])
+        if purge:
+            keep &= d["fwd_day"] < span[1]
+        if not keep.any():
+            continue
+        feats, ell, fwd = d["feats"][keep], d["ell"][keep], d["fwd"][keep][:, None]
+        for lo in range(0, len(cands), BLOCK):
+            block = cands[lo:lo + BLOCK]
+            pos = positions(_score(feats, ell, block), block)
+            ret = pos * fwd
+            part = out[lo:lo + BLOCK]
+            part[:, 0] += (pos != 0).sum(axis=0)
+            part[:, 1] += ret.sum(axis=0)
+            part[:, 2] += (ret * ret).sum(axis=0)
+            part[:, 3] += (ret > 0).sum(axis=0)
+    return out
+
+def objective(stats, min_trades):
+    """t-statistic of the mean position-weighted forward return."""
+    n, s, ss = stats[:, 0], stats[:, 1], stats[:, 2]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = s / n
+        sd = np.sqrt(np.maximum(ss / n - mean * mean, 0.0))
+        t = mean / sd * np.sqrt(n)
+    t[~np.isfinite(t) | (n < max(min_trades, 2))] = -np.inf
+    return t
+
+def summary(stats):
+    n, s, ss, hits = (float(v) for v in stats)
+    if n == 0:
+        return {"trades": 0, "mean": None, "hit_rate": None, "t": None}
+    mean = s / n
+    sd = math.sqrt(max(ss / n - mean * mean, 0.0))
+    return {
+        "trades": int(n),
+        "mean": round(mean, 6),
+        "hit_rate": round(hits / n, 4),
+        "t": round(mean / sd * math.sqrt(n), 3) if sd > 0 else None,
+    }
+
+def beats(fitted, default):
+    """Whether a fitted summary() has a higher t-statistic than default's."""
+    if fitted["t"] is None:
+        return False
+    return default["t"] is None or fitted["t"] > default["t"]
+
+def _run(pool, cands, groups, span, purge):
+    out = np.zeros((len(cands), 4))
+    for f in [pool.submit(evaluate, cands, g, span, purge) for g in groups if len(g)]:
+        out += f.result()
+    return out
+
+def search(pool, cands, symbols, span, min_trades, eta, workers, seed):
+    """Best candidate on span by successive halving over symbol groups.
+
+    Each rung adds the next group of symbols to the running totals of the
+    surviving candidates, then keeps the best 1/eta of them; the trade
+    minimum is scaled by the share of symbols seen so far.
+    """
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(symbols)
+    rungs = max(1, min(len(order), int(math.log(len(cands), eta)) + 1))
+    alive = np.arange(len(cands))
+    totals = np.zeros((len(cands), 4))
+    seen = 0
+    for r, group in enumerate(np.array_split(order, rungs)):
+        totals[alive] += _run(pool, cands[alive], np.array_split(group, workers), span, True)
+        seen += len(group)
+        score = objective(totals[alive], min_trades * seen / len(order))
+        if r == rungs - 1:
+            break
+        keep = max(1, math.ceil(len(alive) / eta))
+        alive = alive[np.argsort(-score, kind="stable")[:keep]]
+    best = alive[int(np.argmax(score))]
+    if not np.isfinite(score.max()):
+        best = 0
+    return best, totals[best]
+
+def folds(first, last, train, test):
+    """Rolling (train span, test span) pairs of day numbers up to last."""
+    out = []
+    start = first
+    while start + train <= last:
+        end = min(start + train + test, last + 1)
+        out.append(((start, start + train), (start + train, end)))
+        start += test
+    return out
+
+def walk_forward(data, symbols, args, pool):
+    from backend.archive import from_day
+    cands = candidates(args.candidates, args.seed)
+    idx = np.arange(len(data))
+    groups = np.array_split(idx, args.workers)
+    first = min(int(d["day"][0]) for d in data)
+    last = max(int(d["day"][-1]) for d in data)
+    report = {"symbols": symbols, "horizon": args.horizon, "candidates": len(cands), "folds": []}
+    oos = {"default": np.zeros(4), "fitted": np.zeros(4)}
+    for k, (train, test) in enumerate(folds(first, last, args.train, args.test)):
+        best, _ = search(pool, cands, idx, train, args.min_trades, args.eta, args.workers, args.seed + k)
+        test_stats = _run(pool, cands[[0, best]], groups, test, False)
+        oos["default"] += test_stats[0]
+        oos["fitted"] += test_stats[1]
+        report["folds"].append({
+            "train": [from_day(train[0]), from_day(train[1] - 1)],
+            "test": [from_day(test[0]), from_day(test[1] - 1)],
+            "weights": dict(zip(KEYS, cands[best].tolist())),
+            "default": summary(test_stats[0]),
+            "fitted": summary(test_stats[1]),
+        })
+        print(f"[optimize] fold {k + 1}: test {report['folds'][-1]['test']} "
+              f"default t={report['folds'][-1]['default']['t']} fitted t={report['folds'][-1]['fitted']['t']}",
+              file=sys.stderr, flush=True)
+    report["out_of_sample"] = {name: summary(v) for name, v in oos.items()}
+    span = (max(first, last + 1 - args.train), last + 1)
+    best, stats = search(pool, cands, idx, span, args.min_trades, args.eta, args.workers, args.seed - 1)
+    report["fitted_on"] = [from_day(span[0]), from_day(span[1] - 1)]
+    report["in_sample"] = summary(stats)
+    return dict(zip(KEYS, cands[best].tolist())), report
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--symbols", required=True, help="comma-separated symbols, or @file with one per line")
+    ap.add_argument("--name", default="fitted", help="profile name to save")
+    ap.add_argument("--days", type=int, default=3650, help="calendar days of history per symbol")
+    ap.add_argument("--horizon", type=int, default=10, help="bars a signal is held")
+    ap.add_argument("--train", type=int, default=3 * 365, help="calendar days per train window")
+    ap.add_argument("--test", type=int, default=182, help="calendar days per test window")
+    ap.add_argument("--candidates", type=int, default=2000)
+    ap.add_argument("--eta", type=int, default=3, help="successive halving keeps 1/eta per rung")
+    ap.add_argument("--min-trades", type=int, default=50, help="minimum signals for a candidate to count")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--report", help="also write the report to this file")
+    ap.add_argument("--dry-run", action="store_true", help="fit and report without saving the profile")
+    ap.add_argument("--force", action="store_true", help="save even if the fit loses to the default out of sample")
+    args = ap.parse_args()
+    if args.eta < 2 or args.horizon < 1 or args.workers < 1:
+        ap.error("--eta must be >= 2, --horizon and --workers >= 1")
+    if args.symbols.startswith("@"):
+        with open(args.symbols[1:]) as f:
+            symbols = [line.strip() for line in f if line.strip()]
+    else:
+        symbols = [s.strip() for s in args.symbols.split(",") if s.strip()]
+
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    ctx = multiprocessing.get_context("spawn")
+    data, used, missing = [], [], []
+    with ProcessPoolExecutor(args.workers, mp_context=ctx) as pool:
+        futures = [(s, pool.submit(extract, s, args.days)) for s in symbols]
+        for s, f in futures:
+            try:
+                data.append(f.result())
+                used.append(s.upper())
+            except Exception as e:
+                print(f"[optimize] {s}: {e}", file=sys.stderr, flush=True)
+                missing.append(s.upper())
+    if not data:
+        sys.exit("no symbol could be loaded")
+    with ProcessPoolExecutor(args.workers, mp_context=ctx, initializer=_init, initargs=(data, args.horizon)) as pool:
+        weights, report = walk_forward(data, used, args, pool)
+    report["missing"] = missing
+    report["weights"] = weights
+    oos = report["out_of_sample"]
+    print(f"[optimize] out of sample: default {oos['default']} fitted {oos['fitted']}", file=sys.stderr)
+    if args.dry_run:
+        pass
+    elif beats(oos["fitted"], oos["default"]) or args.force:
+        profiles.save(args.name, weights, report)
+    else:
+        print(f"[optimize] not saving {args.name!r}: the fit does not beat the default out of sample (--force saves anyway)",
+              file=sys.stderr)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(weights))
+
+if __name__ == "__main__":
+    main()
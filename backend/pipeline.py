@@ -0,0 +1,42 @@
+from concurrent.futures import FIRST_COMPLETED, CancelledError, wait
+
+CANCEL_POLL = 0.05
+
+def run(stages, inputs, pool=None, inline=(), cancel=None):
+    """Run a small dependency graph and return every stage's result.
+
+    stages maps name -> (fn, deps); fn is called with the results of deps
+    in order, and inputs seeds the results. A stage is submitted to pool
+    as soon as its deps are done, so independent stages overlap. Without a
+    pool, and for stages named in inline, fn runs in the calling thread.
+    Once the event cancel is set, run raises CancelledError at its next
+    check and stages not yet started on the pool are dropped.
+    """
+    results = dict(inputs)
+    pending = dict(stages)
+    running = {}
+    try:
+        while pending or running:
+            ready = [name for name, (_, deps) in pending.items() if all(d in results for d in deps)]
+            for name in ready:
+                if cancel is not None and cancel.is_set():
+                    raise CancelledError()
+                fn, deps = pending.pop(name)
+                args = [results[d] for d in deps]
+                if pool is None or name in inline:
+                    results[name] = fn(*args)
+                else:
+                    running[pool.submit(fn, *args)] = name
+            if ready and not running:
+                continue
+            if not running:
+                raise ValueError(f"stages with unmet deps: {sorted(pending)}")
+            done, _ = wait(running, timeout=None if cancel is None else CANCEL_POLL, return_when=FIRST_COMPLETED)
+            if cancel is not None and cancel.is_set():
+                raise CancelledError()
+            for f in done:
+                results[running.pop(f)] = f.result()
+    finally:
+        for f in running:
+            f.cancel()
+    return results
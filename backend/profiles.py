@@ -0,0 +1,59 @@
+import json
+import os
+import re
+import tempfile
+
+PROFILE_DIR = os.getenv("SIGNAL_PROFILE_DIR", os.path.join(tempfile.gettempdir(), "mvp-profiles"))
+NAME = re.compile(r"^[A-Za-z0-9_-]{1,40}$")
+
+# Weights and thresholds of _calc_signal as originally hand-set. Bullish
+# and bearish rules share a weight; sell thresholds mirror the buy ones.
+DEFAULT = {
+    "bb": 2,
+    "ema_bonus": 1,
+    "rsi_strong": 3,
+    "rsi_weak": 1,
+    "macd_cross": 2,
+    "macd_pre": 1,
+    "stoch_both": 3,
+    "stoch_one": 2,
+    "elliott": 1,
+    "buy": 2,
+    "strong": 4,
+}
+
+_cache = {}
+
+def path(name):
+    return os.path.join(PROFILE_DIR, f"{name}.json")
+
+def save(name, weights, report=None):
+    """Store a profile atomically; report is kept alongside for reference."""
+    if not NAME.match(name) or name == "default":
+        raise ValueError(f"invalid profile name {name!r}")
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=PROFILE_DIR, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump({"weights": {k: weights[k] for k in DEFAULT}, "report": report}, f, indent=2)
+    os.replace(tmp, path(name))
+
+def load(name):
+    """Weights of a named profile, re-read when its file changes.
+
+    Returns None for unknown names; "default" is the built-in profile.
+    """
+    if name == "default":
+        return DEFAULT
+    if not NAME.match(name):
+        return None
+    try:
+        mtime = os.stat(path(name)).st_mtime
+    except OSError:
+        return None
+    hit = _cache.get(name)
+    if hit is not None and hit[0] == mtime:
+        return hit[1]
+    with open(path(name)) as f:
+        weights = {**DEFAULT, **json.load(f)["weights"]}
+    _cache[name] = (mtime, weights)
+    return weights
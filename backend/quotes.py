@@ -0,0 +1,139 @@
+import os
+import threading
+import time
+
+WINDOW = float(os.getenv("QUOTE_BATCH_WINDOW", "0.02"))
+TTL = float(os.getenv("QUOTE_TTL", "2"))
+BATCH_MAX = int(os.getenv("QUOTE_BATCH_MAX", "50"))
+WAIT_TIMEOUT = 45.0
+MAX_SYMBOLS = 500
+
+def parse_symbols(text):
+    """Unique symbols of a comma-separated list, in order.
+
+    Raises ValueError unless it names 1-MAX_SYMBOLS tickers of at most
+    32 characters.
+    """
+    out = [s.strip() for s in text.split(",") if s.strip()]
+    if not out or len(out) > MAX_SYMBOLS or any(len(s) > 32 for s in out):
+        raise ValueError(f"symbols must be 1-{MAX_SYMBOLS} comma-separated tickers")
+    return list(dict.fromkeys(out))
+
+def problem(data):
+    """Why data is not a usable quote, or None if it is one."""
+    if not isinstance(data, dict):
+        return "No quote returned"
+    if data.get("code") and data.get("message"):
+        return f"EODHD: {data.get('message')}"
+    return None
+
+def fetch_many(get, symbols):
+    """One EODHD real-time call for up to BATCH_MAX symbols.
+
+    The first symbol goes in the path and the rest in s=; EODHD answers
+    with a single object for one symbol and a list otherwise.
+    """
+    first, rest = symbols[0], symbols[1:]
+    data = get(f"real-time/{first}", {"s": ",".join(rest)} if rest else {})
+    rows = data if isinstance(data, list) else [data]
+    rows = [r for r in rows if isinstance(r, dict)]
+    out = {str(r.get("code", "")).upper(): r for r in rows}
+    if len(rows) == len(symbols) and not all(s.upper() in out for s in symbols):
+        out = {s.upper(): r for s, r in zip(symbols, rows)}
+    return out
+
+class _Batch:
+    def __init__(self):
+        self.symbols = []
+        self.results = {}
+        self.error = None
+        self.done = threading.Event()
+
+class QuoteService:
+    """Coalesces concurrent quote lookups into multi-symbol upstream calls.
+
+    Misses arriving within `window` seconds of each other are collected into
+    one pending batch; the first caller fetches it (in chunks of
+    `batch_max`) while the others wait. Results are cached for `ttl`
+    seconds, and symbols already in flight are never requested twice.
+    """
+
+    def __init__(self, fetch, window=WINDOW, ttl=TTL, batch_max=BATCH_MAX):
+        self.fetch = fetch
+        self.window = window
+        self.ttl = ttl
+        self.batch_max = batch_max
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._pending = None
+        self._inflight = {}
+        self.stats = {"hits": 0, "misses": 0, "upstream_calls": 0}
+
+    def get(self, symbol):
+        return self.get_many([symbol]).get(symbol.upper())
+
+    def get_many(self, symbols):
+        keys = list(dict.fromkeys(s.upper() for s in symbols))
+        now = time.monotonic()
+        out = {}
+        waits = {}
+        lead = None
+        with self._lock:
+            for k in keys:
+                hit = self._cache.get(k)
+                if hit is not None and hit[0] > now:
+                    out[k] = hit[1]
+                    self.stats["hits"] += 1
+                    continue
+                self.stats["misses"] += 1
+                batch = self._inflight.get(k)
+                if batch is None:
+                    if self._pending is None:
+                        self._pending = lead = _Batch()
+                    batch = self._pending
+                    batch.symbols.append(k)
+                    self._inflight[k] = batch
+                waits[k] = batch
+        if lead is not None:
+            time.sleep(self.window)
+            with self._lock:
+                if self._pending is lead:
+                    self._pending = None
+            self._run(lead)
+        for k, batch in waits.items():
+            if not batch.done.wait(WAIT_TIMEOUT):
+                raise TimeoutError(f"quote batch for {k} timed out")
+            if k in batch.results:
+                out[k] = batch.results[k]
+            elif batch.error is not None:
+                raise batch.error
+        return out
+
+    def _run(self, batch):
+        try:
+            for i in range(0, len(batch.symbols), self.batch_max):
+                chunk = batch.symbols[i : i + self.batch_max]
+                with self._lock:
+                    self.stats["upstream_calls"] += 1
+                res = self.fetch(chunk)
+                expires = time.monotonic() + self.ttl
+                with self._lock:
+                    for k in chunk:
+                        if k in res:
+                            batch.results[k] = res[k]
+                            self._cache[k] = (expires, res[k])
+        except Exception as e:
+            batch.error = e
+        finally:
+            with self._lock:
+                for k in batch.symbols:
+                    if self._inflight.get(k) is batch:
+                        del self._inflight[k]
+                self._prune()
+            batch.done.set()
+
+    def _prune(self):
+        if len(self._cache) > 4 * self.batch_max + 1000:
+            now = time.monotonic()
+            for k in [k for k, (exp, _) in self._cache.items() if exp <= now]:
+                del self._cache[k]
@@ -0,0 +1,174 @@
+from array import array
+from datetime import datetime, timezone
+from backend.archive import from_day, to_day
+
+FIELDS = ("open", "high", "low", "close")
+
+class Bar:
+    """Read-only view of one bar; supports bar["close"] like the old dicts."""
+
+    __slots__ = ("_s", "_i")
+
+    def __init__(self, series, i):
+        self._s = series
+        self._i = i
+
+    def __getitem__(self, key):
+        if key == "time":
+            return self._s.time(self._i)
+        return getattr(self._s, key)[self._i]
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except AttributeError:
+            return default
+
+    @property
+    def time(self):
+        return self._s.time(self._i)
+
+    @property
+    def open(self):
+        return self._s.open[self._i]
+
+    @property
+    def high(self):
+        return self._s.high[self._i]
+
+    @property
+    def low(self):
+        return self._s.low[self._i]
+
+    @property
+    def close(self):
+        return self._s.close[self._i]
+
+class CandleSeries:
+    """OHLC bars as typed columns: int32 days since 1970 and float64 prices.
+
+    Columns are memoryviews, so slicing shares the underlying arrays.
+    Indexing returns a Bar view for code written against per-bar dicts;
+    hot loops should read the columns directly.
+    """
+
+    __slots__ = ("day",) + FIELDS + ("_times",)
+
+    def __init__(self, day, open, high, low, close):
+        self.day = day
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self._times = None
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Valid bars from EODHD-shaped rows, sorted by date.
+
+        Rows missing date/high/low/close or with non-positive or inverted
+        prices are skipped; open falls back to close.
+        """
+        day, o_, h_, l_, c_ = array("i"), array("d"), array("d"), array("d"), array("d")
+        for r in sorted(rows, key=lambda x: x.get("date", "")):
+            d = r.get("date")
+            o = r.get("open")
+            h = r.get("high")
+            l = r.get("low")
+            c = r.get("close")
+            if d is None or h is None or l is None or c is None:
+                continue
+            try:
+                c = float(c)
+                h = float(h)
+                l = float(l)
+                o = float(o) if o is not None else c
+            except Exception as e:
+                raise ValueError(f"{e}; raw: c={c!r} h={h!r} l={l!r} o={o!r}")
+            if not (c > 0 and h > 0 and l > 0 and h >= l):
+                continue
+            day.append(to_day(d))
+            o_.append(o)
+            h_.append(h)
+            l_.append(l)
+            c_.append(c)
+        return cls(memoryview(day), memoryview(o_), memoryview(h_), memoryview(l_), memoryview(c_))
+
+    @classmethod
+    def from_columns(cls, cols):
+        """Valid bars from date-sorted archive.Columns, as from_rows() keeps them.
+
+        Missing values are NaN there. When every bar is valid the series
+        shares the columns' memory (e.g. the mmap'd archive) instead of
+        copying it.
+        """
+        import numpy as np
+        o, h, l, c = (np.frombuffer(getattr(cols, f), dtype=np.float64) for f in FIELDS)
+        with np.errstate(invalid="ignore"):
+            ok = (c > 0) & (h > 0) & (l > 0) & (h >= l)
+        no_open = np.isnan(o)
+        if ok.all() and not no_open.any():
+            return cls(cols.date, cols.open, cols.high, cols.low, cols.close)
+        o = np.where(no_open, c, o)
+        day = np.frombuffer(cols.date, dtype=np.int32)
+        return cls(*(memoryview(np.ascontiguousarray(v[ok])) for v in (day, o, h, l, c)))
+
+    def __len__(self):
+        return len(self.day)
+
+    def __reduce__(self):
+        return (_from_bytes, (self.day.tobytes(),) + tuple(getattr(self, f).tobytes() for f in FIELDS))
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return type(self)(self.day[i], self.open[i], self.high[i], self.low[i], self.close[i])
+        if i < 0:
+            i += len(self.day)
+        if not 0 <= i < len(self.day):
+            raise IndexError("bar index out of range")
+        return Bar(self, i)
+
+    def __iter__(self):
+        for i in range(len(self.day)):
+            yield Bar(self, i)
+
+    def time(self, i):
+        return from_day(self.day[i])
+
+    def times(self):
+        """ISO dates of all bars, built once per series."""
+        if self._times is None:
+            self._times = [from_day(d) for d in self.day.tolist()]
+        return self._times
+
+    def columns(self):
+        return {"time": self.times(), **{f: getattr(self, f) for f in FIELDS}}
+
+def _from_bytes(day, *cols):
+    return CandleSeries(memoryview(array("i", day)), *(memoryview(array("d", c)) for c in cols))
+
+class IntradaySeries(CandleSeries):
+    """Intraday bars: the day column holds each bar's start in unix seconds (int64).
+
+    Everything else behaves like CandleSeries, so the /api/tv stages run on
+    it unchanged; times are UTC ISO stamps such as 2024-05-01T13:30:00Z.
+    """
+
+    __slots__ = ()
+
+    def __reduce__(self):
+        return (_intraday_from_bytes, (self.day.tobytes(),) + tuple(getattr(self, f).tobytes() for f in FIELDS))
+
+    def time(self, i):
+        return _stamp(self.day[i])
+
+    def times(self):
+        if self._times is None:
+            self._times = [_stamp(t) for t in self.day.tolist()]
+        return self._times
+
+def _stamp(t):
+    return datetime.fromtimestamp(t, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def _intraday_from_bytes(stamp, *cols):
+    return IntradaySeries(memoryview(array("q", stamp)), *(memoryview(array("d", c)) for c in cols))
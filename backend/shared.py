@@ -0,0 +1,237 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+CACHE_PATH = os.getenv("SHARED_CACHE_PATH", os.path.join(tempfile.gettempdir(), "mvp-cache.sqlite3"))
+PAYLOAD_DIR = os.getenv("SHARED_PAYLOAD_DIR", CACHE_PATH + ".payloads" if CACHE_PATH else "")
+LOCK_TTL = float(os.getenv("SHARED_LOCK_TTL", "60"))
+POLL = 0.05
+
+_local = threading.local()
+_owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+_sets = 0
+
+def enabled() -> bool:
+    return bool(CACHE_PATH)
+
+def _conn():
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "pid", None) != os.getpid():
+        conn = sqlite3.connect(CACHE_PATH, timeout=10, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS locks (key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL)")
+        _local.conn = conn
+        _local.pid = os.getpid()
+    return conn
+
+def get(key):
+    text = get_raw(key)
+    return None if text is None else json.loads(text)
+
+def get_raw(key):
+    if not enabled():
+        return None
+    row = _conn().execute("SELECT value, expires FROM kv WHERE key = ?", (key,)).fetchone()
+    if row is None or row[1] < time.time():
+        return None
+    return row[0]
+
+def items_raw(prefix):
+    """Unexpired (key, json_text) pairs whose key starts with prefix."""
+    if not enabled():
+        return []
+    return _conn().execute(
+        "SELECT key, value FROM kv WHERE key >= ? AND key < ? AND expires >= ?",
+        (prefix, prefix + "\uffff", time.time()),
+    ).fetchall()
+
+def put(key, value, ttl):
+    put_raw(key, json.dumps(value, separators=(",", ":")), ttl)
+
+def put_raw(key, text, ttl):
+    global _sets
+    if not enabled():
+        return
+    conn = _conn()
+    now = time.time()
+    conn.execute("INSERT OR REPLACE INTO kv (key, value, expires) VALUES (?, ?, ?)", (key, text, now + ttl))
+    _sets += 1
+    if _sets % 200 == 0:
+        _evict(conn, now)
+
+def _evict(conn, now):
+    stale = conn.execute("SELECT key FROM kv WHERE key >= 'file:' AND key < 'file;' AND expires < ?", (now,)).fetchall()
+    for (key,) in stale:
+        try:
+            os.unlink(_payload_file(key[5:]))
+        except OSError:
+            pass
+    conn.execute("DELETE FROM kv WHERE expires < ?", (now,))
+    conn.execute("DELETE FROM locks WHERE expires < ?", (now,))
+
+def _payload_file(key):
+    return os.path.join(PAYLOAD_DIR, hashlib.sha1(key.encode()).hexdigest() + ".json")
+
+def payload_path(key):
+    """File holding the cached payload for key, or None if missing or expired.
+
+    Large responses are cached as files next to the database so hits can be
+    streamed from the page cache instead of loaded into memory.
+    """
+    if not enabled() or not PAYLOAD_DIR or get(f"file:{key}") is None:
+        return None
+    path = _payload_file(key)
+    return path if os.path.exists(path) else None
+
+def open_payload(key):
+    """The cached payload for key opened for reading, or None if missing,
+    expired or evicted since. An open file stays readable after eviction."""
+    path = payload_path(key)
+    if path is None:
+        return None
+    try:
+        return open(path, "rb")
+    except OSError:
+        return None
+
+def payload_items(prefix):
+    """Unexpired (key, path) pairs of file payloads whose key starts with prefix."""
+    out = []
+    for key, _ in items_raw(f"file:{prefix}"):
+        path = _payload_file(key[5:])
+        if os.path.exists(path):
+            out.append((key[5:], path))
+    return out
+
+def link_payload(key, alias, ttl):
+    """Make the payload of key also readable as alias, without copying it.
+
+    The alias is a hard link, so it outlives the expiry of key; where links
+    are not supported the file is copied instead.
+    """
+    if not enabled() or not PAYLOAD_DIR:
+        return
+    src = _payload_file(key)
+    dst = _payload_file(alias)
+    tmp = f"{dst}.{_owner}.tmp"
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+    put(f"file:{alias}", {"size": os.path.getsize(dst)}, ttl)
+
+class PayloadWriter:
+    """Writes a payload file chunk by chunk; it becomes visible on commit()."""
+
+    def __init__(self, key, ttl):
+        self.key = key
+        self.ttl = ttl
+        self.size = 0
+        self.f = None
+        self.tmp = None
+        if enabled() and PAYLOAD_DIR:
+            os.makedirs(PAYLOAD_DIR, exist_ok=True)
+            fd, self.tmp = tempfile.mkstemp(dir=PAYLOAD_DIR, suffix=".tmp")
+            self.f = os.fdopen(fd, "wb")
+
+    @property
+    def stored(self):
+        """Whether chunks go to a file (shared cache and payload dir enabled)."""
+        return self.f is not None
+
+    def write(self, chunk):
+        if self.f is not None:
+            data = chunk.encode() if isinstance(chunk, str) else chunk
+            self.f.write(data)
+            self.size += len(data)
+
+    def commit(self):
+        """Publish the payload and return its path (None when not stored)."""
+        if self.f is None:
+            return None
+        self.f.close()
+        self.f = None
+        path = _payload_file(self.key)
+        os.replace(self.tmp, path)
+        put(f"file:{self.key}", {"size": self.size}, self.ttl)
+        return path
+
+    def discard(self):
+        if self.f is None:
+            return
+        self.f.close()
+        self.f = None
+        try:
+            os.unlink(self.tmp)
+        except OSError:
+            pass
+
+def _acquire(key):
+    now = time.time()
+    cur = _conn().execute(
+        "INSERT INTO locks (key, owner, expires) VALUES (?, ?, ?) "
+        "ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, expires = excluded.expires "
+        "WHERE locks.expires < ?",
+        (key, _owner, now + LOCK_TTL, now),
+    )
+    return cur.rowcount == 1
+
+def _release(key):
+    _conn().execute("DELETE FROM locks WHERE key = ? AND owner = ?", (key, _owner))
+
+def renew(key):
+    """Push a held lock's expiry LOCK_TTL ahead; False if it is no longer ours.
+
+    Holders of long-running locks call this well within LOCK_TTL so the
+    lock is not taken over as if they had crashed.
+    """
+    if not enabled():
+        return True
+    cur = _conn().execute(
+        "UPDATE locks SET expires = ? WHERE key = ? AND owner = ?", (time.time() + LOCK_TTL, key, _owner)
+    )
+    return cur.rowcount == 1
+
+@contextmanager
+def single_flight(key, timeout=LOCK_TTL):
+    """Hold a machine-wide lock on key; yields False if it timed out waiting.
+
+    Expired locks (crashed holders) are taken over, so a dead worker can
+    only stall a key for SHARED_LOCK_TTL seconds.
+    """
+    if not enabled():
+        yield True
+        return
+    deadline = time.time() + timeout
+    got = _acquire(key)
+    while not got and time.time() < deadline:
+        time.sleep(POLL)
+        got = _acquire(key)
+    try:
+        yield got
+    finally:
+        if got:
+            _release(key)
+
+def get_or_compute(key, ttl, compute):
+    """Cached value for key, computing it in at most one worker at a time."""
+    hit = get(key)
+    if hit is not None:
+        return hit
+    with single_flight(f"compute:{key}"):
+        hit = get(key)
+        if hit is not None:
+            return hit
+        value = compute()
+        put(key, value, ttl)
+        return value
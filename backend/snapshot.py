@@ -0,0 +1,105 @@
+import gzip
+import json
+import os
+import tempfile
+import time
+from backend import archive, history, shared
+
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", os.path.join(tempfile.gettempdir(), "mvp-snapshot.gz"))
+SNAPSHOT_SYMBOLS = int(os.getenv("SNAPSHOT_SYMBOLS", "20"))
+VERSION = 1
+
+def enabled() -> bool:
+    return bool(SNAPSHOT_PATH)
+
+def ephemeral() -> bool:
+    """Whether the snapshot lives under the temp dir, which a restarted
+    host (e.g. a Render instance without a disk) does not keep."""
+    tmp = os.path.realpath(tempfile.gettempdir())
+    return enabled() and os.path.realpath(SNAPSHOT_PATH).startswith(tmp + os.sep)
+
+def _record(f, kind, key, data):
+    f.write(f"{kind}\t{key}\t{len(data)}\n".encode())
+    f.write(data)
+
+def _records(f):
+    while True:
+        line = f.readline()
+        if not line:
+            return
+        kind, key, size = line.decode().rstrip("\n").split("\t")
+        yield kind, key, f.read(int(size))
+
+def save(payload_prefixes=("tv:", "ipo:")):
+    """Persist the hottest symbols' archive files and their cached payloads.
+
+    The snapshot is a gzip stream of length-prefixed records holding the
+    raw archive bytes, the already-serialized cache values and payload
+    files, so restoring it is a copy rather than a parse.
+    """
+    if not enabled():
+        return None
+    hot = history.hot(SNAPSHOT_SYMBOLS)
+    folder = os.path.dirname(SNAPSHOT_PATH) or "."
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=folder, suffix=".tmp")
+    counts = {"symbols": 0, "payloads": 0}
+    with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=3) as f:
+        _record(f, "meta", "", json.dumps({"version": VERSION, "saved": time.time()}).encode())
+        for key in hot:
+            data = archive.read_bytes(key) if archive.enabled() else None
+            if data:
+                _record(f, "archive", key, data)
+                counts["symbols"] += 1
+        for prefix in payload_prefixes:
+            for key, text in shared.items_raw(prefix):
+                if key.split(":")[1] in hot:
+                    _record(f, "kv", key, text.encode())
+                    counts["payloads"] += 1
+            for key, file in shared.payload_items(prefix):
+                if key.split(":")[1] in hot:
+                    with open(file, "rb") as src:
+                        _record(f, "file", key, src.read())
+                    counts["payloads"] += 1
+    os.replace(tmp, SNAPSHOT_PATH)
+    return counts
+
+def restore(payload_ttl):
+    """Load the snapshot into the archive and shared cache, once per machine.
+
+    Archive files are only written where the snapshot is newer than what is
+    on disk. tv payloads are restored with a fresh payload_ttl when their
+    key pins today's date; older ones are skipped.
+    """
+    if not enabled() or not os.path.exists(SNAPSHOT_PATH):
+        return None
+    with shared.single_flight("snapshot:restore") as got:
+        if not got or shared.get("snapshot:restored") is not None:
+            return None
+        today = time.strftime("%Y-%m-%d")
+        counts = {"symbols": 0, "payloads": 0}
+        with gzip.open(SNAPSHOT_PATH, "rb") as f:
+            for kind, key, data in _records(f):
+                if kind == "meta":
+                    if json.loads(data).get("version") != VERSION:
+                        return None
+                elif kind == "archive":
+                    head = archive.header(key)
+                    if head is None or head[2] < archive.HEADER.unpack_from(data)[5]:
+                        archive.write_bytes(key, data)
+                        counts["symbols"] += 1
+                elif kind == "kv":
+                    if key.startswith("ipo:"):
+                        shared.put_raw(key, data.decode(), 7 * 24 * 3600)
+                    elif key.endswith(today):
+                        shared.put_raw(key, data.decode(), payload_ttl)
+                    else:
+                        continue
+                    counts["payloads"] += 1
+                elif kind == "file" and key.endswith(today):
+                    writer = shared.PayloadWriter(key, payload_ttl)
+                    writer.write(data)
+                    writer.commit()
+                    counts["payloads"] += 1
+        shared.put("snapshot:restored", time.time(), 3600)
+        return counts
@@ -0,0 +1,20 @@
+import sys
+import time
+
+T0 = time.perf_counter()
+
+_phases = {}
+
+def mark(name):
+    """Record the first time a startup phase is reached, in ms since import.
+
+    Phases are served by /api/startup and logged to stderr, keeping stdout
+    clean for CLI tools that import the app (e.g. backend.optimize).
+    """
+    if name in _phases:
+        return
+    _phases[name] = round((time.perf_counter() - T0) * 1000, 1)
+    print(f"[startup] {name} +{_phases[name]}ms", file=sys.stderr, flush=True)
+
+def phases():
+    return dict(_phases)
@@ -0,0 +1,223 @@
+import os
+
+MAX_CONFIGS = int(os.getenv("SWEEP_MAX_CONFIGS", "2500"))
+
+def grid(text, cast=float):
+    """Values from "start:stop[:step]" (stop inclusive) or "a,b,c"."""
+    text = text.strip()
+    if ":" in text:
+        parts = [float(x) for x in text.split(":")]
+        if len(parts) not in (2, 3):
+            raise ValueError(f"bad range {text!r}")
+        start, stop = parts[0], parts[1]
+        step = parts[2] if len(parts) == 3 else 1.0
+        if step <= 0 or stop < start:
+            raise ValueError(f"bad range {text!r}")
+        count = int((stop - start) / step + 1e-9) + 1
+        values = [cast(round(start + i * step, 10)) for i in range(count)]
+    else:
+        values = [cast(x) for x in text.split(",") if x.strip()]
+    if not values or len(values) > MAX_CONFIGS:
+        raise ValueError(f"grid {text!r} must have 1-{MAX_CONFIGS} values")
+    return list(dict.fromkeys(values))
+
+def to_json(a):
+    """A 1-D array as a JSON-ready list: rounded, NaN and inf as None."""
+    import numpy as np
+    a = np.round(np.asarray(a, dtype=np.float64), 6)
+    a[~np.isfinite(a)] = np.nan
+    return [None if v != v else v for v in a.tolist()]
+
+def forward_returns(closes, horizon):
+    """log(close[t + horizon] / close[t]); NaN where the future is unknown."""
+    import numpy as np
+    c = np.asarray(closes, dtype=np.float64)
+    out = np.full(len(c), np.nan)
+    if len(c) > horizon:
+        out[:-horizon] = np.log(c[horizon:] / c[:-horizon])
+    return out
+
+def _mean_where(values, mask):
+    """Row-wise mean of values where mask holds; NaN for empty rows."""
+    import numpy as np
+    ok = mask & np.isfinite(values)
+    n = ok.sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(ok, values, 0.0).sum(axis=-1) / n
+
+def rsi_matrix(closes, periods):
+    """RSI for every period at once, shape (len(periods), len(closes)).
+
+    Steps through time once with the Wilder state of all periods held in
+    arrays. Values equal backend.app._rsi(closes, p)[:len(closes)],
+    including its one-bar lag, with None as NaN.
+    """
+    import numpy as np
+    c = np.asarray(closes, dtype=np.float64)
+    n = len(c)
+    p_int = np.asarray(periods, dtype=np.int64)
+    p = p_int.astype(np.float64)
+    out_g = np.full((len(p), n), np.nan)
+    out_l = np.full((len(p), n), np.nan)
+    if n < 2:
+        return out_g
+    d = np.diff(c)
+    gains = np.maximum(d, 0.0)
+    losses = np.maximum(-d, 0.0)
+    cum_g = np.cumsum(gains)
+    cum_l = np.cumsum(losses)
+    ag = np.full(len(p), np.nan)
+    al = np.full(len(p), np.nan)
+    for k in range(max(int(p_int.min()) - 1, 0), n - 1):
+        run = p_int - 1 < k
+        seed = p_int - 1 == k
+        ag = np.where(run, (ag * (p - 1) + gains[k]) / p, np.where(seed, cum_g[k] / p, ag))
+        al = np.where(run, (al * (p - 1) + losses[k]) / p, np.where(seed, cum_l[k] / p, al))
+        if k + 2 < n:
+            out_g[:, k + 2] = ag
+            out_l[:, k + 2] = al
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rsi = np.where(out_l == 0, 100.0, 100 - (100 / (1 + (out_g / out_l))))
+    rsi[np.isnan(out_g)] = np.nan
+    return rsi
+
+def rsi_summary(rsi, closes, low=30.0, high=70.0, horizon=10):
+    """Per-period distribution and forward returns after extreme readings."""
+    import numpy as np
+    fwd = forward_returns(closes, horizon)[None, :]
+    valid = np.isfinite(rsi)
+    with np.errstate(invalid="ignore"):
+        below = valid & (rsi < low)
+        above = valid & (rsi > high)
+        entries = below[:, 1:] & ~below[:, :-1]
+    count = valid.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return {
+            "mean": _mean_where(rsi, valid),
+            "share_below": below.sum(axis=1) / count,
+            "share_above": above.sum(axis=1) / count,
+            "entries_below": entries.sum(axis=1).astype(np.float64),
+            "fwd_below": _mean_where(np.broadcast_to(fwd, rsi.shape), below),
+            "fwd_above": _mean_where(np.broadcast_to(fwd, rsi.shape), above),
+        }
+
+def rolling_mean_std(closes, period):
+    """Rolling mean and population std over period bars; NaN until full."""
+    import numpy as np
+    c = np.asarray(closes, dtype=np.float64)
+    mid = np.full(len(c), np.nan)
+    sd = np.full(len(c), np.nan)
+    if len(c) >= period:
+        win = np.lib.stride_tricks.sliding_window_view(c, period)
+        mid[period - 1:] = win.mean(axis=1)
+        sd[period - 1:] = win.std(axis=1)
+    return mid, sd
+
+def bb_summary(closes, periods, widths, horizon=10, skip=0):
+    """Band statistics for every (period, width) pair, period-major order.
+
+    For each period the rolling mean/std are computed once and all widths
+    are evaluated together as a (widths x bars) array. The first skip bars
+    only warm up the bands and are left out of the statistics and %b.
+    """
+    import numpy as np
+    full = np.asarray(closes, dtype=np.float64)
+    c = full[skip:]
+    k = np.asarray(widths, dtype=np.float64)[:, None]
+    fwd = np.broadcast_to(forward_returns(c, horizon), (len(widths), len(c)))
+    stats = {name: [] for name in ("share_above", "share_below", "mean_width", "fwd_below", "fwd_above")}
+    pct_b = []
+    for period in periods:
+        mid, sd = rolling_mean_std(full, period)
+        mid, sd = mid[skip:], sd[skip:]
+        upper = mid + k * sd
+        lower = mid - k * sd
+        valid = np.broadcast_to(np.isfinite(mid), upper.shape)
+        above = valid & (c > upper)
+        below = valid & (c < lower)
+        count = valid.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            stats["share_above"].append(above.sum(axis=1) / count)
+            stats["share_below"].append(below.sum(axis=1) / count)
+            stats["mean_width"].append(_mean_where((upper - lower) / mid, valid))
+            pct_b.append((c - lower) / (upper - lower))
+        stats["fwd_below"].append(_mean_where(fwd, below))
+        stats["fwd_above"].append(_mean_where(fwd, above))
+    return {name: np.concatenate(v) for name, v in stats.items()}, np.vstack(pct_b)
+
+def zigzag_pivots(highs, lows, closes, deviations, min_bars):
+    """Zigzag pivots for every (deviation, min_bars) config in one pass.
+
+    Mirrors backend.app._zigzag_scan with a fixed threshold per config; the
+    state machines of all configs advance together bar by bar. Returns one
+    pivot list of (idx, price, "H"/"L") per config, cleaned the same way.
+    """
+    import numpy as np
+    h = np.asarray(highs, dtype=np.float64)
+    l = np.asarray(lows, dtype=np.float64)
+    dev = np.asarray(deviations, dtype=np.float64)
+    mb = np.asarray(min_bars, dtype=np.int64)
+    g = len(dev)
+    out = [[] for _ in range(g)]
+    if len(h) == 0:
+        return out
+    last = np.full(g, float(closes[0]))
+    trend = np.zeros(g, dtype=np.int8)
+    ext_i = np.zeros(g, dtype=np.int64)
+    ext_p = last.copy()
+    for i in range(1, len(h)):
+        hi, lo = h[i], l[i]
+        flat = trend == 0
+        if flat.any():
+            up = flat & ((hi - last) / last >= dev)
+            dn = flat & ~up & ((last - lo) / lo >= dev)
+            trend[up] = 1
+            trend[dn] = -1
+            ext_i[up | dn] = i
+            ext_p[up] = hi
+            ext_p[dn] = lo
+        rising = (trend == 1) & ~flat
+        falling = (trend == -1) & ~flat
+        new_hi = rising & (hi > ext_p)
+        new_lo = falling & (lo < ext_p)
+        ext_p[new_hi] = hi
+        ext_p[new_lo] = lo
+        ext_i[new_hi | new_lo] = i
+        with np.errstate(divide="ignore", invalid="ignore"):
+            top = rising & ((ext_p - lo) / lo >= dev) & (i - ext_i >= mb)
+            bottom = falling & ((hi - ext_p) / ext_p >= dev) & (i - ext_i >= mb)
+        for j in np.flatnonzero(top | bottom):
+            out[j].append((int(ext_i[j]), float(ext_p[j]), "H" if top[j] else "L"))
+        if top.any() or bottom.any():
+            turn = top | bottom
+            last[turn] = ext_p[turn]
+            ext_i[turn] = i
+            trend[top] = -1
+            trend[bottom] = 1
+            ext_p[top] = lo
+            ext_p[bottom] = hi
+    for j in range(g):
+        if trend[j]:
+            out[j].append((int(ext_i[j]), float(ext_p[j]), "H" if trend[j] == 1 else "L"))
+        out[j] = _clean(sorted(out[j], key=lambda x: x[0]))
+    return out
+
+def _clean(pivots):
+    cleaned = []
+    for pv in pivots:
+        if cleaned and pv[2] == cleaned[-1][2]:
+            if (pv[2] == "H" and pv[1] >= cleaned[-1][1]) or (pv[2] == "L" and pv[1] <= cleaned[-1][1]):
+                cleaned[-1] = pv
+        else:
+            cleaned.append(pv)
+    return cleaned
+
+def zigzag_summary(pivots):
+    """Pivot count, mean swing size and mean bars between pivots per config."""
+    count, swing, spacing = [], [], []
+    for pv in pivots:
+        count.append(float(len(pv)))
+        legs = list(zip(pv, pv[1:]))
+        swing.append(sum(abs(b[1] - a[1]) / a[1] for a, b in legs) / len(legs) if legs else float("nan"))
+        spacing.append(sum(b[0] - a[0] for a, b in legs) / len(legs) if legs else float("nan"))
+    return {"pivots": count, "mean_swing": swing, "mean_bars": spacing}
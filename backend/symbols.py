@@ -0,0 +1,172 @@
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+from backend import shared
+
+EXCHANGES = [e.strip().upper() for e in os.getenv("SYMBOL_EXCHANGES", "US").split(",") if e.strip()]
+TTL = float(os.getenv("SYMBOL_LIST_TTL", str(24 * 3600)))
+KEEP = 30 * 24 * 3600
+SCAN_MAX = 400
+SHORT_QUERY = 2
+COUNTRIES = {"US": "USA", "LSE": "UK", "XETRA": "Germany", "F": "Germany", "PA": "France", "TO": "Canada"}
+TYPE_RANK = {"COMMON STOCK": 0, "ETF": 1, "FUND": 2, "PREFERRED STOCK": 3}
+
+_lock = threading.Lock()
+_index = None
+_refreshing = False
+
+def _norm(text):
+    return " ".join("".join(ch if ch.isalnum() or ch in ".-&" else " " for ch in str(text).upper()).split())
+
+def _fetch(get, exchange):
+    data = get(f"exchange-symbol-list/{exchange}", {})
+    if not isinstance(data, list):
+        raise ValueError(f"unexpected symbol list for {exchange}")
+    return [
+        [str(r.get("Code") or ""), str(r.get("Name") or ""), exchange, str(r.get("Country") or ""),
+         str(r.get("Type") or ""), str(r.get("Currency") or "")]
+        for r in data if isinstance(r, dict) and r.get("Code")
+    ]
+
+def load(get, exchange):
+    """Symbol rows for an exchange from the shared cache, refetched after TTL.
+
+    The list is kept for KEEP seconds, so an upstream outage falls back to
+    the last good copy instead of an empty search.
+    """
+    key = f"symbols:{exchange}"
+    hit = shared.get(key)
+    if hit is not None and time.time() - hit["fetched"] < TTL:
+        return hit["rows"]
+    with shared.single_flight(f"compute:{key}"):
+        fresh = shared.get(key)
+        if fresh is not None and time.time() - fresh["fetched"] < TTL:
+            return fresh["rows"]
+        try:
+            rows = _fetch(get, exchange)
+        except Exception:
+            if hit is not None:
+                return hit["rows"]
+            raise
+        shared.put(key, {"fetched": time.time(), "rows": rows}, KEEP)
+        return rows
+
+class Index:
+    """Sorted prefix keys (tickers, names, name tails) mapped to symbol rows.
+
+    A query is a bisect into the key list plus a bounded scan of the
+    matching range; exact tickers are looked up directly so they rank
+    first even when the range is cut off. Results for one- and
+    two-character queries, the widest ranges, are memoized.
+    """
+
+    __slots__ = ("rows", "keys", "ids", "kinds", "order", "prefs", "exact", "short", "built")
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.exact = {}
+        self.short = {}
+        self.prefs = {}
+        static = []
+        pairs = []
+        for i, r in enumerate(rows):
+            code = r[0].upper()
+            self.exact.setdefault(code, []).append(i)
+            static.append((TYPE_RANK.get(r[4].upper(), 4), len(code), code, r[2], i))
+            pairs.append((code, 1, i))
+            name = _norm(r[1])
+            if name and name != code:
+                pairs.append((name, 2, i))
+                words = name.split()
+                for k in range(1, len(words)):
+                    if len(words[k]) > 1:
+                        pairs.append((" ".join(words[k:]), 3, i))
+        self.order = array("i", bytes(4 * len(rows)))
+        for pos, key in enumerate(sorted(static)):
+            self.order[key[-1]] = pos
+        pairs.sort()
+        self.keys = [k for k, _, _ in pairs]
+        self.kinds = array("b", (m for _, m, _ in pairs))
+        self.ids = array("i", (i for _, _, i in pairs))
+        self.built = time.time()
+
+    def _penalty(self, prefer):
+        """Per-row 0/1 flags for rows outside the preferred exchange/country."""
+        flags = self.prefs.get(prefer)
+        if flags is None:
+            flags = bytearray(
+                0 if not prefer or prefer in (ex, country.upper()) or COUNTRIES.get(prefer) == country else 1
+                for _, _, ex, country, _, _ in self.rows
+            )
+            if len(self.prefs) < 16:
+                self.prefs[prefer] = flags
+        return flags
+
+    def search(self, query, prefer="", limit=10):
+        q = _norm(query)
+        if not q:
+            return []
+        prefer = prefer.upper()
+        memo = (q, prefer, limit) if len(q) <= SHORT_QUERY else None
+        if memo in self.short:
+            return self.short[memo]
+        best = {}
+        for i in self.exact.get(q, ()):
+            best[i] = 0
+        lo = bisect_left(self.keys, q)
+        for j in range(lo, min(len(self.keys), lo + SCAN_MAX)):
+            if not self.keys[j].startswith(q):
+                break
+            i = self.ids[j]
+            m = self.kinds[j]
+            if best.get(i, 9) > m:
+                best[i] = m
+        flags = self._penalty(prefer)
+        n = len(self.rows)
+        order = self.order
+        ranked = sorted(best, key=lambda i: (best[i] * 2 + flags[i]) * n + order[i])
+        out = [self.record(i) for i in ranked[:limit]]
+        if memo is not None and len(self.short) < 4096:
+            self.short[memo] = out
+        return out
+
+    def record(self, i):
+        code, name, exchange, country, kind, currency = self.rows[i]
+        return {
+            "code": f"{code}.{exchange}", "Code": code, "Name": name, "Exchange": exchange,
+            "Country": country, "Type": kind, "Currency": currency,
+        }
+
+def _build(get):
+    rows = []
+    for exchange in EXCHANGES:
+        rows.extend(load(get, exchange))
+    return Index(rows)
+
+def _refresh(get):
+    global _index, _refreshing
+    try:
+        _index = _build(get)
+    except Exception as e:
+        print(f"[symbols] refresh failed: {e}", flush=True)
+        if _index is not None:
+            _index.built = time.time() - TTL + 60
+    finally:
+        _refreshing = False
+
+def index(get):
+    """The process-wide index; rebuilt in the background once it is TTL old."""
+    global _index, _refreshing
+    idx = _index
+    if idx is not None:
+        if time.time() - idx.built >= TTL and not _refreshing:
+            _refreshing = True
+            threading.Thread(target=_refresh, args=(get,), name="symbols-refresh", daemon=True).start()
+        return idx
+    with _lock:
+        if _index is None:
+            _index = _build(get)
+        return _index
@@ -0,0 +1,154 @@
+import math
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+FANOUT = int(os.getenv("TILE_FANOUT", "4"))
+TILE_BARS = int(os.getenv("TILE_BARS", "256"))
+MAX_PYRAMIDS = int(os.getenv("TILE_MAX_PYRAMIDS", "16"))
+TTL = float(os.getenv("TILE_TTL", "300"))
+PRICE_KEYS = ("open", "high", "low", "close")
+
+_lock = threading.Lock()
+_pyramids = OrderedDict()
+
+def _column(values):
+    return array("d", (math.nan if v is None else v for v in values))
+
+class Pyramid:
+    """Bars and overlays of one history at FANOUT**level bars per row.
+
+    Level 0 holds every bar; each row of level L + 1 rolls up FANOUT rows
+    of level L: time and open of the first, high/low over all, close and
+    overlay values of the last (what the chart showed at the bucket's
+    end). Levels stop once one tile of TILE_BARS rows covers the history.
+    Numeric columns are float64 arrays with NaN for missing values.
+
+    splice() replaces the bars from some index on and rebuilds only the
+    buckets above them, so a new day touches the last row of each level
+    and leaves every earlier tile (and its encoded form) as it was.
+    """
+
+    def __init__(self, overlay_keys):
+        self.overlay_keys = tuple(k for k in overlay_keys if k not in ("time", "close"))
+        self.keys = PRICE_KEYS + self.overlay_keys
+        self.day = array("i")
+        self.levels = []
+        self.encoded = {}
+        self.checked = 0.0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.day)
+
+    def unchanged(self, candles):
+        """How many leading bars of candles the pyramid already holds as is.
+
+        The last held bar may still have been forming, so it only counts
+        when it is identical; a different start means a rebuild.
+        """
+        n = len(self.day)
+        if not n or len(candles) < n or candles.day[0] != self.day[0] or candles.day[n - 1] != self.day[n - 1]:
+            return 0
+        base = self.levels[0]
+        if all(getattr(candles, k)[n - 1] == base[k][n - 1] for k in PRICE_KEYS):
+            return n
+        return n - 1
+
+    def splice(self, keep, days, times, cols):
+        """Keep the first keep bars and append the given ones after them."""
+        if not self.levels:
+            self.levels.append({"time": [], **{k: array("d") for k in self.keys}})
+        base = self.levels[0]
+        del self.day[keep:]
+        self.day.extend(days)
+        del base["time"][keep:]
+        base["time"].extend(times)
+        for k in self.keys:
+            del base[k][keep:]
+            base[k].extend(_column(cols[k]))
+        self._rebuild(keep)
+
+    def _rebuild(self, start):
+        import numpy as np
+        self._forget(0, start)
+        level = 0
+        while len(self.levels[level]["time"]) > TILE_BARS:
+            below = self.levels[level]
+            n = len(below["time"])
+            level += 1
+            if level == len(self.levels):
+                self.levels.append({"time": [], **{k: array("d") for k in self.keys}})
+                start = 0
+            row = start // FANOUT
+            first = row * FANOUT
+            starts = np.arange(first, n, FANOUT)
+            ends = np.minimum(starts + FANOUT, n) - 1
+            cur = self.levels[level]
+            del cur["time"][row:]
+            cur["time"].extend(below["time"][i] for i in starts.tolist())
+            for k in self.keys:
+                col = np.frombuffer(below[k], dtype=np.float64)
+                if k == "open":
+                    out = col[starts]
+                elif k == "high":
+                    out = np.maximum.reduceat(col[first:], starts - first)
+                elif k == "low":
+                    out = np.minimum.reduceat(col[first:], starts - first)
+                else:
+                    out = col[ends]
+                del cur[k][row:]
+                cur[k].frombytes(out.tobytes())
+            self._forget(level, row)
+            start = row
+        del self.levels[level + 1:]
+        for key in [k for k in self.encoded if k[0] > level]:
+            del self.encoded[key]
+
+    def _forget(self, level, row):
+        """Drop encoded tiles of level that contain rows from row on."""
+        for key in [k for k in self.encoded if k[0] == level and (k[1] + 1) * TILE_BARS > row]:
+            del self.encoded[key]
+
+    def level_for(self, first, last, max_rows):
+        """Finest level showing the ISO time range [first, last] in max_rows."""
+        for level, rows in enumerate(self.levels):
+            t = rows["time"]
+            if bisect_right(t, last) - bisect_left(t, first) <= max_rows:
+                return level
+        return len(self.levels) - 1
+
+    def tile_range(self, level, first, last):
+        """Indexes of the tiles of level overlapping the ISO time range."""
+        t = self.levels[level]["time"]
+        lo = max(bisect_right(t, first) - 1, 0)
+        hi = max(bisect_right(t, last) - 1, 0)
+        return range(lo // TILE_BARS, min(hi, len(t) - 1) // TILE_BARS + 1)
+
+    def tile(self, level, index):
+        """(columns, complete) of a tile; a complete tile can no longer change."""
+        rows = self.levels[level]
+        lo, hi = index * TILE_BARS, min((index + 1) * TILE_BARS, len(rows["time"]))
+        cols = {"time": rows["time"][lo:hi], **{k: rows[k][lo:hi] for k in self.keys}}
+        return cols, hi * FANOUT ** level <= len(self.day)
+
+def get(key, overlay_keys):
+    """The pyramid cached under key, created empty if missing."""
+    with _lock:
+        pyr = _pyramids.get(key)
+        if pyr is None:
+            pyr = _pyramids[key] = Pyramid(overlay_keys)
+        _pyramids.move_to_end(key)
+        while len(_pyramids) > MAX_PYRAMIDS:
+            _pyramids.popitem(last=False)
+    return pyr
+
+def due(pyr):
+    return not len(pyr) or time.time() - pyr.checked > TTL
+
+def stats():
+    with _lock:
+        return {k: {"bars": len(p), "levels": len(p.levels), "encoded": len(p.encoded)} for k, p in _pyramids.items()}
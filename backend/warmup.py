@@ -0,0 +1,57 @@
+import math
+import os
+from datetime import timedelta
+
+TOL = float(os.getenv("INDICATOR_WARMUP_TOL", "1e-4"))
+PSAR_BARS = int(os.getenv("PSAR_WARMUP_BARS", "250"))
+# Calendar days per bar; intraday bars assume 390-minute sessions.
+DAYS_PER_BAR = {"d": 1.5, "w": 7, "m": 31, "1m": 1.5 / 390, "5m": 1.5 / 78, "15m": 1.5 / 26, "30m": 1.5 / 13, "1h": 1.5 / 7}
+SLACK_DAYS = 14
+
+def ema_bars(span, tol=TOL):
+    """Bars after which the seed carries at most tol of an EMA's weight."""
+    alpha = 2 / (span + 1)
+    return math.ceil(math.log(tol) / math.log(1 - alpha))
+
+def wilder_bars(period, tol=TOL):
+    """Same for Wilder smoothing (alpha 1/period) after its SMA seed."""
+    return period + 1 + math.ceil(math.log(tol) / math.log(1 - 1 / period))
+
+def bars_needed(specs, tol=TOL):
+    """Warm-up bars so every indicator in specs converges to within tol.
+
+    specs holds tuples like ("ema", 200), ("rsi", 14), ("macd", 12, 26, 9),
+    ("bb", 20), ("stoch", 14, 3) or ("psar",). Exponential indicators are
+    bounded by the weight left on pre-warm-up data, so their values differ
+    from a full-history run by at most tol times the input's range.
+    Window indicators are exact after their window. PSAR is path dependent;
+    it re-synchronises at the first reversal both runs share, which
+    PSAR_BARS covers with a wide margin on daily data.
+    """
+    need = 0
+    for kind, *p in specs:
+        if kind == "ema":
+            n = ema_bars(p[0], tol)
+        elif kind == "rsi":
+            n = wilder_bars(p[0], tol)
+        elif kind == "macd":
+            n = ema_bars(max(p[0], p[1]), tol) + ema_bars(p[2], tol)
+        elif kind == "bb":
+            n = p[0] - 1
+        elif kind == "stoch":
+            n = p[0] + p[1] - 2
+        elif kind == "psar":
+            n = PSAR_BARS
+        else:
+            raise ValueError(f"unknown indicator {kind!r}")
+        need = max(need, n)
+    return need
+
+def days_for(bars, period):
+    """Calendar days that hold at least bars of period; the 3 extra days
+    keep a short span from falling on a long weekend."""
+    return math.ceil(bars * DAYS_PER_BAR[period]) + 3
+
+def fetch_start(out_start, period, bars):
+    """Calendar date far enough before out_start to cover bars of period."""
+    return out_start - timedelta(days=math.ceil(bars * DAYS_PER_BAR[period]) + SLACK_DAYS)
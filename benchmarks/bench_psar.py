@@ -0,0 +1,70 @@
+"""Compare the array-based PSAR against the old per-element pandas loop.
+
+Run from the repo root:  python -m benchmarks.bench_psar [bars]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import indicators
+from backend.app import _psar
+
+
+def _psar_iloc(h, l, af=0.02, af_max=0.2):
+    # Previous implementation, kept verbatim as the reference.
+    sar=h.copy()*0; bull=True; ep=l.iloc[0]; sar.iloc[0]=l.iloc[0]; a=af
+    for i in range(1,len(h)):
+        prev=sar.iloc[i-1]
+        sar.iloc[i]=prev+a*(ep-prev)
+        if bull:
+            if l.iloc[i]<sar.iloc[i]:
+                bull=False; sar.iloc[i]=ep; ep=l.iloc[i]; a=0.02
+            else:
+                if h.iloc[i]>ep: ep=h.iloc[i]; a=min(af_max,a+af)
+                sar.iloc[i]=min(sar.iloc[i], l.iloc[i-1], l.iloc[i-2] if i>1 else l.iloc[i-1])
+        else:
+            if h.iloc[i]>sar.iloc[i]:
+                bull=True; sar.iloc[i]=ep; ep=h.iloc[i]; a=0.02
+            else:
+                if l.iloc[i]<ep: ep=l.iloc[i]; a=min(af_max,a+af)
+                sar.iloc[i]=max(sar.iloc[i], h.iloc[i-1], h.iloc[i-2] if i>1 else h.iloc[i-1])
+    return sar
+
+
+def _series(n, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, n)))
+    spread = np.abs(rng.normal(0, 0.01, n)) * close
+    return pd.Series(close + spread), pd.Series(close - spread)
+
+
+def _best(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(n=10000):
+    h, l = _series(n)
+    ref = _psar_iloc(h, l)
+    new = indicators.psar(h, l)
+    lst = _psar(h.tolist(), l.tolist())
+    assert np.array_equal(ref.to_numpy(), new.to_numpy()), "indicators.psar differs from reference"
+    assert np.array_equal(ref.to_numpy(), np.asarray(lst)), "backend _psar differs from reference"
+
+    t_ref = _best(lambda: _psar_iloc(h, l), 1)
+    t_new = _best(lambda: indicators.psar(h, l), 5)
+    t_lst = _best(lambda: _psar(h.tolist(), l.tolist()), 5)
+    print(f"bars={n}")
+    print(f"iloc loop        {t_ref * 1000:9.2f} ms")
+    print(f"indicators.psar  {t_new * 1000:9.2f} ms  x{t_ref / t_new:.0f}")
+    print(f"backend _psar    {t_lst * 1000:9.2f} ms  x{t_ref / t_lst:.0f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,207 @@
+"""Local stand-in for the EODHD endpoints the backend uses.
+
+Serves deterministic synthetic data for any symbol so the backend can be
+exercised without an API key or network access:
+
+    python -m benchmarks.fake_upstream --port 9100
+    EODHD_BASE=http://127.0.0.1:9100/api EODHD_API_KEY=x \\
+        uvicorn backend.app:app --port 8000
+    curl -N "http://127.0.0.1:8000/api/stream?symbol=AAPL.US"
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import zlib
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FIRST_DAY = date(1990, 1, 2)
+
+_lock = threading.Lock()
+_history = {}
+_stats = {"requests": 0, "by_path": {}}
+
+def _rng(symbol):
+    return random.Random(zlib.crc32(symbol.upper().encode()))
+
+def daily_bars(symbol):
+    """Weekday bars from FIRST_DAY up to today, fixed per symbol."""
+    key = symbol.upper()
+    with _lock:
+        bars = _history.get(key)
+    if bars is not None:
+        return bars
+    rnd = _rng(key)
+    price = 5 + rnd.random() * 95
+    d = FIRST_DAY
+    today = date.today()
+    bars = []
+    while d <= today:
+        if d.weekday() < 5:
+            o = price
+            price = max(0.5, price * math.exp(rnd.gauss(0.0002, 0.018)))
+            h = max(o, price) * (1 + abs(rnd.gauss(0, 0.006)))
+            l = min(o, price) * (1 - abs(rnd.gauss(0, 0.006)))
+            bars.append({
+                "date": d.isoformat(),
+                "open": round(o, 4),
+                "high": round(h, 4),
+                "low": round(l, 4),
+                "close": round(price, 4),
+                "adjusted_close": round(price, 4),
+                "volume": rnd.randint(10_000, 5_000_000),
+            })
+        d += timedelta(days=1)
+    with _lock:
+        _history[key] = bars
+    return bars
+
+def real_time(symbol):
+    bars = daily_bars(symbol)
+    last = bars[-1]
+    now = int(time.time())
+    wiggle = 1 + 0.002 * math.sin(now / 7.0 + zlib.crc32(symbol.encode()) % 97)
+    close = round(last["close"] * wiggle, 4)
+    return {
+        "code": symbol,
+        "timestamp": now,
+        "gmtoffset": 0,
+        "open": last["open"],
+        "high": max(last["high"], close),
+        "low": min(last["low"], close),
+        "close": close,
+        "volume": last["volume"],
+        "previousClose": bars[-2]["close"],
+        "change": round(close - bars[-2]["close"], 4),
+        "change_p": round((close / bars[-2]["close"] - 1) * 100, 4),
+    }
+
+SESSION_OPEN = 13 * 3600 + 30 * 60
+SESSION_MINUTES = 390
+
+def intraday(symbol, params):
+    """1-minute bars of 13:30-20:00 UTC weekday sessions in [from, to].
+
+    Each session walks from that day's daily open; like EODHD, one request
+    covers at most 120 days and nothing later than now.
+    """
+    now = int(time.time())
+    lo = int(params.get("from", now - 86400))
+    hi = min(int(params.get("to", now)), lo + 120 * 86400, now)
+    opens = {b["date"]: b["open"] for b in daily_bars(symbol)}
+    out = []
+    d = date.fromtimestamp(lo - lo % 86400)
+    while True:
+        base = (d - date(1970, 1, 1)).days * 86400 + SESSION_OPEN
+        if base > hi:
+            break
+        price = opens.get(d.isoformat())
+        if price is not None and base + SESSION_MINUTES * 60 > lo:
+            rnd = random.Random(zlib.crc32(f"{symbol.upper()}:{d}".encode()))
+            for m in range(SESSION_MINUTES):
+                o = price
+                price = max(0.5, price * math.exp(rnd.gauss(0, 0.0009)))
+                t = base + m * 60
+                if lo <= t <= hi:
+                    out.append({
+                        "timestamp": t, "gmtoffset": 0,
+                        "datetime": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(t)),
+                        "open": round(o, 4), "high": round(max(o, price) * (1 + abs(rnd.gauss(0, 0.0003))), 4),
+                        "low": round(min(o, price) * (1 - abs(rnd.gauss(0, 0.0003))), 4),
+                        "close": round(price, 4), "volume": rnd.randint(100, 50_000),
+                    })
+        d += timedelta(days=1)
+    return out
+
+NAMES = [
+    ("AAPL", "Apple Inc"), ("MSFT", "Microsoft Corporation"), ("AMZN", "Amazon.com Inc"),
+    ("GOOGL", "Alphabet Inc Class A"), ("TSLA", "Tesla Inc"), ("NVDA", "NVIDIA Corporation"),
+    ("APLE", "Apple Hospitality REIT Inc"), ("SPY", "SPDR S&P 500 ETF Trust"),
+]
+
+def symbol_list(exchange, n=3000):
+    """Known names plus n synthetic tickers; the loadtest universe is SYM000.."""
+    rows = [(code, name, "Common Stock") for code, name in NAMES]
+    rows += [(f"SYM{i:03d}", f"Synthetic Holdings {i}", "ETF" if i % 7 == 0 else "Common Stock") for i in range(n)]
+    country = "USA" if exchange == "US" else exchange
+    return [
+        {"Code": code, "Name": name, "Country": country, "Exchange": exchange, "Currency": "USD", "Type": kind, "Isin": None}
+        for code, name, kind in rows
+    ]
+
+def eod(symbol, params):
+    bars = daily_bars(symbol)
+    lo = params.get("from", "0000")
+    hi = params.get("to", "9999")
+    return [b for b in bars if lo <= b["date"] <= hi]
+
+class Handler(BaseHTTPRequestHandler):
+    latency = 0.0
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        parts = url.path.strip("/").split("/")
+        if parts and parts[0] == "api":
+            parts = parts[1:]
+        kind = parts[0] if parts else ""
+        with _lock:
+            _stats["requests"] += 1
+            _stats["by_path"][kind] = _stats["by_path"].get(kind, 0) + 1
+        if kind == "_stats":
+            return self._send(200, _stats)
+        if self.latency:
+            time.sleep(self.latency)
+        if len(parts) < 2:
+            return self._send(404, {"code": 404, "message": "not found"})
+        symbol = parts[1]
+        if kind == "eod":
+            return self._send(200, eod(symbol, params))
+        if kind == "real-time":
+            extra = [s for s in params.get("s", "").split(",") if s]
+            if extra:
+                return self._send(200, [real_time(s) for s in [symbol] + extra])
+            return self._send(200, real_time(symbol))
+        if kind == "intraday":
+            return self._send(200, intraday(symbol, params))
+        if kind == "exchange-symbol-list":
+            return self._send(200, symbol_list(symbol.upper()))
+        if kind == "fundamentals":
+            return self._send(200, {"General": {"Code": symbol, "IPODate": daily_bars(symbol)[0]["date"]}})
+        return self._send(404, {"code": 404, "message": "not found"})
+
+def serve(port=9100, latency=0.0):
+    Handler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    return server
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--port", type=int, default=9100)
+    ap.add_argument("--latency", type=float, default=0.0, help="seconds added to each response")
+    args = ap.parse_args()
+    server = serve(args.port, args.latency)
+    print(f"fake EODHD on http://127.0.0.1:{args.port}/api")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
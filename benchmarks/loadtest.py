@@ -0,0 +1,200 @@
+"""Replay dashboard traffic against the backend and report latency percentiles.
+
+Starts the fake EODHD upstream, then for each worker count boots the
+backend (gunicorn with uvicorn workers, or uvicorn --workers if gunicorn is
+missing) on fresh caches and runs simulated users against it:
+
+    python -m benchmarks.loadtest --workers 1,2,4 --users 10,50 --duration 30
+
+Each user loads /api/tv?full=1 like frontend/src/App.jsx, polls its
+watchlist through /api/quotes and now and then switches symbol or period.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+from benchmarks import fake_upstream
+
+def _symbols(n):
+    return [f"SYM{i:03d}.US" for i in range(n)]
+
+class User(threading.Thread):
+    """One browser tab: keep-alive connection, its own X-Client-Id like the
+    frontend's, think time between actions."""
+
+    def __init__(self, port, universe, deadline, think, seed, record):
+        super().__init__(daemon=True)
+        self.port = port
+        self.universe = universe
+        self.deadline = deadline
+        self.think = think
+        self.rnd = random.Random(seed)
+        self.record = record
+        self.headers = {"X-Client-Id": f"loadtest-{seed}"}
+        self.conn = None
+
+    def request(self, endpoint, path):
+        t = time.perf_counter()
+        status = 0
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=120)
+            self.conn.request("GET", path, headers=self.headers)
+            r = self.conn.getresponse()
+            r.read()
+            status = r.status
+        except (OSError, http.client.HTTPException):
+            if self.conn is not None:
+                self.conn.close()
+            self.conn = None
+        self.record(endpoint, time.perf_counter() - t, status)
+
+    def tv(self, symbol, period="d"):
+        self.request(f"tv:{period}", f"/api/tv?symbol={symbol}&period={period}&full=1")
+
+    def run(self):
+        symbol = self.rnd.choice(self.universe)
+        watchlist = self.rnd.sample(self.universe, min(len(self.universe), self.rnd.randint(5, 20)))
+        self.tv(symbol)
+        while time.monotonic() < self.deadline:
+            time.sleep(self.rnd.expovariate(1 / self.think))
+            roll = self.rnd.random()
+            if roll < 0.6:
+                self.request("quotes", "/api/quotes?symbols=" + ",".join(watchlist))
+            elif roll < 0.9:
+                symbol = self.rnd.choice(self.universe)
+                self.tv(symbol)
+            else:
+                self.tv(symbol, self.rnd.choice("wm"))
+        if self.conn is not None:
+            self.conn.close()
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+def run_users(port, users, duration, universe, think, seed=1):
+    samples = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+
+    def record(endpoint, seconds, status):
+        with lock:
+            if status == 200:
+                samples[endpoint].append(seconds)
+            else:
+                errors[endpoint] += 1
+
+    start = time.monotonic()
+    threads = [User(port, universe, start + duration, think, seed * 1000 + i, record) for i in range(users)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(duration + 180)
+    elapsed = time.monotonic() - start
+    out = {}
+    for endpoint in sorted(set(samples) | set(errors)):
+        vals = sorted(samples[endpoint])
+        out[endpoint] = {
+            "requests": len(vals),
+            "errors": errors[endpoint],
+            "rps": len(vals) / elapsed,
+            "p50": _percentile(vals, 0.50),
+            "p95": _percentile(vals, 0.95),
+            "p99": _percentile(vals, 0.99),
+        }
+    return out
+
+def _server_cmd(workers, port):
+    if shutil.which("gunicorn"):
+        return ["gunicorn", "-k", "uvicorn.workers.UvicornWorker", "backend.app:app",
+                "--workers", str(workers), "--bind", f"127.0.0.1:{port}", "--timeout", "120"]
+    return [sys.executable, "-m", "uvicorn", "backend.app:app", "--workers", str(workers),
+            "--port", str(port), "--log-level", "warning"]
+
+def _wait_healthy(port, proc, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("backend exited during startup")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("backend did not become healthy")
+
+def start_backend(workers, port, upstream_port, workdir):
+    env = dict(os.environ)
+    env.update(
+        EODHD_BASE=f"http://127.0.0.1:{upstream_port}/api",
+        EODHD_API_KEY="loadtest",
+        SHARED_CACHE_PATH=os.path.join(workdir, "cache.sqlite3"),
+        CANDLE_ARCHIVE_DIR=os.path.join(workdir, "candles"),
+        SNAPSHOT_PATH="",
+    )
+    proc = subprocess.Popen(_server_cmd(workers, port), env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _wait_healthy(port, proc)
+    except BaseException:
+        proc.terminate()
+        proc.wait()
+        raise
+    return proc
+
+def _print_table(rows):
+    print(f"{'workers':>7} {'users':>5} {'endpoint':<8} {'reqs':>6} {'err':>4} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for r in rows:
+        print(f"{r['workers']:>7} {r['users']:>5} {r['endpoint']:<8} {r['requests']:>6} {r['errors']:>4} {r['rps']:>7.1f} "
+              f"{r['p50'] * 1000:>8.1f} {r['p95'] * 1000:>8.1f} {r['p99'] * 1000:>8.1f}")
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--workers", default="1,2", help="comma-separated worker counts")
+    ap.add_argument("--users", default="10,30", help="comma-separated concurrent user counts")
+    ap.add_argument("--duration", type=float, default=20.0, help="seconds per run")
+    ap.add_argument("--symbols", type=int, default=40, help="size of the symbol universe")
+    ap.add_argument("--think", type=float, default=2.0, help="mean seconds between user actions")
+    ap.add_argument("--latency", type=float, default=0.05, help="fake upstream latency in seconds")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--upstream-port", type=int, default=9100)
+    ap.add_argument("--json", help="also write the results to this file")
+    args = ap.parse_args()
+
+    upstream = fake_upstream.serve(args.upstream_port, args.latency)
+    threading.Thread(target=upstream.serve_forever, daemon=True).start()
+    universe = _symbols(args.symbols)
+    rows = []
+    for workers in [int(w) for w in args.workers.split(",")]:
+        for users in [int(u) for u in args.users.split(",")]:
+            with tempfile.TemporaryDirectory(prefix="mvp-load-") as workdir:
+                proc = start_backend(workers, args.port, args.upstream_port, workdir)
+                try:
+                    result = run_users(args.port, users, args.duration, universe, args.think)
+                finally:
+                    proc.terminate()
+                    proc.wait(30)
+            for endpoint, stats in result.items():
+                rows.append({"workers": workers, "users": users, "endpoint": endpoint, **stats})
+            print(f"[loadtest] workers={workers} users={users} done", file=sys.stderr, flush=True)
+    _print_table(rows)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+    upstream.shutdown()
+
+if __name__ == "__main__":
+    main()
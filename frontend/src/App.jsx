@@ -2,6 +2,9 @@ import React, { useEffect, useMemo, useRef, useState } from "react"
 import { createChart } from "lightweight-charts"
 
 const API = "https://market-vision-pro-real.onrender.com"
+// One id per tab: the backend queues heavy requests per client and lets a
+// tab's new chart request cancel the one it replaces.
+const CLIENT_ID = globalThis.crypto?.randomUUID?.() || Math.random().toString(36).slice(2)
 
 const isNum = (v) => Number.isFinite(Number(v))
 const isTime = (t) => typeof t === "string" && t.length >= 8
@@ -176,7 +179,7 @@ export default function App() {
     setErr("")
     setLoading(true)
     try {
-      const r = await fetch(`${API}/api/tv?symbol=${encodeURIComponent(symbol)}&period=d&full=1`)
+      const r = await fetch(`${API}/api/tv?symbol=${encodeURIComponent(symbol)}&period=d&full=1`, { headers: { "X-Client-Id": CLIENT_ID } })
       if (!r.ok) throw new Error(await r.text())
       const data = await r.json()
 
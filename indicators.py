@@ -24,25 +24,32 @@ def atr(h,l,c,n=14):
     tr=pd.concat([(h-l).abs(), (h-c.shift()).abs(), (l-c.shift()).abs()], axis=1).max(axis=1)
     return tr.rolling(n).mean()
 
-def psar(h,l, af=0.02, af_max=0.2):
-    sar=h.copy()*0; bull=True; ep=l.iloc[0]; sar.iloc[0]=l.iloc[0]; a=af
-    for i in range(1,len(h)):
-        prev=sar.iloc[i-1]
-        sar.iloc[i]=prev+a*(ep-prev)
+def _psar_arrays(h, l, af=0.02, af_max=0.2):
+    n=len(h); sar=np.empty(n, dtype=np.float64)
+    if n==0: return sar
+    hv=h.tolist(); lv=l.tolist()
+    bull=True; ep=lv[0]; s=lv[0]; sar[0]=s; a=af
+    for i in range(1,n):
+        s=s+a*(ep-s)
         if bull:
-            if l.iloc[i]<sar.iloc[i]:
-                bull=False; sar.iloc[i]=ep; ep=l.iloc[i]; a=0.02
+            if lv[i]<s:
+                bull=False; s=ep; ep=lv[i]; a=0.02
             else:
-                if h.iloc[i]>ep: ep=h.iloc[i]; a=min(af_max,a+af)
-                sar.iloc[i]=min(sar.iloc[i], l.iloc[i-1], l.iloc[i-2] if i>1 else l.iloc[i-1])
+                if hv[i]>ep: ep=hv[i]; a=min(af_max,a+af)
+                s=min(s, lv[i-1], lv[i-2] if i>1 else lv[i-1])
         else:
-            if h.iloc[i]>sar.iloc[i]:
-                bull=True; sar.iloc[i]=ep; ep=h.iloc[i]; a=0.02
+            if hv[i]>s:
+                bull=True; s=ep; ep=hv[i]; a=0.02
             else:
-                if l.iloc[i]<ep: ep=l.iloc[i]; a=min(af_max,a+af)
-                sar.iloc[i]=max(sar.iloc[i], h.iloc[i-1], h.iloc[i-2] if i>1 else h.iloc[i-1])
+                if lv[i]<ep: ep=lv[i]; a=min(af_max,a+af)
+                s=max(s, hv[i-1], hv[i-2] if i>1 else hv[i-1])
+        sar[i]=s
     return sar
 
+def psar(h,l, af=0.02, af_max=0.2):
+    sar=_psar_arrays(np.asarray(h, dtype=np.float64), np.asarray(l, dtype=np.float64), af, af_max)
+    return pd.Series(sar, index=h.index, name=h.name)
+
 def compute(df):
     c=df["Close"]; h=df["High"]; l=df["Low"]
     out=pd.DataFrame(index=df.index)
@@ -0,0 +1,44 @@
+from datetime import date, timedelta
+
+import pytest
+
+from backend import alerts, shared
+
+@pytest.fixture
+def bars(monkeypatch):
+    monkeypatch.setattr(shared, "CACHE_PATH", "")
+    first = date(2024, 1, 1)
+    return [
+        {"time": (first + timedelta(days=i)).isoformat(), "open": 10.0 + i % 7, "high": 12.0 + i % 7, "low": 9.0 + i % 7, "close": 11.0 + i % 7}
+        for i in range(300)
+    ]
+
+def _engine(bars, quotes=None):
+    def load(symbol, from_d, to_d):
+        return [b for b in bars if from_d.isoformat() <= b["time"] <= to_d.isoformat()]
+    return alerts.Engine(quotes=quotes, load=load, warmup_days=400, interval=0)
+
+def _after(bars):
+    return date.fromisoformat(bars[-1]["time"]) + timedelta(days=1)
+
+def test_first_seed_reports_no_history(bars):
+    progress = {}
+    rule = alerts.make_rule("X.US", "close", "above", value=0)
+    assert _engine(bars)._advance("X.US", [rule], _after(bars), progress) == []
+    assert progress["X.US"] == bars[-1]["time"]
+
+def test_takeover_evaluates_bars_not_yet_reported(bars):
+    progress = {"X.US": bars[-6]["time"]}
+    rule = alerts.make_rule("X.US", "close", "above", value=0)
+    fired = _engine(bars)._advance("X.US", [rule], _after(bars), progress)
+    assert [e["time"] for e in fired] == [b["time"] for b in bars[-5:]]
+    assert progress["X.US"] == bars[-1]["time"]
+
+def test_cycle_stops_once_lock_is_lost(bars, monkeypatch):
+    monkeypatch.setattr(alerts, "RENEW_SECONDS", -1)
+    engine = _engine(bars, quotes=lambda symbols: {s: {"close": 11.0, "timestamp": 1735689600} for s in symbols})
+    engine.rules.add(alerts.make_rule("X.US", "close", "above", value=0))
+    assert engine.cycle(lambda: False) == []
+    assert engine.stats["cycles"] == 0 and not engine.symbols
+    engine.cycle(lambda: True)
+    assert engine.stats["cycles"] == 1 and "X.US" in engine.symbols
@@ -0,0 +1,20 @@
+import math
+from datetime import date
+
+from backend import archive, crossasset
+
+def _cols(days, closes):
+    return archive.Columns.from_rows([
+        {"date": d.isoformat(), "open": c, "high": c, "low": c, "close": c, "adjusted_close": c, "volume": 1.0}
+        for d, c in zip(days, closes)
+    ])
+
+def test_other_exchanges_holidays_do_not_add_zero_returns():
+    days = [date.fromordinal(date(2024, 1, 1).toordinal() + i) for i in range(80)]
+    closes = [100 * math.exp(0.02 * math.sin(i * 1.7) + 0.001 * i) for i in range(80)]
+    holidays = {5, 17, 33, 48, 61}
+    a = _cols(days, closes)
+    b = _cols([d for i, d in enumerate(days) if i not in holidays], [c for i, c in enumerate(closes) if i not in holidays])
+    out = crossasset.compute([("A", a), ("B", b)], 0)
+    assert out["correlation"][0][1] == 1.0
+    assert out["beta"][0][1] == 1.0
@@ -0,0 +1,30 @@
+import math
+from bisect import bisect_right
+from datetime import date, timedelta
+
+from backend import app, pipeline
+from backend.series import CandleSeries
+
+def _candles(n):
+    rows = []
+    for i in range(n):
+        c = 100 + 30 * math.sin(i / 40) + 8 * math.sin(i / 3) + (25 if i == n // 3 else 0)
+        rows.append({"date": (date(1990, 1, 1) + timedelta(days=i)).isoformat(), "open": c, "high": c + 1, "low": c - 1, "close": c})
+    return CandleSeries.from_rows(rows)
+
+def test_downsample_keeps_overlay_extremes_on_candle_rows():
+    candles = _candles(6000)
+    overlays = pipeline.run(app.TILE_STAGES, {"candles": candles, "view": candles, "skip": 0})["overlays"]
+    cols, ds = app._downsample(candles, overlays, 300)
+    assert ds["time"] == cols["time"] and ds["close"] == cols["close"]
+    edges = app._bucket_edges(len(candles), 300)
+    for k in overlays:
+        if k in ("time", "close"):
+            continue
+        full = [v for v in overlays[k] if v is not None]
+        kept = set(ds[k])
+        lo, hi = min(full), max(full)
+        if bisect_right(edges, overlays[k].index(lo)) == bisect_right(edges, overlays[k].index(hi)):
+            assert lo in kept or hi in kept, k
+        else:
+            assert lo in kept and hi in kept, k
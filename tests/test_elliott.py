@@ -0,0 +1,25 @@
+import math
+import random
+from collections import OrderedDict
+from datetime import date, timedelta
+
+from backend import app
+from backend.series import CandleSeries
+
+def _candles(n, seed):
+    rng = random.Random(seed)
+    rows, c = [], 100.0
+    for i in range(n):
+        c *= math.exp(rng.gauss(0.0005, 0.025))
+        rows.append({"date": (date(2015, 1, 1) + timedelta(days=i)).isoformat(), "open": c, "high": c * 1.015, "low": c * 0.985, "close": c})
+    return CandleSeries.from_rows(rows)
+
+def test_memoized_elliott_matches_unmemoized_replay(monkeypatch):
+    monkeypatch.setattr(app, "_window_memo", OrderedDict())
+    ends = range(300, 700, 7)
+    series = [_candles(700, seed) for seed in (2, 9, 21)]
+    hits = app._memo_info()["impulse"]["hits"]
+    memoized = [app._stage_elliott(c[:end]) for c in series for end in ends]
+    assert app._memo_info()["impulse"]["hits"] > hits
+    monkeypatch.setattr(app, "_memo", lambda key, compute: compute())
+    assert memoized == [app._stage_elliott(c[:end]) for c in series for end in ends]
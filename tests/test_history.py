@@ -0,0 +1,50 @@
+import time
+from datetime import date, timedelta
+
+from backend import archive, history
+
+def _bar(d):
+    return {"date": d.isoformat(), "open": 1.0, "high": 2.0, "low": 0.5, "close": 1.5, "adjusted_close": 1.5, "volume": 10.0}
+
+def _held(monkeypatch, first, last, fetched):
+    monkeypatch.setattr(archive, "enabled", lambda: False)
+    days = [first + timedelta(days=i) for i in range((last - first).days + 1)]
+    return history._entry(archive.Columns.from_rows([_bar(d) for d in days]), first, last, fetched)
+
+def test_failed_head_fetch_keeps_range(monkeypatch):
+    entry = _held(monkeypatch, date(2024, 3, 1), date(2024, 3, 31), time.time())
+    got = history._refresh("X", "X.US", entry, date(2024, 1, 10), date(2024, 3, 31), date(2024, 1, 1), lambda path, params: {"error": "x"})
+    assert got["from"] == date(2024, 3, 1)
+
+def test_failed_tail_fetch_keeps_range_and_age(monkeypatch):
+    stale = time.time() - history.TTL - 1
+    entry = _held(monkeypatch, date(2024, 3, 1), date(2024, 3, 31), stale)
+    got = history._refresh("X", "X.US", entry, date(2024, 3, 1), date(2024, 4, 30), date(2024, 3, 1), lambda path, params: {"error": "x"})
+    assert (got["to"], got["fetched"]) == (date(2024, 3, 31), stale)
+
+def test_tail_fetch_extends_range(monkeypatch):
+    entry = _held(monkeypatch, date(2024, 3, 1), date(2024, 3, 31), time.time())
+    new = [_bar(date(2024, 4, 1) + timedelta(days=i)) for i in range(5)]
+    got = history._refresh("X", "X.US", entry, date(2024, 3, 1), date(2024, 4, 30), date(2024, 3, 1), lambda path, params: new)
+    assert got["to"] == date(2024, 4, 30) and len(got["cols"]) == 36
+
+def test_resample_groups_calendar_weeks_and_months():
+    rows = [_bar(date(2024, 1, 29) + timedelta(days=i)) for i in range(14) if (date(2024, 1, 29) + timedelta(days=i)).weekday() < 5]
+    rows[1]["high"] = 9.0
+    rows[2]["volume"] = None
+    cols = archive.Columns.from_rows(rows)
+    weeks = history.resample(cols, "w").rows()
+    assert [w["date"] for w in weeks] == ["2024-01-29", "2024-02-05"]
+    assert weeks[0]["high"] == 9.0 and weeks[0]["volume"] == 40.0 and weeks[1]["volume"] == 50.0
+    months = history.resample(cols, "m").rows()
+    assert [m["date"] for m in months] == ["2024-01-29", "2024-02-01"]
+    assert months[0]["volume"] == 20.0 and months[0]["close"] == rows[2]["close"]
+
+def test_hit_counts_stay_bounded(monkeypatch):
+    monkeypatch.setattr(history, "_hits", history.Counter())
+    for _ in range(5):
+        history._count_hit("HOT")
+    for i in range(3 * history.MAX_SYMBOLS):
+        history._count_hit(f"S{i}")
+    assert len(history._hits) <= 2 * history.MAX_SYMBOLS
+    assert history.hot(1) == ["HOT"]
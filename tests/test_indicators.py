@@ -0,0 +1,55 @@
+import math
+import random
+import statistics
+from datetime import date, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from backend import app, history, main, warmup
+from backend.series import CandleSeries
+
+CLOSES = [100 + 20 * math.sin(i / 13) + 5 * math.cos(i / 2) for i in range(3000)]
+
+def test_no_bars_in_output_window_is_502(monkeypatch):
+    old = date.today() - timedelta(days=4000)
+    rows = [{"date": (old + timedelta(days=i)).isoformat(), "close": 1.0 + i} for i in range(30)]
+    monkeypatch.setattr(history, "bars", lambda *a: rows)
+    with pytest.raises(HTTPException) as e:
+        main.indicators(symbol="X", period="d", days=260)
+    assert e.value.status_code == 502
+
+@pytest.mark.parametrize("span", [9, 20, 200])
+def test_ema_scan_matches_recursion(span):
+    alpha = 2 / (span + 1)
+    want = [CLOSES[0]]
+    for v in CLOSES[1:]:
+        want.append(alpha * v + (1 - alpha) * want[-1])
+    assert app._ema(CLOSES, span) == pytest.approx(want, rel=1e-12)
+
+def test_bb_matches_window_stats():
+    upper, mid, lower = app._bb(CLOSES, 20, 2.0)
+    assert mid[:19] == [None] * 19 and upper[18] is None
+    for i in (19, 1000, len(CLOSES) - 1):
+        window = CLOSES[i - 19:i + 1]
+        assert mid[i] == pytest.approx(statistics.fmean(window), rel=1e-12)
+        assert upper[i] - mid[i] == pytest.approx(2 * statistics.pstdev(window), rel=1e-9)
+
+@pytest.mark.parametrize("seed", [3, 11])
+def test_warmup_bars_match_full_history_within_tol(seed):
+    rng = random.Random(seed)
+    rows, c = [], 100.0
+    for i in range(4000):
+        c *= math.exp(rng.gauss(0, 0.02))
+        rows.append({"date": (date(1990, 1, 1) + timedelta(days=i)).isoformat(), "open": c, "high": c * 1.01, "low": c * 0.99, "close": c})
+    candles = CandleSeries.from_rows(rows)
+    start = 3000
+    _, full, *_ = app._tv_analysis(candles, start)
+    _, part, *_ = app._tv_analysis(candles[start - app.TV_WARMUP_BARS:], app.TV_WARMUP_BARS)
+    price_range = max(candles.close) - min(candles.close)
+    for k in app.OVERLAY_KEYS[1:]:
+        scale = 100.0 if k in ("rsi14", "stoch_k", "stoch_d") else price_range
+        for a, b in zip(full[k], part[k]):
+            assert (a is None) == (b is None), k
+            if a is not None:
+                assert abs(a - b) <= warmup.TOL * scale, k
@@ -0,0 +1,65 @@
+import pytest
+
+from backend import jobs
+
+def _idle(queue):
+    info = queue.info()
+    return (info["running"], info["waiting"], info["clients"]) == (0, 0, 0)
+
+def test_job_finished_while_queued_does_not_leak_a_slot():
+    queue = jobs.JobQueue(slots=1, max_waiting=4, per_client=4)
+    running = queue.submit("a")
+    queued = queue.submit("b")
+    assert running.granted.is_set() and not queued.granted.is_set()
+    queued.finish()
+    assert queue.info()["waiting"] == 0
+    running.wait()
+    running.finish()
+    assert _idle(queue)
+    later = queue.submit("c")
+    assert later.granted.is_set()
+    later.wait()
+    later.finish()
+    assert _idle(queue)
+
+def test_slots_go_to_clients_in_turn():
+    queue = jobs.JobQueue(slots=1, max_waiting=8, per_client=4)
+    first = queue.submit("a")
+    a2, a3 = queue.submit("a"), queue.submit("a")
+    b1 = queue.submit("b")
+    first.wait()
+    first.finish()
+    assert a2.granted.is_set() and not b1.granted.is_set()
+    a2.wait()
+    a2.finish()
+    assert b1.granted.is_set() and not a3.granted.is_set()
+
+def test_new_job_on_lane_supersedes_previous():
+    queue = jobs.JobQueue(slots=1, max_waiting=4, per_client=4)
+    old = queue.submit("a", "tv")
+    new = queue.submit("a", "tv")
+    with pytest.raises(jobs.Cancelled) as e:
+        old.wait()
+    assert e.value.reason == jobs.SUPERSEDED
+    new.wait()
+    new.finish()
+    assert _idle(queue)
+
+def test_abandoned_queued_job_leaves_queue():
+    queue = jobs.JobQueue(slots=1, max_waiting=4, per_client=4)
+    running = queue.submit("a")
+    queued = queue.submit("b")
+    queue.abandon(queued)
+    assert queue.info()["waiting"] == 0
+    running.wait()
+    running.finish()
+    assert _idle(queue)
+
+def test_per_client_cap_and_override():
+    queue = jobs.JobQueue(slots=1, max_waiting=8, per_client=1)
+    queue.submit("a")
+    with pytest.raises(jobs.Rejected):
+        queue.submit("a")
+    queue.submit("shared", per_client=3)
+    queue.submit("shared", per_client=3)
+    assert queue.info()["waiting"] == 2
@@ -0,0 +1,13 @@
+import numpy as np
+import pytest
+
+import indicators
+from backend.app import _psar
+from benchmarks.bench_psar import _psar_iloc, _series
+
+@pytest.mark.parametrize("seed", [1, 7])
+def test_psar_is_bit_identical_to_iloc_loop(seed):
+    h, l = _series(1500, seed)
+    ref = _psar_iloc(h, l).to_numpy()
+    assert np.array_equal(indicators.psar(h, l).to_numpy(), ref)
+    assert np.array_equal(np.asarray(_psar(h.tolist(), l.tolist())), ref)
@@ -0,0 +1,31 @@
+import math
+import pickle
+from datetime import date, timedelta
+
+from backend import app, archive
+from backend.series import CandleSeries
+
+def _rows(n):
+    rows = []
+    for i in range(n):
+        c = 40 + 8 * math.sin(i / 11) + 2 * math.sin(i / 3)
+        rows.append({"date": (date(2001, 1, 1) + timedelta(days=i)).isoformat(), "open": c - 0.3, "high": c + 1, "low": c - 1, "close": c})
+    rows[10]["open"] = None
+    rows[20]["low"] = rows[20]["high"] + 1
+    rows[30]["close"] = 0.0
+    return rows
+
+def _same(a, b):
+    return [list(getattr(a, f)) for f in ("day", "open", "high", "low", "close")] == [list(getattr(b, f)) for f in ("day", "open", "high", "low", "close")]
+
+def test_columns_and_rows_build_the_same_series_and_payload():
+    rows = _rows(600)
+    a = CandleSeries.from_rows(rows)
+    b = CandleSeries.from_columns(archive.Columns.from_rows(rows))
+    assert len(a) == 598 and _same(a, b)
+    assert a[10]["open"] == a[10]["close"] and a[11]["time"] == rows[11]["date"]
+    assert "".join(app._iter_tv_json("X", a, 100, 0)) == "".join(app._iter_tv_json("X", b, 100, 0))
+
+def test_series_pickles_for_the_stage_pool():
+    a = CandleSeries.from_rows(_rows(200))[50:]
+    assert _same(pickle.loads(pickle.dumps(a)), a)
@@ -0,0 +1,27 @@
+import os
+import threading
+
+from backend import shared
+
+def _cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(shared, "CACHE_PATH", str(tmp_path / "c.sqlite3"))
+    monkeypatch.setattr(shared, "PAYLOAD_DIR", str(tmp_path / "payloads"))
+    monkeypatch.setattr(shared, "_local", threading.local())
+
+def _stored(key):
+    writer = shared.PayloadWriter(key, 60)
+    writer.write('{"a":1}')
+    return writer.commit()
+
+def test_opened_payload_survives_eviction(monkeypatch, tmp_path):
+    _cache(monkeypatch, tmp_path)
+    path = _stored("k")
+    f = shared.open_payload("k")
+    os.unlink(path)
+    with f:
+        assert f.read() == b'{"a":1}'
+
+def test_evicted_payload_is_a_miss(monkeypatch, tmp_path):
+    _cache(monkeypatch, tmp_path)
+    os.unlink(_stored("k"))
+    assert shared.open_payload("k") is None
@@ -0,0 +1,33 @@
+import math
+import random
+from datetime import date, timedelta
+
+import numpy as np
+
+from backend import app, sweep
+from backend.series import CandleSeries
+
+def _candles(n, seed=5):
+    rng = random.Random(seed)
+    rows, c = [], 100.0
+    for i in range(n):
+        c *= math.exp(rng.gauss(0, 0.02))
+        spread = abs(rng.gauss(0, 0.01)) * c
+        rows.append({"date": (date(2000, 1, 1) + timedelta(days=i)).isoformat(), "open": c, "high": c + spread, "low": c - spread, "close": c})
+    return CandleSeries.from_rows(rows)
+
+def test_rsi_matrix_is_bit_identical_to_rsi():
+    closes = _candles(1200).close
+    periods = [2, 5, 14, 30, 1500]
+    got = sweep.rsi_matrix(closes, periods)
+    for row, p in zip(got, periods):
+        want = np.array([np.nan if v is None else v for v in app._rsi(closes, p)[:len(closes)]])
+        assert np.array_equal(row, want, equal_nan=True), p
+
+def test_zigzag_pivots_match_sequential_scan():
+    candles = _candles(1500)
+    configs = [(d, m) for d in (0.03, 0.06, 0.1) for m in (1, 5, 12)]
+    got = sweep.zigzag_pivots(candles.high, candles.low, candles.close, [d for d, _ in configs], [m for _, m in configs])
+    for pivots, (dev, mb) in zip(got, configs):
+        want = [(p["idx"], p["price"], p["type"]) for p in app._zigzag_scan(candles, dev, mb)]
+        assert len(want) > 2 and [tuple(p) for p in pivots] == want, (dev, mb)
@@ -0,0 +1,54 @@
+import math
+from array import array
+
+import pytest
+
+from backend import tiles
+
+KEYS = ("ema20",)
+
+def _bars(n):
+    days = array("i", range(n))
+    times = [f"t{i:06d}" for i in range(n)]
+    close = [100 + 10 * math.sin(i / 7) for i in range(n)]
+    cols = {
+        "open": close, "high": [c + 1 for c in close], "low": [c - 1 for c in close], "close": close,
+        "ema20": [None if i < 19 else c for i, c in enumerate(close)],
+    }
+    return days, times, cols
+
+def _built(n, keep=None):
+    """Pyramid of n bars, built at once or from keep bars then spliced."""
+    pyr = tiles.Pyramid(KEYS)
+    days, times, cols = _bars(n)
+    keep = keep or n
+    pyr.splice(0, days[:keep], times[:keep], {k: v[:keep] for k, v in cols.items()})
+    if keep < n:
+        pyr.splice(keep, days[keep:], times[keep:], {k: v[keep:] for k, v in cols.items()})
+    return pyr
+
+def _rows(pyr):
+    return [{k: list(v) for k, v in level.items()} for level in pyr.levels]
+
+def _sizes():
+    for k in range(1, 4):
+        edge = tiles.TILE_BARS * tiles.FANOUT ** k
+        yield from (edge - 1, edge, edge + 1)
+
+@pytest.mark.parametrize("n", list(_sizes()) + [5000])
+@pytest.mark.parametrize("keep", [1, 300, 1000])
+def test_splice_matches_full_build(n, keep):
+    if keep >= n:
+        pytest.skip("nothing to append")
+    spliced, fresh = _built(n, keep), _built(n)
+    assert [len(level["time"]) for level in spliced.levels] == [len(level["time"]) for level in fresh.levels]
+    assert repr(_rows(spliced)) == repr(_rows(fresh))
+
+def test_top_level_fits_one_tile():
+    pyr = _built(5000, 1000)
+    assert len(pyr.levels[-1]["time"]) <= tiles.TILE_BARS < len(pyr.levels[-2]["time"])
+
+def test_tile_ending_on_last_full_bucket_is_complete():
+    n = tiles.TILE_BARS * tiles.FANOUT
+    assert _built(n).tile(1, 0)[1]
+    assert not _built(n - 1).tile(1, 0)[1]
@@ -0,0 +1,33 @@
+import json
+import math
+from datetime import date, timedelta
+
+import pytest
+
+from backend import app
+from backend.series import CandleSeries
+
+def _candles(n):
+    rows = []
+    for i in range(n):
+        c = 50 + 10 * math.sin(i / 17) + 3 * math.sin(i / 4)
+        rows.append({"date": (date(2000, 1, 3) + timedelta(days=i)).isoformat(), "open": c - 0.5, "high": c + 1, "low": c - 1, "close": c})
+    return CandleSeries.from_rows(rows)
+
+@pytest.mark.parametrize("skip", [0, 200])
+def test_streamed_json_matches_json_response(skip):
+    candles = _candles(1500)
+    view, overlays, levels, elliott, signal = app._tv_analysis(candles, skip)
+    cols = view.columns()
+    n = len(view)
+    payload = {
+        "symbol": "ABC.US",
+        "candles": [{k: cols[k][i] for k in app.CANDLE_KEYS} for i in range(n)],
+        "overlays": [{k: overlays[k][i] for k in app.OVERLAY_KEYS} for i in range(n)],
+        "last": {k: overlays[k][-1] for k in app.OVERLAY_KEYS},
+        "levels": levels,
+        "elliott": elliott,
+        "signal": signal,
+    }
+    want = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+    assert "".join(app._iter_tv_json("abc.us", candles, skip, 0)) == want